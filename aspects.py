@@ -0,0 +1,95 @@
+# aspects.py
+import numpy as np
+from metrics import timer
+
+ASPECTS = [
+    (0, "Conjunction", "☌"),
+    (60, "Sextile", "✶"),
+    (90, "Square", "□"),
+    (120, "Trine", "△"),
+    (180, "Opposition", "☍"),
+]
+ASPECT_ANGLES = np.array([a[0] for a in ASPECTS], dtype=float)
+ASPECT_NAMES = [a[1] for a in ASPECTS]
+ASPECT_SYMBOLS = [a[2] for a in ASPECTS]
+HARMONIOUS = np.array([name in ("Trine", "Sextile") for name in ASPECT_NAMES])
+TENSE = np.array([name in ("Square", "Opposition") for name in ASPECT_NAMES])
+
+LUMINARIES = ["Sun", "Moon"]
+PERSONAL_PLANETS = ["Sun", "Moon", "Mercury", "Venus", "Mars"]
+ORB_LUMINARIES = 8
+ORB_PLANETS = 6
+
+# One row per aspect found: epoch index (0 for single charts), body indices in
+# the first and second longitude arrays, aspect index into ASPECTS and the
+# angular separation in degrees.
+ASPECT_DTYPE = np.dtype([
+    ("epoch", np.int32),
+    ("i", np.int16),
+    ("j", np.int16),
+    ("aspect", np.int8),
+    ("angle", np.float64),
+])
+
+
+def body_orbs(names, luminaries=ORB_LUMINARIES, planets=ORB_PLANETS):
+    return np.array([luminaries if n in LUMINARIES else planets for n in names], dtype=float)
+
+
+def body_flags(names, subset):
+    return np.array([n in subset for n in names])
+
+
+def separations(lon1, lon2):
+    # (..., n) x (..., m) -> (..., n, m) shortest angular distance. Same
+    # values as abs((d + 180) % 360 - 180), spelled out in place since
+    # np.remainder is the slow part.
+    d = lon1[..., :, None] - lon2[..., None, :]
+    d += 180
+    np.fmod(d, 360, out=d)
+    d[d < 0] += 360
+    d -= 180
+    return np.abs(d, out=d)
+
+
+def find_aspects(lon1, lon2=None, orbs1=ORB_PLANETS, orbs2=None):
+    """Find every aspect between two sets of longitudes.
+
+    ``lon1`` is ``(n,)`` for one chart or ``(epochs, n)`` for a series of
+    charts; ``lon2`` is ``(m,)`` or, paired epoch by epoch, ``(epochs, m)``.
+    When ``lon2`` is omitted the aspects of each row of ``lon1`` with itself
+    are returned, each pair once (``j > i``). The orb for
+    a pair is the larger of the per-body orbs ``orbs1[i]`` and ``orbs2[j]``,
+    so ``body_orbs`` gives the wider luminary orb whenever the Sun or Moon is
+    involved. Rows come back ordered by epoch, ``i``, ``j`` and aspect angle.
+    """
+    with timer("aspects"):
+        return _find_aspects(lon1, lon2, orbs1, orbs2)
+
+
+def _find_aspects(lon1, lon2, orbs1, orbs2):
+    a = np.asarray(lon1, dtype=float)
+    single = a.ndim == 1
+    a = np.atleast_2d(a)
+    self_aspects = lon2 is None
+    b = a if self_aspects else np.asarray(lon2, dtype=float)
+    n, m = a.shape[1], b.shape[-1]
+    orb = np.maximum.outer(np.broadcast_to(np.asarray(orbs1, dtype=float), (n,)),
+                           np.broadcast_to(np.asarray(orbs1 if orbs2 is None else orbs2,
+                                                      dtype=float), (m,)))
+    diff = separations(a, b)
+    hit = np.abs(diff[..., None] - ASPECT_ANGLES) <= orb[..., None]
+    if self_aspects:
+        hit &= np.triu(np.ones((n, m), dtype=bool), k=1)[..., None]
+    epoch, i, j, k = np.nonzero(hit)
+    out = np.empty(len(i), dtype=ASPECT_DTYPE)
+    out["epoch"] = 0 if single else epoch
+    out["i"], out["j"], out["aspect"] = i, j, k
+    out["angle"] = diff[epoch, i, j]
+    return out
+
+
+def aspect_rows(found):
+    """Plain Python tuples ``(epoch, i, j, aspect, angle)`` for building JSON."""
+    return zip(found["epoch"].tolist(), found["i"].tolist(), found["j"].tolist(),
+               found["aspect"].tolist(), found["angle"].tolist())
@@ -1,20 +1,30 @@
+import asyncio
+import os
+import weakref
 from datetime import datetime, timedelta
+from itertools import islice
+from urllib.parse import urlsplit
+import httpx
+import numpy as np
 import swisseph as swe
 from geopy.geocoders import Nominatim
 from geopy.exc import GeocoderServiceError
+from geo_index import PlaceIndex, normalize_place
+from cache import LRUCache, SingleFlight, AsyncSingleFlight, MISSING
+import executors
+import tz_index
+from metrics import timer
+from ephemeris_store import default_store
+from aspects import ASPECTS, ASPECT_NAMES, ASPECT_SYMBOLS, find_aspects, aspect_rows
 
 planet_names = ['Sun', 'Moon', 'Mercury', 'Venus', 'Mars',
                 'Jupiter', 'Saturn', 'Uranus', 'Neptune', 'Pluto']
 planet_codes = [swe.SUN, swe.MOON, swe.MERCURY, swe.VENUS, swe.MARS,
                 swe.JUPITER, swe.SATURN, swe.URANUS, swe.NEPTUNE, swe.PLUTO]
-aspect_types = {
-    0: ("Conjunction", "☌"),
-    60: ("Sextile", "✶"),
-    90: ("Square", "□"),
-    120: ("Trine", "△"),
-    180: ("Opposition", "☍")
-}
+aspect_types = {ang: (name, sym) for ang, name, sym in ASPECTS}
 orb = 6  # degrees of tolerance for aspects
+# Columns of the planet_positions array
+LON, LAT, DIST, SPEED = range(4)
 
 # Small fallback database for offline coordinates used in tests
 OFFLINE_COORDS = {
@@ -22,63 +32,440 @@ OFFLINE_COORDS = {
     "London": (51.5, -0.12),
 }
 
+# Local gazetteer consulted before the network geocoder; geocoder hits are
+# written back so the next lookup of the same place stays offline.
+place_index = PlaceIndex()
+
+# In-process cache of resolved places. Failed lookups are cached as None for a
+# short time so a bad place name does not hit the geocoder on every request.
+PLACE_NEGATIVE_TTL = float(os.environ.get("NATAL_PLACE_NEGATIVE_TTL", 60))
+place_cache = LRUCache(
+    maxsize=int(os.environ.get("NATAL_PLACE_CACHE_SIZE", 4096)),
+    ttl=float(os.environ.get("NATAL_PLACE_CACHE_TTL", 86400)),
+)
+_place_flight = SingleFlight()
+_async_place_flight = AsyncSingleFlight()
+
+# Both geocoding paths use Nominatim's search API at NATAL_GEOCODER_URL (e.g. a
+# self-hosted Nominatim or the load-test stand-in); async lookups go through
+# one pooled client per event loop.
+GEOCODER_URL = os.environ.get("NATAL_GEOCODER_URL", "https://nominatim.openstreetmap.org/search")
+GEOCODER_TIMEOUT = float(os.environ.get("NATAL_GEOCODER_TIMEOUT", 5))
+GEOCODER_CONNECTIONS = int(os.environ.get("NATAL_GEOCODER_CONNECTIONS", 10))
+_geocoder_clients = weakref.WeakKeyDictionary()
+
+
+def _nominatim_options(url: str) -> dict:
+    # geopy takes the host (plus any path prefix) and appends /search itself
+    parts = urlsplit(url)
+    path = parts.path.rstrip("/")
+    if path.endswith("/search"):
+        path = path[:-len("/search")]
+    return {"domain": parts.netloc + path, "scheme": parts.scheme or "https"}
+
+
+def _lookup_place(place: str):
+    coords = place_index.lookup(place)
+    if coords:
+        return coords
+    try:
+        geo = Nominatim(user_agent="astro_api", **_nominatim_options(GEOCODER_URL)).geocode(place)
+    except GeocoderServiceError:
+        geo = None
+    if not geo:
+        return None
+    place_index.add(place, geo.latitude, geo.longitude)
+    return geo.latitude, geo.longitude
+
+
+def _remember_place(key: str, coords):
+    if coords is None:
+        place_cache.set(key, None, ttl=PLACE_NEGATIVE_TTL)
+    else:
+        place_cache.set(key, coords)
+    return coords
+
+
+def _resolve_uncached(place: str, key: str):
+    with timer("geocode"):
+        coords = _lookup_place(place)
+    return _remember_place(key, coords)
 
-def calculate_chart(date: str, time: str, place: str, tz_offset: int):
+
+def resolve_place(place: str):
     if place in OFFLINE_COORDS:
         # Avoid unnecessary network requests during testing by using
         # predefined coordinates for common cities.
-        lat, lon = OFFLINE_COORDS[place]
-    else:
-        try:
-            geo = Nominatim(user_agent="astro_api").geocode(place)
-        except GeocoderServiceError:
-            geo = None
-        if not geo:
-            return None, {"error": "Invalid place name"}
-        lat, lon = geo.latitude, geo.longitude
+        return OFFLINE_COORDS[place]
+    key = normalize_place(place)
+    coords = place_cache.get(key, MISSING)
+    if coords is not MISSING:
+        return coords
+    # Concurrent requests for the same uncached place share one lookup
+    return _place_flight.do(key, lambda: _resolve_uncached(place, key))
+
+
+def _geocoder_client() -> httpx.AsyncClient:
+    loop = asyncio.get_running_loop()
+    client = _geocoder_clients.get(loop)
+    if client is None:
+        client = _geocoder_clients[loop] = httpx.AsyncClient(
+            headers={"User-Agent": "astro_api"},
+            timeout=GEOCODER_TIMEOUT,
+            limits=httpx.Limits(max_connections=GEOCODER_CONNECTIONS),
+        )
+    return client
+
+
+async def close_geocoder():
+    client = _geocoder_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+
+async def _geocode_async(place: str):
+    try:
+        resp = await _geocoder_client().get(GEOCODER_URL, params={"q": place, "format": "json", "limit": 1})
+        resp.raise_for_status()
+        hits = resp.json()
+    except (httpx.HTTPError, ValueError):
+        return None
+    if not hits:
+        return None
+    return float(hits[0]["lat"]), float(hits[0]["lon"])
+
+
+async def _resolve_uncached_async(place: str, key: str):
+    # The place index is SQLite behind a lock (and ``add`` commits): query it
+    # on the I/O pool, not on the event loop
+    with timer("geocode"):
+        coords = await executors.run_in(executors.io, place_index.lookup, place)
+        if not coords:
+            coords = await _geocode_async(place)
+            if coords:
+                await executors.run_in(executors.io, place_index.add, place, *coords)
+    return _remember_place(key, coords)
+
+
+async def resolve_place_async(place: str):
+    """``resolve_place`` without blocking the event loop on the geocoder.
+
+    Shares the offline table, place index and cache with the sync path, so
+    a place resolved here is a cache hit for a later ``calculate_chart``.
+    """
+    if place in OFFLINE_COORDS:
+        return OFFLINE_COORDS[place]
+    key = normalize_place(place)
+    coords = place_cache.get(key, MISSING)
+    if coords is not MISSING:
+        return coords
+    return await _async_place_flight.do(key, lambda: _resolve_uncached_async(place, key))
+
+
+def place_cache_stats() -> dict:
+    return dict(place_cache.stats(), coalesced=_place_flight.shared)
+
+
+class FrozenDict(dict):
+    """Read-only dict used for cached chart results shared between requests."""
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("cached chart data is shared and read-only")
+
+    __setitem__ = __delitem__ = __ior__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+
+    def __reduce__(self):
+        return FrozenDict, (dict(self),)
+
+
+def _freeze(value):
+    if isinstance(value, dict):
+        return FrozenDict((k, _freeze(v)) for k, v in value.items())
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+# Ruling body (index into planet_names) of each sign, Aries first
+SIGN_RULERS = np.array([4, 3, 2, 1, 0, 2, 3, 9, 5, 6, 7, 8])
+
+
+def _readonly_array(values, dtype=float):
+    a = np.array(values, dtype=dtype)
+    a.flags.writeable = False
+    return a
+
+
+class Chart:
+    """One natal chart as fixed-size arrays.
+
+    ``degrees`` and ``speeds`` are indexed like ``planet_names``, ``cusps``
+    holds the twelve house cusps and ``aspects`` is an ``ASPECT_DTYPE`` array
+    of body-index pairs. Values are rounded as in the JSON output. The
+    arrays are read-only so a cached chart can be shared between requests;
+    ``to_dict`` builds the JSON shape at the response boundary, and item
+    access (``chart["planet_degrees"]``) returns read-only views of it for
+    code written against the dict form, built once per chart.
+    """
+
+    __slots__ = ("jd", "lat", "lon", "degrees", "speeds", "cusps", "aspects", "_views")
+
+    def __init__(self, jd: float, lat: float, lon: float, degrees, speeds, cusps, aspects):
+        self.jd, self.lat, self.lon = jd, lat, lon
+        self.degrees = _readonly_array(degrees)
+        self.speeds = _readonly_array(speeds)
+        self.cusps = _readonly_array(cusps)
+        aspects = aspects.copy()
+        aspects.flags.writeable = False
+        self.aspects = aspects
+        self._views = {}
+
+    @property
+    def retrograde(self):
+        return self.speeds < 0
+
+    @property
+    def house_signs(self):
+        return (self.cusps // 30 % 12).astype(int)
+
+    def aspect_triples(self) -> list:
+        """``(i, j, aspect index)`` per aspect, as taken by the renderers."""
+        return list(zip(self.aspects["i"].tolist(), self.aspects["j"].tolist(),
+                        self.aspects["aspect"].tolist()))
+
+    def _planet_degrees(self):
+        return dict(zip(planet_names, self.degrees.tolist()))
+
+    def _aspects(self):
+        return [{
+            "between": f"{planet_names[i]} - {planet_names[j]}",
+            "type": ASPECT_NAMES[k],
+            "symbol": ASPECT_SYMBOLS[k],
+            "angle": angle
+        } for _, i, j, k, angle in aspect_rows(self.aspects)]
+
+    def _retrograde_planets(self):
+        return [name for name, r in zip(planet_names, self.retrograde.tolist()) if r]
+
+    def _house_rulers(self):
+        degrees = self.degrees.tolist()
+        return [{
+            "house": i+1,
+            "sign": sign+1,
+            "ruler": planet_names[SIGN_RULERS[sign]],
+            "ruler_degree": degrees[SIGN_RULERS[sign]]
+        } for i, sign in enumerate(self.house_signs.tolist())]
+
+    _FIELDS = {
+        "jd": lambda c: c.jd,
+        "lat": lambda c: c.lat,
+        "lon": lambda c: c.lon,
+        "planet_degrees": _planet_degrees,
+        "houses": lambda c: c.cusps.tolist(),
+        "aspects": _aspects,
+        "retrograde_planets": _retrograde_planets,
+        "house_rulers": _house_rulers,
+    }
+
+    def to_dict(self) -> dict:
+        return {key: field(self) for key, field in self._FIELDS.items()}
+
+    def __getitem__(self, key):
+        # The chart never changes, so each frozen view is built only once
+        view = self._views.get(key, MISSING)
+        if view is MISSING:
+            if key not in self._FIELDS:
+                raise KeyError(key)
+            view = self._views[key] = _freeze(self._FIELDS[key](self))
+        return view
+
+    def get(self, key, default=None):
+        return self[key] if key in self._FIELDS else default
+
+    def keys(self):
+        return self._FIELDS.keys()
+
+    def __contains__(self, key):
+        return key in self._FIELDS
+
+    def __eq__(self, other):
+        if not isinstance(other, Chart):
+            return NotImplemented
+        return self.to_dict() == other.to_dict()
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"Chart(jd={self.jd!r}, lat={self.lat!r}, lon={self.lon!r})"
+
+
+# Charts keyed on the normalized inputs; Chart objects are read-only so a hit
+# can be handed to every caller without copying.
+chart_cache = LRUCache(maxsize=int(os.environ.get("NATAL_CHART_CACHE_SIZE", 2048)))
+
+
+def julian_day(date: str, time: str, tz_offset):
     local = datetime.strptime(f"{date} {time}", "%Y-%m-%d %H:%M")
     utc_time = local - timedelta(hours=tz_offset)
-    jd = swe.julday(utc_time.year, utc_time.month, utc_time.day,
-                    utc_time.hour + utc_time.minute / 60)
-    planet_degrees = {}
-    retrograde_planets = []
-    for name, code in zip(planet_names, planet_codes):
-        pos, ret = swe.calc_ut(jd, code)[0][0], swe.calc_ut(jd, code)[0][3]
-        planet_degrees[name] = round(pos, 2)
-        if ret < 0:
-            retrograde_planets.append(name)
-    cusps, _ = swe.houses(jd, lat, lon, b'P')
-    houses = [round(c, 2) for c in cusps]
-    # Calculate aspects
-    aspects = []
-    for i, (p1, d1) in enumerate(planet_degrees.items()):
-        for j, (p2, d2) in enumerate(planet_degrees.items()):
-            if j <= i:
-                continue
-            diff = abs((d1 - d2 + 180) % 360 - 180)
-            for ang, (nm, sym) in aspect_types.items():
-                if abs(diff - ang) <= orb:
-                    aspects.append({
-                        "between": f"{p1} - {p2}",
-                        "type": nm,
-                        "symbol": sym,
-                        "angle": round(diff, 2)
-                    })
-    # Calculate house rulers
-    sign_rulers = [
-        'Mars', 'Venus', 'Mercury', 'Moon', 'Sun', 'Mercury', 'Venus', 'Pluto',
-        'Jupiter', 'Saturn', 'Uranus', 'Neptune'
-    ]
-    house_rulers = []
-    for i, cusp in enumerate(houses):
-        sign_index = int((cusp // 30) % 12)
-        ruler = sign_rulers[sign_index]
-        ruler_pos = planet_degrees.get(ruler)
-        house_rulers.append({
-            "house": i+1,
-            "sign": sign_index+1,
-            "ruler": ruler,
-            "ruler_degree": ruler_pos
-        })
-    return {"jd": jd, "lat": lat, "lon": lon,
-            "planet_degrees": planet_degrees, "houses": houses, "aspects": aspects, "retrograde_planets": retrograde_planets, "house_rulers": house_rulers}, None
+    return swe.julday(utc_time.year, utc_time.month, utc_time.day,
+                      utc_time.hour + utc_time.minute / 60)
+
+
+def planet_positions(jds, interpolate: bool = False):
+    """Positions of all bodies at one or many Julian days.
+
+    Returns an array of shape ``(len(jds), len(planet_names), 4)`` holding
+    longitude, latitude, distance and longitude speed (see ``LON`` .. ``SPEED``),
+    with one ``swe.calc_ut`` call per body and epoch. With ``interpolate`` the
+    precomputed ephemeris store (``NATAL_EPHEMERIS_STORE``) answers in-range
+    epochs instead; anything out of range still goes to Swiss Ephemeris.
+    """
+    jds = np.atleast_1d(np.asarray(jds, dtype=float))
+    with timer("ephemeris"):
+        if interpolate:
+            store = default_store()
+            if store is not None and store.covers(jds):
+                return store.positions(jds)
+        out = np.empty((len(jds), len(planet_codes), 4))
+        for i, jd in enumerate(jds):
+            for j, code in enumerate(planet_codes):
+                out[i, j] = swe.calc_ut(jd, code)[0][:4]
+        return out
+
+
+def _chart_key(jd: float, lat: float, lon: float, hsys: bytes):
+    return (round(jd, 8), round(lat, 6), round(lon, 6), hsys)
+
+
+def chart_at(jd: float, lat: float, lon: float, hsys: bytes = b'P'):
+    key = _chart_key(jd, lat, lon, hsys)
+    chart = chart_cache.get(key)
+    if chart is None:
+        chart = _compute_chart(jd, lat, lon, hsys)
+        chart_cache.set(key, chart)
+    return chart
+
+
+# A missing tz_offset is only derived from a known zone, never guessed
+TZ_REQUIRED = {"error": "tz_offset required: the time zone of the place is unknown"}
+
+
+def utc_offset(date: str, time: str, place: str, coords=None):
+    """UTC offset in hours for the local date and time at the place (see
+    ``tz_index``), or None when the place or its time zone is unknown."""
+    if coords is None:
+        coords = resolve_place(place)
+        if coords is None:
+            return None
+    return tz_index.utc_offset(*coords, date, time, fallback=lambda: place_index.timezone(place))
+
+
+def _birth_jd(date: str, time: str, place: str, tz_offset, coords):
+    # A missing tz_offset is derived from the coordinates and the local date;
+    # None when the zone there is unknown
+    if tz_offset is None:
+        tz_offset = utc_offset(date, time, place, coords)
+        if tz_offset is None:
+            return None
+    return julian_day(date, time, tz_offset)
+
+
+def _birth_chart(date: str, time: str, place: str, tz_offset, coords):
+    jd = _birth_jd(date, time, place, tz_offset, coords)
+    if jd is None:
+        return None, TZ_REQUIRED
+    return chart_at(jd, *coords), None
+
+
+def calculate_chart(date: str, time: str, place: str, tz_offset=None):
+    coords = resolve_place(place)
+    if coords is None:
+        return None, {"error": "Invalid place name"}
+    return _birth_chart(date, time, place, tz_offset, coords)
+
+
+async def calculate_chart_async(date: str, time: str, place: str, tz_offset=None):
+    coords = await resolve_place_async(place)
+    if coords is None:
+        return None, {"error": "Invalid place name"}
+    # Deriving a missing tz_offset may read the place index: not on the loop
+    return await executors.run_in(executors.cpu, _birth_chart, date, time, place, tz_offset, coords)
+
+
+def calculate_charts(records, chunk_size: int = 512):
+    """``calculate_chart`` for many birth records at once.
+
+    ``records`` is an iterable of dicts with ``date``, ``time``, ``place`` and
+    optionally ``tz_offset``; one ``(chart, err)`` pair is yielded per record, in order.
+    Records are taken ``chunk_size`` at a time: each distinct place in a chunk
+    is resolved once, and the charts missing from the cache share a single
+    ephemeris pass and aspect search.
+    """
+    records = iter(records)
+    while True:
+        chunk = list(islice(records, chunk_size))
+        if not chunk:
+            return
+        yield from _calculate_chunk(chunk)
+
+
+def _calculate_chunk(chunk):
+    coords = {}
+    for record in chunk:
+        if record["place"] not in coords:
+            coords[record["place"]] = resolve_place(record["place"])
+    results = [None] * len(chunk)
+    pending = {}
+    for n, record in enumerate(chunk):
+        place = coords[record["place"]]
+        if place is None:
+            results[n] = (None, {"error": "Invalid place name"})
+            continue
+        try:
+            jd = _birth_jd(record["date"], record["time"], record["place"], record.get("tz_offset"), place)
+        except (TypeError, ValueError):
+            results[n] = (None, {"error": "Invalid date or time"})
+            continue
+        if jd is None:
+            results[n] = (None, TZ_REQUIRED)
+            continue
+        key = _chart_key(jd, *place, b'P')
+        chart = chart_cache.get(key) if key not in pending else None
+        if chart is not None:
+            results[n] = (chart, None)
+        else:
+            pending.setdefault(key, (jd, *place, []))[3].append(n)
+    if not pending:
+        return results
+    todo = list(pending.items())
+    positions = planet_positions([jd for _, (jd, _, _, _) in todo])
+    # Same rounding as _assemble_chart so batched aspects match single charts
+    degrees = [[round(d, 2) for d in row] for row in positions[:, :, LON].tolist()]
+    found = find_aspects(degrees, orbs1=orb)
+    bounds = np.searchsorted(found["epoch"], np.arange(len(todo) + 1))
+    for e, (key, (jd, lat, lon, indices)) in enumerate(todo):
+        with timer("houses"):
+            cusps, _ = swe.houses(jd, lat, lon, b'P')
+        chart = _assemble_chart(jd, lat, lon, positions[e], cusps, found[bounds[e]:bounds[e + 1]])
+        chart_cache.set(key, chart)
+        for n in indices:
+            results[n] = (chart, None)
+    return results
+
+
+def _compute_chart(jd: float, lat: float, lon: float, hsys: bytes):
+    positions = planet_positions(jd)[0]
+    with timer("houses"):
+        cusps, _ = swe.houses(jd, lat, lon, hsys)
+    return _assemble_chart(jd, lat, lon, positions, cusps)
+
+
+def _assemble_chart(jd, lat, lon, positions, cusps, found=None) -> Chart:
+    # Rounded like the JSON output; aspects are found on the rounded degrees
+    degrees = [round(d, 2) for d in positions[:, LON].tolist()]
+    if found is None:
+        found = find_aspects(degrees, orbs1=orb)
+    found = found.copy()
+    found["angle"] = [round(d, 2) for d in found["angle"].tolist()]
+    return Chart(jd, lat, lon, degrees, positions[:, SPEED], [round(c, 2) for c in cusps], found)
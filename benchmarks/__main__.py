@@ -0,0 +1,57 @@
+# benchmarks/__main__.py
+"""Run the benchmark suite: ``python -m benchmarks [--suite micro|macro|all] ...``"""
+import argparse
+import json
+import platform
+import sys
+from datetime import datetime, timezone
+import numpy as np
+from benchmarks.harness import run_cases, compare, format_comparison
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks")
+    parser.add_argument("--suite", choices=("micro", "macro", "all"), default="all")
+    parser.add_argument("--filter", help="only run cases whose name contains this text")
+    parser.add_argument("--repeat", type=int, default=30, help="timed calls per case (slow cases use fewer)")
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="compare against a results JSON file saved earlier")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="flag cases whose median (or peak memory) grew by more than this fraction")
+    args = parser.parse_args(argv)
+
+    results = {}
+    if args.suite in ("micro", "all"):
+        from benchmarks import micro
+        results.update(run_cases(micro.cases(), args.repeat, args.warmup, args.filter, log=print))
+    if args.suite in ("macro", "all"):
+        from benchmarks import macro
+        with macro.cases() as cases:
+            results.update(run_cases(cases, args.repeat, args.warmup, args.filter, log=print))
+
+    report = {
+        "meta": {
+            "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "numpy": np.__version__,
+            "repeat": args.repeat,
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if not args.baseline:
+        return 0
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)["results"]
+    rows = compare(results, baseline, args.threshold)
+    print()
+    print(format_comparison(rows))
+    return 1 if any(row["regression"] for row in rows) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
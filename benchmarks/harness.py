@@ -0,0 +1,106 @@
+# benchmarks/harness.py
+import gc
+import time
+import tracemalloc
+import numpy as np
+
+# A case is slower than the baseline when its median grows by more than the
+# threshold; peak memory additionally has to grow by at least this much.
+MEMORY_SLACK_KIB = 64
+
+
+def measure(fn, repeat: int = 30, warmup: int = 3, setup=None) -> dict:
+    """Time ``repeat`` calls of ``fn()`` after ``warmup`` untimed ones.
+
+    ``setup()`` runs untimed before every call (e.g. to clear caches so each
+    call does the full work). One more call is made under ``tracemalloc`` for
+    the peak memory, so tracing does not slow down the timed calls.
+    """
+    for _ in range(warmup):
+        if setup:
+            setup()
+        fn()
+    samples = []
+    gc.collect()
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    if setup:
+        setup()
+    gc.collect()
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return summarize(samples, peak)
+
+
+def summarize(samples, peak_bytes: int) -> dict:
+    ms = np.asarray(samples, dtype=float) * 1000
+    p50, p90, p99 = np.percentile(ms, [50, 90, 99])
+    return {
+        "n": len(ms),
+        "mean_ms": round(float(ms.mean()), 4),
+        "p50_ms": round(float(p50), 4),
+        "p90_ms": round(float(p90), 4),
+        "p99_ms": round(float(p99), 4),
+        "min_ms": round(float(ms.min()), 4),
+        "max_ms": round(float(ms.max()), 4),
+        "throughput_per_s": round(len(ms) / (ms.sum() / 1000), 2) if ms.sum() else None,
+        "peak_kib": round(peak_bytes / 1024, 1),
+    }
+
+
+def run_cases(cases, repeat: int = 30, warmup: int = 3, pattern: str = None, log=None) -> dict:
+    """Measure every case (``{"name", "fn", "setup"}``) whose name contains ``pattern``."""
+    results = {}
+    for case in cases:
+        if pattern and pattern not in case["name"]:
+            continue
+        results[case["name"]] = measure(case["fn"], case.get("repeat", repeat), warmup, case.get("setup"))
+        if log:
+            log(format_result(case["name"], results[case["name"]]))
+    return results
+
+
+def compare(results: dict, baseline: dict, threshold: float = 0.2) -> list:
+    """One row per case present in both runs, flagging regressions."""
+    rows = []
+    for name, new in results.items():
+        old = baseline.get(name)
+        if old is None:
+            continue
+        ratio = new["p50_ms"] / old["p50_ms"] if old["p50_ms"] else None
+        memory = new["peak_kib"] - old["peak_kib"]
+        rows.append({
+            "name": name,
+            "p50_ms": new["p50_ms"],
+            "baseline_p50_ms": old["p50_ms"],
+            "ratio": round(ratio, 3) if ratio is not None else None,
+            "peak_kib": new["peak_kib"],
+            "baseline_peak_kib": old["peak_kib"],
+            "regression": bool(
+                (ratio is not None and ratio > 1 + threshold)
+                or (memory > MEMORY_SLACK_KIB and new["peak_kib"] > old["peak_kib"] * (1 + threshold))
+            ),
+        })
+    return rows
+
+
+def format_result(name: str, r: dict) -> str:
+    return (f"{name:<40} p50 {r['p50_ms']:>9.3f} ms  p90 {r['p90_ms']:>9.3f}  p99 {r['p99_ms']:>9.3f}"
+            f"  {r['throughput_per_s'] or 0:>9.1f}/s  peak {r['peak_kib']:>9.1f} KiB")
+
+
+def format_comparison(rows: list) -> str:
+    lines = [f"{'case':<40} {'p50 ms':>10} {'base ms':>10} {'ratio':>7} {'peak KiB':>10} {'base KiB':>10}"]
+    for row in rows:
+        lines.append(f"{row['name']:<40} {row['p50_ms']:>10.3f} {row['baseline_p50_ms']:>10.3f} "
+                     f"{row['ratio'] if row['ratio'] is not None else '-':>7} {row['peak_kib']:>10.1f} "
+                     f"{row['baseline_peak_kib']:>10.1f}" + ("  REGRESSION" if row["regression"] else ""))
+    return "\n".join(lines)
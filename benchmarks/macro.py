@@ -0,0 +1,95 @@
+# benchmarks/macro.py
+from contextlib import contextmanager
+import numpy as np
+from fastapi.testclient import TestClient
+from astro_core import planet_names
+from compatibility import default_index
+from main import app
+from benchmarks.micro import NATAL, PARTNER, clear_caches
+
+PROFILES = 10000
+
+
+def _natal(prefix=""):
+    date, time, place, tz_offset = NATAL
+    return {f"{prefix}date": date, f"{prefix}time": time, f"{prefix}place": place, f"{prefix}tz_offset": tz_offset}
+
+
+def _pair():
+    date, time, place, tz_offset = PARTNER
+    return {**{f"{k}1": v for k, v in _natal().items()},
+            "date2": date, "time2": time, "place2": place, "tz_offset2": tz_offset}
+
+
+def _get(client, url, params, **kwargs):
+    def call():
+        resp = client.get(url, params=params, **kwargs)
+        assert resp.status_code == 200, (url, resp.status_code, resp.text[:200])
+        resp.read()
+    return call
+
+
+def _post(client, url, body):
+    def call():
+        resp = client.post(url, json=body)
+        assert resp.status_code == 200, (url, resp.status_code, resp.text[:200])
+    return call
+
+
+@contextmanager
+def cases():
+    """Every route through the test client, each request starting from cold caches."""
+    rng = np.random.default_rng(0)
+    ids = [f"bench-{n}" for n in range(PROFILES)]
+    for profile_id in ids:
+        default_index.add(profile_id, dict(zip(planet_names, rng.uniform(0, 360, len(planet_names)).tolist())))
+    batch = [{**dict(zip(("date", "time", "place", "tz_offset"), NATAL)), "date": f"19{60 + n % 40}-01-01"}
+             for n in range(100)]
+    profiles = [{**record, "id": f"bench-batch-{n}"} for n, record in enumerate(batch)]
+    natal_prefixed = _natal("natal_")
+    try:
+        with TestClient(app) as client:
+            yield [
+                {"name": "GET /natal_chart/calc", "fn": _get(client, "/natal_chart/calc", _natal()),
+                 "setup": clear_caches},
+                {"name": "GET /natal_chart/calc?shape=compact",
+                 "fn": _get(client, "/natal_chart/calc", {**_natal(), "shape": "compact"}), "setup": clear_caches},
+                {"name": "GET /natal_chart/calc (cached)", "fn": _get(client, "/natal_chart/calc", _natal())},
+                {"name": "POST /natal_chart/batch/100", "fn": _post(client, "/natal_chart/batch", batch),
+                 "setup": clear_caches, "repeat": 10},
+                {"name": "GET /natal_chart/image", "fn": _get(client, "/natal_chart/image", _natal()),
+                 "setup": clear_caches, "repeat": 10},
+                {"name": "GET /natal_chart/image?format=svg",
+                 "fn": _get(client, "/natal_chart/image", {**_natal(), "format": "svg"}),
+                 "setup": clear_caches, "repeat": 10},
+                {"name": "GET /synastry", "fn": _get(client, "/synastry", _pair()), "setup": clear_caches},
+                {"name": "GET /synastry/analytics", "fn": _get(client, "/synastry/analytics", _pair()),
+                 "setup": clear_caches},
+                {"name": "GET /synastry/image", "fn": _get(client, "/synastry/image", _pair()),
+                 "setup": clear_caches, "repeat": 10},
+                {"name": "POST /synastry/profiles/100", "fn": _post(client, "/synastry/profiles", profiles),
+                 "setup": clear_caches, "repeat": 10},
+                {"name": f"GET /synastry/search/{PROFILES // 1000}k",
+                 "fn": _get(client, "/synastry/search", _natal()), "setup": clear_caches},
+                {"name": "GET /horary_chart", "fn": _get(client, "/horary_chart", _natal()), "setup": clear_caches},
+                {"name": "GET /transits",
+                 "fn": _get(client, "/transits", {**natal_prefixed, "transit_date": "2024-01-01"}),
+                 "setup": clear_caches},
+                {"name": "GET /weekly_forecast",
+                 "fn": _get(client, "/weekly_forecast", {**_natal(), "start_date": "2024-01-01"}),
+                 "setup": clear_caches},
+                {"name": "GET /forecast/events/30d",
+                 "fn": _get(client, "/forecast/events", {**_natal(), "start_date": "2024-01-01",
+                                                         "end_date": "2024-01-31"}),
+                 "setup": clear_caches, "repeat": 10},
+                {"name": "GET /forecast/ingresses/1y",
+                 "fn": _get(client, "/forecast/ingresses", {"start_date": "2024-01-01", "end_date": "2024-12-31"}),
+                 "repeat": 10},
+                {"name": "GET /forecast/retrogrades/1y",
+                 "fn": _get(client, "/forecast/retrogrades", {"start_date": "2024-01-01", "end_date": "2024-12-31"}),
+                 "repeat": 10},
+                {"name": "GET /cache/stats", "fn": _get(client, "/cache/stats", {})},
+            ]
+    finally:
+        for profile_id in ids + [p["id"] for p in profiles]:
+            default_index.remove(profile_id)
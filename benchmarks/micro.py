@@ -0,0 +1,54 @@
+# benchmarks/micro.py
+import numpy as np
+import astro_core
+import image_cache
+from astro_core import calculate_chart, calculate_charts, planet_names
+from aspects import find_aspects, body_orbs
+from chart_draw import draw_chart
+from compatibility import CompatibilityIndex
+from logic_forecast import get_week_transits
+from logic_synastry import _synastry_aspects, synastry_image
+from relocation import relocation, relocation_geojson
+import swisseph as swe
+
+# Offline fixtures: both places are in OFFLINE_COORDS, so nothing hits the network
+NATAL = ("1990-01-01", "12:00", "Moscow", 3)
+PARTNER = ("1992-02-02", "15:00", "London", 0)
+WEEK_START = swe.julday(2024, 1, 1, 0)
+
+
+def clear_caches():
+    astro_core.chart_cache.clear()
+    image_cache.memory.clear()
+
+
+def cases() -> list:
+    natal, _ = calculate_chart(*NATAL)
+    partner, _ = calculate_chart(*PARTNER)
+    orbs = body_orbs(planet_names)
+    draw_args = (natal["planet_degrees"], natal["houses"], natal.aspect_triples(),
+                 natal["retrograde_planets"], natal["house_rulers"])
+    records = [{"date": f"19{60 + n % 40}-{1 + n % 12:02d}-{1 + n % 28:02d}", "time": "12:00",
+                "place": ("Moscow", "London")[n % 2], "tz_offset": 0} for n in range(200)]
+    rng = np.random.default_rng(0)
+    index = CompatibilityIndex(capacity=10000)
+    for n in range(10000):
+        index.add(f"p{n}", dict(zip(planet_names, rng.uniform(0, 360, len(planet_names)).tolist())))
+
+    return [
+        {"name": "calculate_chart", "fn": lambda: calculate_chart(*NATAL), "setup": clear_caches},
+        {"name": "calculate_chart/cached", "fn": lambda: calculate_chart(*NATAL)},
+        {"name": "calculate_charts/200", "fn": lambda: list(calculate_charts(records)),
+         "setup": clear_caches, "repeat": 10},
+        {"name": "aspects/natal", "fn": lambda: find_aspects(natal.degrees, orbs1=orbs)},
+        {"name": "aspects/synastry", "fn": lambda: _synastry_aspects(natal.degrees, partner.degrees)},
+        {"name": "get_week_transits", "fn": lambda: get_week_transits(natal, WEEK_START)},
+        {"name": "draw_chart/png", "fn": lambda: draw_chart(*draw_args), "repeat": 10},
+        {"name": "synastry_image/png", "fn": lambda: synastry_image(*NATAL, *PARTNER),
+         "setup": clear_caches, "repeat": 10},
+        {"name": "synastry_image/svg", "fn": lambda: synastry_image(*NATAL, *PARTNER, fmt="svg"),
+         "setup": clear_caches, "repeat": 10},
+        {"name": "compatibility/search/10k", "fn": lambda: index.search(natal["planet_degrees"])},
+        {"name": "relocation/global-1deg", "fn": lambda: relocation(natal.jd), "repeat": 20},
+        {"name": "relocation/geojson", "fn": lambda: relocation_geojson(natal.jd), "repeat": 20},
+    ]
@@ -1,85 +1,195 @@
-import matplotlib.pyplot as plt
-import numpy as np
 import io
+import threading
+import numpy as np
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.lines import Line2D
+from matplotlib.patches import Circle
+from PIL import Image
+from metrics import timer
+from aspects import ASPECT_SYMBOLS
+from chart_style import THEMES, aspect_colors, aspect_triples, legend_items, planet_symbols, zodiac
+
+# Rendering is split in two layers: a per (kind, size, theme) template that
+# holds the figure with the static wheel (zodiac ring, legend, outer circle)
+# rendered once into a pixel buffer, and the chart-specific artists (cusps,
+# planets, aspects, rulers) that are drawn on a restored copy of that buffer
+# and removed again. The layout is fixed, so there is no tight-bbox pass.
+FIGSIZE = (10, 8.8)
+DEFAULT_SIZE = 1500
+AXES_RECT = [0.08, 0.9 / 8.8, 0.72, 7.2 / 8.8]
+RMAX = 1.2
+
+
+class _Template:
+    def __init__(self, kind: str, size: int, theme: str):
+        self.colors = colors = THEMES[theme]
+        self.lock = threading.Lock()
+        self.fig = Figure(figsize=FIGSIZE, dpi=size / FIGSIZE[0], facecolor=colors["face"])
+        self.canvas = FigureCanvasAgg(self.fig)
+        ax = self.ax = self.fig.add_axes(AXES_RECT, projection='polar', facecolor=colors["face"])
+        ax.set_theta_zero_location("E")
+        ax.set_theta_direction(-1)
+        ax.set_rticks([])
+        ax.set_rlim(0, RMAX)
+        ax.set_autoscale_on(False)
+        ax.tick_params(colors=colors["ink"])
+        ax.grid(color=colors["grid"])
+        ax.spines['polar'].set_color(colors["ink"])
+        for i, (sym, name) in enumerate(zodiac):
+            angle = np.deg2rad(i * 30 + 15)
+            ax.text(angle, 1.33, f"{sym}\n{name}", ha='center', va='center', fontsize=13,
+                    color=colors["elements"][i % 4])
+        if kind == "natal":
+            ax.add_artist(Circle((0, 0), 1.08, transform=ax.transData._b, fill=False,
+                                 color=colors["ink"], lw=1.5))
+        handles = [Line2D([0], [0], color=color, lw=2, label=label) for label, color in legend_items]
+        legend = ax.legend(handles=handles, loc='upper right', bbox_to_anchor=(1.25, 1.05),
+                           fontsize=12, frameon=True, facecolor=colors["face"], labelcolor=colors["ink"],
+                           title='Synastry Aspects' if kind == "synastry" else None)
+        legend.get_title().set_color(colors["ink"])
+        self.canvas.draw()
+        self.background = self.canvas.copy_from_bbox(self.fig.bbox)
+
+    def render(self, layers) -> np.ndarray:
+        with self.lock:
+            self.canvas.restore_region(self.background)
+            artists = layers(self.ax, self.colors)
+            try:
+                for artist in sorted(artists, key=lambda a: a.get_zorder()):
+                    self.ax.draw_artist(artist)
+                return np.array(self.canvas.buffer_rgba())
+            finally:
+                for artist in artists:
+                    artist.remove()
+
+
+_templates = {}
+_templates_lock = threading.Lock()
+
+
+def _template(kind: str, size: int, theme: str) -> _Template:
+    key = (kind, size, theme)
+    template = _templates.get(key)
+    if template is None:
+        with _templates_lock:
+            template = _templates.get(key)
+            if template is None:
+                template = _templates[key] = _Template(kind, size, theme)
+    return template
+
 
-def draw_chart(planet_degrees, houses, aspects, retrograde_planets=None, house_rulers=None):
-    if retrograde_planets is None:
-        retrograde_planets = []
-    planet_symbols = {
-        'Sun': '☉', 'Moon': '☽', 'Mercury': '☿', 'Venus': '♀', 'Mars': '♂',
-        'Jupiter': '♃', 'Saturn': '♄', 'Uranus': '♅', 'Neptune': '♆', 'Pluto': '♇'
-    }
-    aspect_colors = {
-        '☌': 'gray',
-        '✶': 'green',
-        '△': 'blue',
-        '□': 'orange',
-        '☍': 'red'
-    }
-    fig = plt.figure(figsize=(10, 10))
-    ax = fig.add_subplot(111, projection='polar')
-    ax.set_theta_zero_location("E")
-    ax.set_theta_direction(-1)
-    ax.set_rticks([])
-    zodiac = [
-        ('♈', 'Aries', 'red'), ('♉', 'Taurus', 'green'), ('♊', 'Gemini', 'gold'),
-        ('♋', 'Cancer', 'blue'), ('♌', 'Leo', 'red'), ('♍', 'Virgo', 'green'),
-        ('♎', 'Libra', 'gold'), ('♏', 'Scorpio', 'blue'), ('♐', 'Sagittarius', 'red'),
-        ('♑', 'Capricorn', 'green'), ('♒', 'Aquarius', 'gold'), ('♓', 'Pisces', 'blue')
-    ]
-    for i, (sym, name, color) in enumerate(zodiac):
-        angle = np.deg2rad(i * 30 + 15)
-        ax.text(angle, 1.33, f"{sym}\n{name}", ha='center', va='center', fontsize=13, color=color)
-    key_points = {0: "ASC", 3: "IC", 6: "DSC", 9: "MC"}
-    for i in range(12):
-        a = np.deg2rad(houses[i])
-        label = key_points.get(i, str(i+1))
-        ax.plot([a, a], [0, 1.08], color='grey', lw=1, linestyle='--')
-        ax.text(a, 0.7, label, ha='center', va='center', fontsize=11, color='dimgray', weight='bold')
-    circle = plt.Circle((0, 0), 1.08, transform=ax.transData._b, fill=False, color="black", lw=1.5)
-    ax.add_artist(circle)
-    mapping = {}
-    for idx, (name, deg) in enumerate(planet_degrees.items()):
-        ang = np.deg2rad(deg)
-        is_retro = name in retrograde_planets
-        r_offset = 1.0 - idx * 0.04
-        ax.text(ang, r_offset, planet_symbols[name], ha='center', va='center', fontsize=10, color='darkred' if is_retro else 'navy', fontweight='bold', rotation=0, rotation_mode='anchor')
-        ax.text(ang, r_offset - 0.06, name, ha='center', va='top', fontsize=8, color='darkred' if is_retro else 'navy', rotation=0, rotation_mode='anchor')
-        ax.text(ang, r_offset - 0.10, f"{deg:.1f}°", ha='center', va='top', fontsize=4, color='darkred' if is_retro else 'navy', rotation=0, rotation_mode='anchor')
-        if is_retro:
-            ax.text(ang, r_offset - 0.135, "℞", ha='center', va='top', fontsize=7, color='darkred', rotation=0, rotation_mode='anchor')
-        mapping[name] = ang
-    for asp in aspects:
-        p1, p2 = [s.strip() for s in asp["between"].split("-")]
-        a1, a2 = mapping.get(p1), mapping.get(p2)
-        if a1 is not None and a2 is not None:
-            color = aspect_colors.get(asp["symbol"], 'black')
-            ax.plot([a1, a2], [1.0, 1.0], color=color, lw=1, alpha=0.8)
+def warm_up(sizes=(DEFAULT_SIZE,), themes=("light",)):
+    for size in sizes:
+        for theme in themes:
+            _template("natal", size, theme)
+            _template("synastry", size, theme)
+
+
+def encode_image(rgba: np.ndarray, fmt: str = "png") -> bytes:
+    with timer("encode"):
+        buf = io.BytesIO()
+        Image.fromarray(rgba[..., :3]).save(buf, format=fmt.upper())
+        return buf.getvalue()
+
+
+def _natal_layers(planet_degrees, houses, aspects, retrograde_planets, house_rulers):
+    def layers(ax, colors):
+        artists = []
+        key_points = {0: "ASC", 3: "IC", 6: "DSC", 9: "MC"}
+        for i in range(12):
+            a = np.deg2rad(houses[i])
+            label = key_points.get(i, str(i+1))
+            artists += ax.plot([a, a], [0, 1.08], color=colors["house"], lw=1, linestyle='--')
+            artists.append(ax.text(a, 0.7, label, ha='center', va='center', fontsize=11,
+                                   color=colors["house_label"], weight='bold'))
+        for idx, (name, deg) in enumerate(planet_degrees.items()):
+            ang = np.deg2rad(deg)
+            color = colors["retrograde"] if name in retrograde_planets else colors["planet"]
+            r_offset = 1.0 - idx * 0.04
+            artists.append(ax.text(ang, r_offset, planet_symbols[name], ha='center', va='center',
+                                   fontsize=10, color=color, fontweight='bold'))
+            artists.append(ax.text(ang, r_offset - 0.06, name, ha='center', va='top', fontsize=8, color=color))
+            artists.append(ax.text(ang, r_offset - 0.10, f"{deg:.1f}°", ha='center', va='top',
+                                   fontsize=4, color=color))
+            if name in retrograde_planets:
+                artists.append(ax.text(ang, r_offset - 0.135, "℞", ha='center', va='top', fontsize=7,
+                                       color=colors["retrograde"]))
+        degrees = list(planet_degrees.values())
+        for i, j, k in aspect_triples(planet_degrees, aspects):
+            color = aspect_colors[k]
+            a1, a2 = np.deg2rad(degrees[i]), np.deg2rad(degrees[j])
+            artists += ax.plot([a1, a2], [1.0, 1.0], color=color, lw=1, alpha=0.8)
             mid = (a1 + a2) / 2
-            ax.text(mid, 0.9, asp["symbol"], fontsize=14, ha='center', va='center', color=color, weight='bold')
-    if house_rulers:
-        for hr in house_rulers:
+            artists.append(ax.text(mid, 0.9, ASPECT_SYMBOLS[k], fontsize=14, ha='center', va='center',
+                                   color=color, weight='bold'))
+        for hr in house_rulers or []:
             if hr['ruler_degree'] is not None:
                 ang = np.deg2rad(hr['ruler_degree'])
-                ax.plot(ang, 1.13, marker='*', color='purple', markersize=10, zorder=10)
-                ax.text(ang, 1.16, hr['ruler'], ha='center', va='bottom', fontsize=9, color='purple', fontweight='bold')
-                ax.text(ang, 1.19, f"{hr['house']}", ha='center', va='bottom', fontsize=7, color='purple')
-    import matplotlib
-    legend_items = [
-        ("☌ Conjunction", 'gray'),
-        ("✶ Sextile", 'green'),
-        ("△ Trine", 'blue'),
-        ("□ Square", 'orange'),
-        ("☍ Opposition", 'red')
-    ]
-    legend_handles = [
-        matplotlib.pyplot.Line2D([0], [0], color=color, lw=2, label=label)
-        for label, color in legend_items
-    ]
-    ax.legend(handles=legend_handles, loc='upper right', bbox_to_anchor=(1.25, 1.05), fontsize=12, frameon=True)
-    plt.tight_layout()
-    buf = io.BytesIO()
-    plt.savefig(buf, format='png', dpi=150, bbox_inches='tight')
-    plt.close(fig)
-    buf.seek(0)
-    return buf.read()
+                artists += ax.plot(ang, 1.13, marker='*', color=colors["ruler"], markersize=10, zorder=10)
+                artists.append(ax.text(ang, 1.16, hr['ruler'], ha='center', va='bottom', fontsize=9,
+                                       color=colors["ruler"], fontweight='bold'))
+                artists.append(ax.text(ang, 1.19, f"{hr['house']}", ha='center', va='bottom', fontsize=7,
+                                       color=colors["ruler"]))
+        return artists
+    return layers
+
+
+def _synastry_layers(planet_degrees1, houses1, planet_degrees2, houses2, aspects):
+    def layers(ax, colors):
+        artists = []
+        for i in range(12):
+            a = np.deg2rad(houses1[i])
+            artists += ax.plot([a, a], [0, 1.08], color=colors["house"], lw=1, linestyle='--', alpha=0.7)
+            artists.append(ax.text(a, 0.7, str(i+1), ha='center', va='center', fontsize=10,
+                                   color=colors["house_label"]))
+        for i in range(12):
+            a = np.deg2rad(houses2[i])
+            artists += ax.plot([a, a], [1.09, 1.18], color=colors["house2"], lw=1, linestyle=':', alpha=0.7)
+            artists.append(ax.text(a, 1.21, str(i+1), ha='center', va='center', fontsize=9,
+                                   color=colors["house2"]))
+        for idx, (name, deg) in enumerate(planet_degrees1.items()):
+            ang = np.deg2rad(deg)
+            r = 0.98 - idx * 0.01
+            artists.append(ax.text(ang, r, planet_symbols[name], ha='center', va='center', fontsize=13,
+                                   color=colors["planet"], fontweight='bold'))
+            artists.append(ax.text(ang, r-0.045, name, ha='center', va='top', fontsize=8, color=colors["planet"]))
+            artists.append(ax.text(ang, r-0.075, f"{deg:.1f}°", ha='center', va='top', fontsize=5,
+                                   color=colors["planet"]))
+        for idx, (name, deg) in enumerate(planet_degrees2.items()):
+            ang = np.deg2rad(deg)
+            r = 1.12 - idx * 0.01
+            artists.append(ax.text(ang, r, planet_symbols[name], ha='center', va='center', fontsize=13,
+                                   color=colors["planet2"], fontweight='bold'))
+            artists.append(ax.text(ang, r+0.045, name, ha='center', va='bottom', fontsize=8,
+                                   color=colors["planet2"]))
+            artists.append(ax.text(ang, r+0.075, f"{deg:.1f}°", ha='center', va='bottom', fontsize=5,
+                                   color=colors["planet2"]))
+        deg1, deg2 = list(planet_degrees1.values()), list(planet_degrees2.values())
+        for i, j, k in aspects:
+            color = aspect_colors[k]
+            a1 = np.deg2rad(deg1[i])
+            a2 = np.deg2rad(deg2[j])
+            artists += ax.plot([a1, a2], [0.98, 1.12], color=color, lw=1.5, alpha=0.7)
+            mid = (a1 + a2) / 2
+            artists.append(ax.text(mid, 1.05, ASPECT_SYMBOLS[k], fontsize=15, ha='center', va='center',
+                                   color=color, weight='bold', alpha=0.7))
+        return artists
+    return layers
+
+
+def draw_chart(planet_degrees, houses, aspects, retrograde_planets=None, house_rulers=None,
+               size=DEFAULT_SIZE, theme="light", fmt="png"):
+    layers = _natal_layers(planet_degrees, houses, aspects, retrograde_planets or [], house_rulers)
+    with timer("draw"):
+        rgba = _template("natal", size, theme).render(layers)
+    return encode_image(rgba, fmt)
+
+
+def draw_synastry_chart(planet_degrees1, houses1, planet_degrees2, houses2, aspects,
+                        size=DEFAULT_SIZE, theme="light", fmt="png"):
+    # aspects: iterable of (i, j, aspect index) into the two planet lists
+    layers = _synastry_layers(planet_degrees1, houses1, planet_degrees2, houses2, aspects)
+    with timer("draw"):
+        rgba = _template("synastry", size, theme).render(layers)
+    return encode_image(rgba, fmt)
@@ -0,0 +1,60 @@
+# chart_style.py
+# Glyphs and colour themes shared by the raster (chart_draw) and SVG
+# (chart_svg) renderers.
+from aspects import ASPECT_SYMBOLS
+
+planet_symbols = {
+    'Sun': '☉', 'Moon': '☽', 'Mercury': '☿', 'Venus': '♀', 'Mars': '♂',
+    'Jupiter': '♃', 'Saturn': '♄', 'Uranus': '♅', 'Neptune': '♆', 'Pluto': '♇'
+}
+zodiac = [
+    ('♈', 'Aries'), ('♉', 'Taurus'), ('♊', 'Gemini'), ('♋', 'Cancer'),
+    ('♌', 'Leo'), ('♍', 'Virgo'), ('♎', 'Libra'), ('♏', 'Scorpio'),
+    ('♐', 'Sagittarius'), ('♑', 'Capricorn'), ('♒', 'Aquarius'), ('♓', 'Pisces')
+]
+# Indexed like aspects.ASPECTS
+aspect_colors = ['gray', 'green', 'orange', 'blue', 'red']
+legend_items = [
+    ("☌ Conjunction", 'gray'),
+    ("✶ Sextile", 'green'),
+    ("△ Trine", 'blue'),
+    ("□ Square", 'orange'),
+    ("☍ Opposition", 'red')
+]
+
+THEMES = {
+    "light": {
+        "face": "white", "ink": "black", "grid": "#b0b0b0",
+        "house": "grey", "house_label": "dimgray", "house2": "slateblue",
+        "planet": "navy", "retrograde": "darkred", "planet2": "crimson", "ruler": "purple",
+        "elements": ["red", "green", "gold", "blue"],
+    },
+    "dark": {
+        "face": "#14161c", "ink": "#e6e6e6", "grid": "#4b505c",
+        "house": "#8a8f99", "house_label": "#c0c4cc", "house2": "#a49cff",
+        "planet": "#8fb8ff", "retrograde": "#ff8a80", "planet2": "#ff7a9a", "ruler": "#d1a3ff",
+        "elements": ["#ff6b6b", "#6bd96b", "#ffd84d", "#6bb4ff"],
+    },
+}
+
+IMAGE_MEDIA_TYPES = {
+    "png": "image/png",
+    "webp": "image/webp",
+    "svg": "image/svg+xml",
+}
+
+
+def aspect_triples(planet_degrees, aspects):
+    # Natal aspects as (i, j, aspect index) into planet_degrees and ASPECTS.
+    # The JSON form ({"between": "Sun - Moon", "symbol": ...}) is still
+    # accepted from older callers.
+    names = list(planet_degrees)
+    triples = []
+    for asp in aspects:
+        if not isinstance(asp, dict):
+            triples.append(tuple(asp))
+            continue
+        p1, p2 = [s.strip() for s in asp["between"].split("-")]
+        if p1 in planet_degrees and p2 in planet_degrees and asp["symbol"] in ASPECT_SYMBOLS:
+            triples.append((names.index(p1), names.index(p2), ASPECT_SYMBOLS.index(asp["symbol"])))
+    return triples
@@ -0,0 +1,149 @@
+# chart_svg.py
+import math
+from functools import lru_cache
+from xml.sax.saxutils import escape
+from aspects import ASPECT_SYMBOLS
+from chart_style import THEMES, aspect_colors, aspect_triples, legend_items, planet_symbols, zodiac
+
+# Vector counterpart of chart_draw: the wheel is written straight from the
+# chart data as SVG markup, no matplotlib involved. Geometry mirrors the
+# raster layout in a 1000 x 880 viewBox (radius 1.0 == SCALE units, one
+# matplotlib point == PT units) so both outputs look the same.
+WIDTH, HEIGHT = 1000, 880
+CX, CY = 440, 430
+RMAX = 1.2
+SCALE = 360 / RMAX
+PT = 1000 / 720
+DEFAULT_SIZE = 1500
+FONT = "DejaVu Sans, Segoe UI Symbol, Noto Sans Symbols, sans-serif"
+_BASELINE = {"center": "central", "top": "hanging", "bottom": "text-after-edge"}
+
+
+def _xy(deg, r):
+    a = math.radians(deg)
+    return CX + r * SCALE * math.cos(a), CY + r * SCALE * math.sin(a)
+
+
+def _line(deg1, r1, deg2, r2, color, lw, dash=None, opacity=None):
+    (x1, y1), (x2, y2) = _xy(deg1, r1), _xy(deg2, r2)
+    extra = f' stroke-dasharray="{dash}"' if dash else ""
+    if opacity is not None:
+        extra += f' stroke-opacity="{opacity}"'
+    return (f'<line x1="{x1:.1f}" y1="{y1:.1f}" x2="{x2:.1f}" y2="{y2:.1f}" '
+            f'stroke="{color}" stroke-width="{lw * PT:.2f}"{extra}/>')
+
+
+def _text_at(x, y, text, size, color, va="center", bold=False, opacity=None):
+    extra = ' font-weight="bold"' if bold else ""
+    if opacity is not None:
+        extra += f' fill-opacity="{opacity}"'
+    return (f'<text x="{x:.1f}" y="{y:.1f}" font-size="{size * PT:.1f}" fill="{color}" '
+            f'dominant-baseline="{_BASELINE[va]}"{extra}>{escape(text)}</text>')
+
+
+def _text(deg, r, text, size, color, va="center", bold=False, opacity=None):
+    x, y = _xy(deg, r)
+    return _text_at(x, y, text, size, color, va, bold, opacity)
+
+
+@lru_cache(maxsize=None)
+def _background(kind: str, theme: str) -> str:
+    colors = THEMES[theme]
+    parts = [
+        f'<rect width="{WIDTH}" height="{HEIGHT}" fill="{colors["face"]}"/>',
+        f'<circle cx="{CX}" cy="{CY}" r="{RMAX * SCALE}" fill="none" stroke="{colors["ink"]}" '
+        f'stroke-width="{PT:.2f}"/>',
+    ]
+    for deg in range(0, 360, 45):
+        parts.append(_line(deg, 0, deg, RMAX, colors["grid"], 0.8))
+        parts.append(_text(deg, RMAX + 0.07, f"{deg}°", 10, colors["ink"]))
+    for i, (sym, name) in enumerate(zodiac):
+        x, y = _xy(i * 30 + 15, 1.33)
+        color = colors["elements"][i % 4]
+        parts.append(_text_at(x, y - 9 * PT, sym, 13, color))
+        parts.append(_text_at(x, y + 9 * PT, name, 13, color))
+    if kind == "natal":
+        parts.append(f'<circle cx="{CX}" cy="{CY}" r="{1.08 * SCALE:.1f}" fill="none" '
+                     f'stroke="{colors["ink"]}" stroke-width="{1.5 * PT:.2f}"/>')
+    rows = len(legend_items) + (kind == "synastry")
+    x0, y0, w = 800, 35, 180
+    parts.append(f'<rect x="{x0}" y="{y0}" width="{w}" height="{rows * 26 + 12}" rx="4" '
+                 f'fill="{colors["face"]}" stroke="{colors["grid"]}"/>')
+    y = y0 + 19
+    if kind == "synastry":
+        parts.append(f'<text x="{x0 + w / 2}" y="{y}" font-size="{10 * PT:.1f}" fill="{colors["ink"]}" '
+                     f'text-anchor="middle" dominant-baseline="central">Synastry Aspects</text>')
+        y += 26
+    for label, color in legend_items:
+        parts.append(f'<line x1="{x0 + 10}" y1="{y}" x2="{x0 + 40}" y2="{y}" stroke="{color}" '
+                     f'stroke-width="{2 * PT:.2f}"/>')
+        parts.append(f'<text x="{x0 + 50}" y="{y}" font-size="{12 * PT:.1f}" fill="{colors["ink"]}" '
+                     f'text-anchor="start" dominant-baseline="central">{escape(label)}</text>')
+        y += 26
+    return "".join(parts)
+
+
+def _document(kind, theme, size, layers) -> bytes:
+    height = round(size * HEIGHT / WIDTH)
+    return (f'<svg xmlns="http://www.w3.org/2000/svg" width="{size}" height="{height}" '
+            f'viewBox="0 0 {WIDTH} {HEIGHT}" font-family="{FONT}" text-anchor="middle">'
+            f'{_background(kind, theme)}{"".join(layers)}</svg>').encode("utf-8")
+
+
+def natal_svg(planet_degrees, houses, aspects, retrograde_planets=None, house_rulers=None,
+              size=DEFAULT_SIZE, theme="light") -> bytes:
+    colors = THEMES[theme]
+    retrograde_planets = retrograde_planets or []
+    out = []
+    key_points = {0: "ASC", 3: "IC", 6: "DSC", 9: "MC"}
+    for i in range(12):
+        out.append(_line(houses[i], 0, houses[i], 1.08, colors["house"], 1, dash="6 4"))
+        out.append(_text(houses[i], 0.7, key_points.get(i, str(i+1)), 11, colors["house_label"], bold=True))
+    degrees = list(planet_degrees.values())
+    for i, j, k in aspect_triples(planet_degrees, aspects):
+        color = aspect_colors[k]
+        d1, d2 = degrees[i], degrees[j]
+        out.append(_line(d1, 1.0, d2, 1.0, color, 1, opacity=0.8))
+        out.append(_text((d1 + d2) / 2, 0.9, ASPECT_SYMBOLS[k], 14, color, bold=True))
+    for idx, (name, deg) in enumerate(planet_degrees.items()):
+        color = colors["retrograde"] if name in retrograde_planets else colors["planet"]
+        r = 1.0 - idx * 0.04
+        out.append(_text(deg, r, planet_symbols[name], 10, color, bold=True))
+        out.append(_text(deg, r - 0.06, name, 8, color, va="top"))
+        out.append(_text(deg, r - 0.10, f"{deg:.1f}°", 4, color, va="top"))
+        if name in retrograde_planets:
+            out.append(_text(deg, r - 0.135, "℞", 7, colors["retrograde"], va="top"))
+    for hr in house_rulers or []:
+        if hr['ruler_degree'] is not None:
+            deg = hr['ruler_degree']
+            out.append(_text(deg, 1.13, "★", 10, colors["ruler"]))
+            out.append(_text(deg, 1.16, hr['ruler'], 9, colors["ruler"], va="bottom", bold=True))
+            out.append(_text(deg, 1.19, f"{hr['house']}", 7, colors["ruler"], va="bottom"))
+    return _document("natal", theme, size, out)
+
+
+def synastry_svg(planet_degrees1, houses1, planet_degrees2, houses2, aspects,
+                 size=DEFAULT_SIZE, theme="light") -> bytes:
+    colors = THEMES[theme]
+    out = []
+    for i in range(12):
+        out.append(_line(houses1[i], 0, houses1[i], 1.08, colors["house"], 1, dash="6 4", opacity=0.7))
+        out.append(_text(houses1[i], 0.7, str(i+1), 10, colors["house_label"]))
+        out.append(_line(houses2[i], 1.09, houses2[i], 1.18, colors["house2"], 1, dash="1 3", opacity=0.7))
+        out.append(_text(houses2[i], 1.21, str(i+1), 9, colors["house2"]))
+    deg1, deg2 = list(planet_degrees1.values()), list(planet_degrees2.values())
+    for i, j, k in aspects:
+        color = aspect_colors[k]
+        out.append(_line(deg1[i], 0.98, deg2[j], 1.12, color, 1.5, opacity=0.7))
+        out.append(_text((deg1[i] + deg2[j]) / 2, 1.05, ASPECT_SYMBOLS[k], 15, color, bold=True, opacity=0.7))
+    for idx, (name, deg) in enumerate(planet_degrees1.items()):
+        r = 0.98 - idx * 0.01
+        out.append(_text(deg, r, planet_symbols[name], 13, colors["planet"], bold=True))
+        out.append(_text(deg, r - 0.045, name, 8, colors["planet"], va="top"))
+        out.append(_text(deg, r - 0.075, f"{deg:.1f}°", 5, colors["planet"], va="top"))
+    for idx, (name, deg) in enumerate(planet_degrees2.items()):
+        r = 1.12 - idx * 0.01
+        out.append(_text(deg, r, planet_symbols[name], 13, colors["planet2"], bold=True))
+        out.append(_text(deg, r + 0.045, name, 8, colors["planet2"], va="bottom"))
+        out.append(_text(deg, r + 0.075, f"{deg:.1f}°", 5, colors["planet2"], va="bottom"))
+    return _document("synastry", theme, size, out)
@@ -0,0 +1,115 @@
+# compatibility.py
+import threading
+import numpy as np
+from astro_core import planet_names as BODIES
+from aspects import ASPECT_ANGLES, HARMONIOUS, TENSE, PERSONAL_PLANETS, body_flags, body_orbs, separations
+
+# Rows scored per step; keeps the (rows, bodies, bodies) temporaries in cache
+CHUNK = 512
+# Aspect angles are at least 30 degrees apart and orbs are narrower than 15,
+# so a separation can only be within orb of the nearest aspect angle. Look it
+# up by whole degree of separation (0..180).
+_NEAREST = np.searchsorted((ASPECT_ANGLES[1:] + ASPECT_ANGLES[:-1]) / 2, np.arange(181) + 0.5)
+_ANGLE, _HARMONIOUS, _TENSE = ASPECT_ANGLES[_NEAREST], HARMONIOUS[_NEAREST], TENSE[_NEAREST]
+
+
+def score(summary: dict) -> int:
+    # Harmonious aspects count for, tense ones against; aspects between two
+    # personal planets count twice.
+    return (summary["harmonious"] + summary["personal_harmonious"]
+            - summary["tense"] - summary["personal_tense"])
+
+
+class CompatibilityIndex:
+    """Natal longitudes of stored profiles, ranked against a query chart.
+
+    Rows live in one contiguous ``(profiles, bodies)`` matrix; ``search``
+    finds the cross-aspects of the query with every row at once using the
+    same orbs and harmonious/tense/personal rules as ``logic_synastry`` and
+    returns the best ``limit`` profiles with their synastry summaries.
+    """
+
+    def __init__(self, capacity: int = 1024):
+        self._matrix = np.empty((capacity, len(BODIES)))
+        self._ids = []
+        self._rows = {}
+        self._lock = threading.Lock()
+        orbs = body_orbs(BODIES)
+        self._orb = np.maximum.outer(orbs, orbs)
+        personal = body_flags(BODIES, PERSONAL_PLANETS)
+        self._personal = np.logical_and.outer(personal, personal)
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __contains__(self, profile_id):
+        return profile_id in self._rows
+
+    def add(self, profile_id, planet_degrees: dict):
+        row = [planet_degrees[name] for name in BODIES]
+        with self._lock:
+            n = self._rows.get(profile_id)
+            if n is None:
+                n = len(self._ids)
+                if n == len(self._matrix):
+                    grown = np.empty((2 * n, len(BODIES)))
+                    grown[:n] = self._matrix
+                    self._matrix = grown
+                self._ids.append(profile_id)
+                self._rows[profile_id] = n
+            self._matrix[n] = row
+
+    def remove(self, profile_id) -> bool:
+        with self._lock:
+            n = self._rows.pop(profile_id, None)
+            if n is None:
+                return False
+            # Move the last row into the gap to keep the matrix contiguous
+            last = len(self._ids) - 1
+            moved = self._ids.pop()
+            if n != last:
+                self._matrix[n] = self._matrix[last]
+                self._ids[n] = moved
+                self._rows[moved] = n
+            return True
+
+    def _summaries(self, query, rows) -> dict:
+        diff = separations(query, rows)
+        degree = diff.astype(np.intp)
+        diff -= _ANGLE[degree]
+        hit = np.abs(diff, out=diff) <= self._orb
+        harmonious, tense = hit & _HARMONIOUS[degree], hit & _TENSE[degree]
+        n = len(rows)
+        return {
+            "harmonious": np.count_nonzero(harmonious.reshape(n, -1), axis=1),
+            "tense": np.count_nonzero(tense.reshape(n, -1), axis=1),
+            "personal_harmonious": np.count_nonzero(harmonious[:, self._personal], axis=1),
+            "personal_tense": np.count_nonzero(tense[:, self._personal], axis=1),
+            "total": np.count_nonzero(hit.reshape(n, -1), axis=1),
+        }
+
+    def search(self, planet_degrees: dict, limit: int = 10, exclude=()) -> list:
+        query = np.array([planet_degrees[name] for name in BODIES])
+        with self._lock:
+            size = len(self._ids)
+            parts = [self._summaries(query, self._matrix[start:min(start + CHUNK, size)])
+                     for start in range(0, size, CHUNK)]
+            ids = list(self._ids)
+            skip = [self._rows[p] for p in exclude if p in self._rows]
+        if not parts:
+            return []
+        summaries = {key: np.concatenate([p[key] for p in parts]) for key in parts[0]}
+        keep = np.ones(size, dtype=bool)
+        keep[skip] = False
+        scores = score(summaries)
+        # Best score first; ties keep insertion order
+        order = np.lexsort((np.arange(size), -scores))
+        top = order[keep[order]][:max(limit, 0)]
+        return [{
+            "id": ids[n],
+            "score": int(scores[n]),
+            "summary": {key: int(value[n]) for key, value in summaries.items()},
+        } for n in top.tolist()]
+
+
+default_index = CompatibilityIndex()
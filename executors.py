@@ -0,0 +1,45 @@
+# executors.py
+import asyncio
+import contextvars
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+_DONE = object()
+
+# Bounded thread pools the async endpoints hand blocking work to, so the
+# event loop only ever waits on them. Chart math gets its own pool; image
+# requests, which mostly wait on the render processes, get another so a burst
+# of renders cannot starve JSON requests.
+cpu = ThreadPoolExecutor(
+    max_workers=int(os.environ.get("NATAL_CPU_THREADS", os.cpu_count() or 4)),
+    thread_name_prefix="natal-cpu",
+)
+render = ThreadPoolExecutor(
+    max_workers=int(os.environ.get("NATAL_RENDER_THREADS", 8)),
+    thread_name_prefix="natal-render",
+)
+# Blocking I/O off the loop (the SQLite place index), kept apart from the
+# chart math so a slow disk never holds up a CPU thread
+io = ThreadPoolExecutor(
+    max_workers=int(os.environ.get("NATAL_IO_THREADS", 4)),
+    thread_name_prefix="natal-io",
+)
+
+
+async def run_in(executor, fn, *args, **kwargs):
+    # Like asyncio.to_thread, run with a copy of the caller's context so
+    # per-request state (e.g. the metrics stage totals) is visible in the thread
+    context = contextvars.copy_context()
+    return await asyncio.get_running_loop().run_in_executor(
+        executor, partial(context.run, fn, *args, **kwargs))
+
+
+async def iterate_in(executor, items):
+    # Drive a (possibly lazy, CPU-heavy) sync iterator from async code
+    items = iter(items)
+    while True:
+        item = await run_in(executor, next, items, _DONE)
+        if item is _DONE:
+            return
+        yield item
@@ -0,0 +1,199 @@
+# geo_index.py
+import os
+import re
+import sqlite3
+import threading
+import unicodedata
+import zoneinfo
+
+DEFAULT_INDEX_PATH = os.environ.get(
+    "NATAL_PLACE_INDEX",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "places.db"),
+)
+MIN_PREFIX_LENGTH = 3
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS places (
+    name TEXT NOT NULL,
+    lat REAL NOT NULL,
+    lon REAL NOT NULL,
+    population INTEGER NOT NULL DEFAULT 0,
+    timezone TEXT,
+    source TEXT NOT NULL DEFAULT 'geonames',
+    country TEXT
+);
+CREATE INDEX IF NOT EXISTS places_name ON places (name, population DESC);
+"""
+
+
+def normalize_place(name: str) -> str:
+    # "São Paulo, Brazil" and "sao  paulo brazil" map to the same key
+    text = unicodedata.normalize("NFKD", name)
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    text = re.sub(r"[\W_]+", " ", text.casefold())
+    return " ".join(text.split())
+
+
+_countries = None
+
+
+def _tz_table(name: str):
+    # A table from the tz database: the system copy, else the tzdata package
+    for directory in zoneinfo.TZPATH:
+        path = os.path.join(directory, name)
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                return f.read()
+    try:
+        from importlib.resources import files
+        return files("tzdata").joinpath("zoneinfo", name).read_text(encoding="utf-8")
+    except (ImportError, OSError):
+        return ""
+
+
+def country_code(name: str):
+    """ISO 3166 code of a country given by its code or English name ("CH",
+    "Switzerland", "UK", "Britain"), or None."""
+    global _countries
+    if _countries is None:
+        countries, ambiguous = {}, set()
+        for line in _tz_table("iso3166.tab").splitlines():
+            if line.startswith("#") or "\t" not in line:
+                continue
+            code, title = line.split("\t", 1)
+            title = title.replace("&", "and")
+            countries[normalize_place(code)] = code
+            countries[normalize_place(title)] = code
+            # "Britain (UK)" is also "Britain"; "Korea", shared by "Korea
+            # (North)" and "Korea (South)", names neither
+            base = normalize_place(title.partition("(")[0])
+            if countries.setdefault(base, code) != code:
+                ambiguous.add(base)
+        for base in ambiguous:
+            del countries[base]
+        countries.update(usa="US", uk="GB", england="GB", scotland="GB", wales="GB")
+        _countries = countries
+    return _countries.get(normalize_place(name.replace("&", "and")))
+
+
+class PlaceIndex:
+    """Local gazetteer backed by SQLite with a normalized-name index.
+
+    The connection is opened lazily so importing the module never touches the
+    disk, and it is reopened after ``fork`` because SQLite handles must not be
+    shared between processes.
+    """
+
+    def __init__(self, path: str = DEFAULT_INDEX_PATH):
+        self.path = path
+        self._conn = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _connection(self):
+        if self._conn is None or self._pid != os.getpid():
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.executescript(_SCHEMA)
+            if "country" not in {column[1] for column in conn.execute("PRAGMA table_info(places)")}:
+                # Index built before countries were kept
+                conn.execute("ALTER TABLE places ADD COLUMN country TEXT")
+            self._conn, self._pid = conn, os.getpid()
+        return self._conn
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None and self._pid == os.getpid():
+                self._conn.close()
+            self._conn = None
+
+    def _best(self, place: str):
+        # (lat, lon, timezone) of the most populous match, or None
+        key = normalize_place(place)
+        if not key:
+            return None
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute(
+                "SELECT lat, lon, timezone FROM places WHERE name = ? "
+                "ORDER BY population DESC LIMIT 1", (key,)).fetchone()
+            if row is None and len(key) >= MIN_PREFIX_LENGTH:
+                # Range scan on the name index: every gazetteer name starting
+                # with key. Geocoder write-backs only answer exact queries, so
+                # "Paris" never picks up an earlier "Paris, Texas".
+                row = conn.execute(
+                    "SELECT lat, lon, timezone FROM places WHERE name >= ? AND name < ? "
+                    "AND source = 'geonames' ORDER BY population DESC, length(name) LIMIT 1",
+                    (key, key + "\uffff")).fetchone()
+            if row is None and "," in place:
+                # "Paris, France": the gazetteer name in that country. Anything
+                # else after the comma ("Paris, Texas") is left to the geocoder.
+                name = normalize_place(place.split(",", 1)[0])
+                country = country_code(place.rsplit(",", 1)[1])
+                if name and country is not None:
+                    row = conn.execute(
+                        "SELECT lat, lon, timezone FROM places WHERE name = ? AND country = ? "
+                        "AND source = 'geonames' ORDER BY population DESC LIMIT 1",
+                        (name, country)).fetchone()
+        return row
+
+    def lookup(self, place: str):
+        row = self._best(place)
+        return (row[0], row[1]) if row else None
+
+    def timezone(self, place: str):
+        """GeoNames tz database name of the place, when the dump had one."""
+        row = self._best(place)
+        return row[2] if row else None
+
+    def add(self, place: str, lat: float, lon: float, population: int = 0,
+            timezone: str = None, source: str = "geocoder", country: str = None):
+        key = normalize_place(place)
+        if not key:
+            return
+        with self._lock:
+            conn = self._connection()
+            exists = conn.execute(
+                "SELECT 1 FROM places WHERE name = ? AND source = ? AND country IS ? LIMIT 1",
+                (key, source, country)).fetchone()
+            if exists is None:
+                conn.execute(
+                    "INSERT INTO places (name, lat, lon, population, timezone, source, country) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (key, lat, lon, population, timezone, source, country))
+                conn.commit()
+
+    def import_geonames(self, path: str) -> int:
+        # GeoNames cities dump (cities500.txt, cities15000.txt, ...):
+        # tab separated, name=1, asciiname=2, lat=4, lon=5, country=8,
+        # population=14, tz=17
+        rows = []
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                cols = line.rstrip("\n").split("\t")
+                if len(cols) < 18:
+                    continue
+                lat, lon = float(cols[4]), float(cols[5])
+                population = int(cols[14] or 0)
+                tz = cols[17] or None
+                country = cols[8] or None
+                names = {normalize_place(cols[1]), normalize_place(cols[2])}
+                for name in names:
+                    if name:
+                        rows.append((name, lat, lon, population, tz, "geonames", country))
+        with self._lock:
+            conn = self._connection()
+            conn.executemany(
+                "INSERT INTO places (name, lat, lon, population, timezone, source, country) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+            conn.commit()
+        return len(rows)
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Load a GeoNames cities dump into the place index")
+    parser.add_argument("dump", help="Path to cities500.txt / cities15000.txt")
+    parser.add_argument("--index", default=DEFAULT_INDEX_PATH, help="SQLite index path")
+    args = parser.parse_args()
+    count = PlaceIndex(args.index).import_geonames(args.dump)
+    print(f"Imported {count} names into {args.index}")
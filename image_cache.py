@@ -0,0 +1,77 @@
+# image_cache.py
+import hashlib
+import json
+import os
+from fastapi import Response
+from fastapi.responses import JSONResponse
+from cache import LRUCache, DiskCache
+from render_pool import RenderQueueFull, RenderTimeout
+from chart_style import IMAGE_MEDIA_TYPES
+
+# Bump when the rendering output changes so old cache entries and ETags
+# are not served for the new look.
+RENDER_VERSION = 1
+CACHE_CONTROL = f"public, max-age={int(os.environ.get('NATAL_IMAGE_MAX_AGE', 86400))}"
+
+# Rendered images keyed by a hash of the chart data plus render options.
+# The memory tier is bounded by total bytes; the optional disk tier
+# (NATAL_IMAGE_CACHE_DIR) survives restarts and is shared by workers.
+memory = LRUCache(maxsize=100000, maxweight=int(os.environ.get("NATAL_IMAGE_CACHE_BYTES", 64 << 20)))
+_disk_dir = os.environ.get("NATAL_IMAGE_CACHE_DIR")
+disk = DiskCache(_disk_dir, int(os.environ.get("NATAL_IMAGE_CACHE_DISK_BYTES", 512 << 20))) if _disk_dir else None
+
+
+def image_key(kind: str, fmt: str, payload, **options) -> str:
+    blob = json.dumps([RENDER_VERSION, kind, fmt, options, payload],
+                      sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = [t.strip() for t in if_none_match.split(",")]
+    return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+
+def get(key: str, fmt: str):
+    img = memory.get(key)
+    if img is None and disk is not None:
+        img = disk.get(f"{key}.{fmt}")
+        if img is not None:
+            memory.set(key, img)
+    return img
+
+
+def put(key: str, fmt: str, img: bytes):
+    memory.set(key, img)
+    if disk is not None:
+        disk.set(f"{key}.{fmt}", img)
+
+
+def cached_image_response(kind: str, fmt: str, payload, render, if_none_match: str = None, **options):
+    """Serve ``render()`` through the cache with a strong ETag.
+
+    ``payload`` is the JSON-serializable chart data the image is drawn from;
+    a matching ``If-None-Match`` is answered with 304 before any rendering.
+    """
+    key = image_key(kind, fmt, payload, **options)
+    etag = f'"{key[:32]}"'
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    img = get(key, fmt)
+    if img is None:
+        try:
+            img = render()
+        except RenderQueueFull:
+            return JSONResponse({"error": "Image renderer is busy"}, status_code=503,
+                                headers={"Retry-After": "1"})
+        except RenderTimeout:
+            return JSONResponse({"error": "Image rendering timed out"}, status_code=504)
+        put(key, fmt, img)
+    return Response(content=img, media_type=IMAGE_MEDIA_TYPES[fmt], headers=headers)
+
+
+def stats() -> dict:
+    return {"memory": memory.stats(), "disk": disk.stats() if disk is not None else None}
@@ -0,0 +1,51 @@
+# loadtest/__main__.py
+"""Drive a running instance: ``python -m loadtest --url http://127.0.0.1:8000 --rps 10,20,40``"""
+import argparse
+import asyncio
+import json
+import sys
+import httpx
+from loadtest.generator import MIXES, Population, format_summary, parse_mix, run
+
+
+async def _run_steps(args) -> list:
+    mix = parse_mix(args.mix)
+    limits = httpx.Limits(max_connections=args.max_inflight, max_keepalive_connections=args.max_inflight)
+    results = []
+    async with httpx.AsyncClient(base_url=args.url, limits=limits) as client:
+        for rps in args.rps:
+            population = Population(args.places, args.seed)
+            result = await run(client, rps, args.duration, mix, population, args.max_inflight, args.timeout)
+            print(format_summary(result), flush=True)
+            results.append(result)
+            if args.stop_error_rate is not None and result["error_rate"] > args.stop_error_rate:
+                print(f"Stopping: error rate above {args.stop_error_rate:.0%}")
+                break
+    return results
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m loadtest")
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="base URL of the running API")
+    parser.add_argument("--rps", type=lambda s: [float(x) for x in s.split(",")], default=[10.0],
+                        help="target request rate; a comma-separated list runs one step per rate")
+    parser.add_argument("--duration", type=float, default=30, help="seconds per step")
+    parser.add_argument("--mix", default="default",
+                        help=f"one of {', '.join(MIXES)} or kind=weight,... (kinds: natal, synastry, transits, "
+                             "forecast, events, image, synastry_image)")
+    parser.add_argument("--places", type=int, default=200, help="distinct place names in the traffic")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--max-inflight", type=int, default=1000)
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--stop-error-rate", type=float, help="stop stepping up once errors exceed this share")
+    parser.add_argument("--output", help="write the results of every step to this JSON file")
+    args = parser.parse_args(argv)
+    results = asyncio.run(_run_steps(args))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"url": args.url, "mix": parse_mix(args.mix), "steps": results}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
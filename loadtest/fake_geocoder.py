@@ -0,0 +1,127 @@
+# loadtest/fake_geocoder.py
+"""Local stand-in for Nominatim's search API.
+
+``python -m loadtest.fake_geocoder --port 8089 --latency 0.2 --failure-rate 0.05``
+prints the environment to start the API with: ``NATAL_GEOCODER_URL`` pointing
+here and ``NATAL_PLACE_INDEX`` in a throwaway directory (removed on exit), so
+the synthetic places written back by the API never reach the real index.
+Every query resolves to stable coordinates derived from its text, so repeated
+runs see the same places.
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+
+def coordinates(query: str):
+    digest = hashlib.sha256(query.strip().lower().encode("utf-8")).digest()
+    # -55 .. 60: clear of the polar circles, where Placidus houses are undefined
+    lat = int.from_bytes(digest[:4], "big") / 2 ** 32 * 115 - 55
+    lon = int.from_bytes(digest[4:8], "big") / 2 ** 32 * 360 - 180
+    return round(lat, 5), round(lon, 5)
+
+
+class FakeGeocoder(ThreadingHTTPServer):
+    """``latency`` seconds (plus up to ``jitter`` more) per request; a
+    ``failure_rate`` share answers 503 and a ``not_found_rate`` share answers
+    with no results."""
+
+    daemon_threads = True
+
+    def __init__(self, address=("127.0.0.1", 8089), latency: float = 0.0, jitter: float = 0.0,
+                 failure_rate: float = 0.0, not_found_rate: float = 0.0, seed: int = None):
+        super().__init__(address, _Handler)
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.not_found_rate = not_found_rate
+        self.random = random.Random(seed)
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/search"
+
+    def decide(self):
+        with self._lock:
+            self.requests += 1
+            delay = self.latency + self.random.uniform(0, self.jitter)
+            roll = self.random.random()
+        if roll < self.failure_rate:
+            return delay, "fail"
+        if roll < self.failure_rate + self.not_found_rate:
+            return delay, "not_found"
+        return delay, "ok"
+
+    def start(self) -> threading.Thread:
+        thread = threading.Thread(target=self.serve_forever, name="fake-geocoder", daemon=True)
+        thread.start()
+        return thread
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path.rstrip("/") != "/search":
+            return self._send(404, {"error": "not found"})
+        query = parse_qs(url.query).get("q", [""])[0]
+        delay, outcome = self.server.decide()
+        if delay:
+            time.sleep(delay)
+        if outcome == "fail":
+            return self._send(503, {"error": "service unavailable"})
+        if outcome == "not_found" or not query:
+            return self._send(200, [])
+        lat, lon = coordinates(query)
+        self._send(200, [{"lat": str(lat), "lon": str(lon), "display_name": query}])
+
+    def _send(self, status: int, body):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m loadtest.fake_geocoder")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds added to every request")
+    parser.add_argument("--jitter", type=float, default=0.0, help="extra random latency, up to this many seconds")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="share of requests answered with 503")
+    parser.add_argument("--not-found-rate", type=float, default=0.0, help="share of requests with no result")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args(argv)
+    server = FakeGeocoder((args.host, args.port), args.latency, args.jitter,
+                          args.failure_rate, args.not_found_rate, args.seed)
+    scratch = tempfile.mkdtemp(prefix="natal-loadtest-")
+    print(f"Fake geocoder on {server.url}; start the API with\n"
+          f"  NATAL_GEOCODER_URL={server.url} NATAL_PLACE_INDEX={os.path.join(scratch, 'places.db')}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        shutil.rmtree(scratch, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
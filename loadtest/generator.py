@@ -0,0 +1,165 @@
+# loadtest/generator.py
+import asyncio
+import random
+import time
+from collections import Counter, defaultdict
+from datetime import date, timedelta
+import httpx
+import numpy as np
+
+# Relative weights of the request kinds in a run
+MIXES = {
+    "default": {"natal": 35, "synastry": 15, "transits": 15, "forecast": 15, "image": 10, "synastry_image": 5,
+                "events": 5},
+    "json": {"natal": 40, "synastry": 20, "transits": 20, "forecast": 20},
+    "images": {"image": 70, "synastry_image": 30},
+}
+
+
+def parse_mix(text: str) -> dict:
+    """A named mix from ``MIXES`` or ``kind=weight,...``."""
+    if text in MIXES:
+        return MIXES[text]
+    mix = {}
+    for part in text.split(","):
+        kind, _, weight = part.partition("=")
+        if kind.strip() not in SCENARIOS:
+            raise ValueError(f"unknown request kind: {kind.strip()}")
+        mix[kind.strip()] = float(weight or 1)
+    return mix
+
+
+class Population:
+    """Random birth data drawn from a pool of ``places`` place names, so a run
+    mixes geocoder misses with place-cache hits like real traffic does."""
+
+    def __init__(self, places: int = 200, seed: int = None):
+        self.random = random.Random(seed)
+        self.places = [f"Loadtown {n}, Testland" for n in range(places)]
+
+    def person(self, prefix: str = "", suffix: str = "") -> dict:
+        r = self.random
+        return {
+            f"{prefix}date{suffix}": f"{r.randint(1940, 2010)}-{r.randint(1, 12):02d}-{r.randint(1, 28):02d}",
+            f"{prefix}time{suffix}": f"{r.randint(0, 23):02d}:{r.randint(0, 59):02d}",
+            f"{prefix}place{suffix}": r.choice(self.places),
+            f"{prefix}tz_offset{suffix}": r.randint(-10, 12),
+        }
+
+    def day(self, year: int = 2025) -> str:
+        return f"{year}-{self.random.randint(1, 12):02d}-{self.random.randint(1, 28):02d}"
+
+
+def _natal(p):
+    return "/natal_chart/calc", p.person()
+
+
+def _image(p):
+    return "/natal_chart/image", p.person()
+
+
+def _synastry(p):
+    return "/synastry", {**p.person(suffix="1"), **p.person(suffix="2")}
+
+
+def _synastry_image(p):
+    return "/synastry/image", {**p.person(suffix="1"), **p.person(suffix="2")}
+
+
+def _transits(p):
+    return "/transits", {**p.person(prefix="natal_"), "transit_date": p.day(), "transit_time": "12:00"}
+
+
+def _forecast(p):
+    return "/weekly_forecast", {**p.person(), "start_date": p.day()}
+
+
+def _events(p):
+    start = p.day()
+    end = date.fromisoformat(start) + timedelta(days=30)
+    return "/forecast/events", {**p.person(), "start_date": start, "end_date": end.isoformat()}
+
+
+SCENARIOS = {
+    "natal": _natal, "image": _image, "synastry": _synastry, "synastry_image": _synastry_image,
+    "transits": _transits, "forecast": _forecast, "events": _events,
+}
+
+
+def _percentiles(samples) -> dict:
+    if not samples:
+        return {"p50_ms": None, "p90_ms": None, "p99_ms": None, "max_ms": None}
+    ms = np.asarray(samples) * 1000
+    p50, p90, p99 = np.percentile(ms, [50, 90, 99])
+    return {"p50_ms": round(float(p50), 2), "p90_ms": round(float(p90), 2),
+            "p99_ms": round(float(p99), 2), "max_ms": round(float(ms.max()), 2)}
+
+
+async def run(client: httpx.AsyncClient, rps: float, duration: float, mix: dict,
+              population: Population = None, max_inflight: int = 1000, timeout: float = 30.0) -> dict:
+    """Send requests open-loop at ``rps`` for ``duration`` seconds.
+
+    Requests start on schedule whether or not earlier ones have finished, and
+    latency is measured from the scheduled start, so a saturated server shows
+    up as growing latency instead of a silently lower request rate. At most
+    ``max_inflight`` requests are outstanding; beyond that the client queues.
+    """
+    population = population or Population()
+    kinds, weights = list(mix), list(mix.values())
+    latencies = defaultdict(list)
+    statuses = defaultdict(Counter)
+    slots = asyncio.Semaphore(max_inflight)
+
+    async def one(kind, path, params, scheduled):
+        async with slots:
+            try:
+                resp = await client.get(path, params=params, timeout=timeout)
+                await resp.aread()
+                status = resp.status_code
+            except httpx.TimeoutException:
+                status = "timeout"
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+        latencies[kind].append(time.perf_counter() - scheduled)
+        statuses[kind][status] += 1
+
+    loop_start = time.perf_counter()
+    tasks = []
+    total = int(rps * duration)
+    for n in range(total):
+        scheduled = loop_start + n / rps
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        kind = population.random.choices(kinds, weights)[0]
+        tasks.append(asyncio.create_task(one(kind, *SCENARIOS[kind](population), scheduled)))
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - loop_start
+
+    per_kind = {}
+    for kind in sorted(latencies):
+        ok = statuses[kind].get(200, 0)
+        per_kind[kind] = {"requests": sum(statuses[kind].values()), "ok": ok,
+                          "statuses": {str(k): v for k, v in statuses[kind].items()},
+                          **_percentiles(latencies[kind])}
+    everything = [x for samples in latencies.values() for x in samples]
+    ok = sum(k["ok"] for k in per_kind.values())
+    return {
+        "target_rps": rps,
+        "requests": total,
+        "elapsed_s": round(elapsed, 3),
+        "achieved_rps": round(ok / elapsed, 2) if elapsed else None,
+        "error_rate": round(1 - ok / total, 4) if total else 0.0,
+        **_percentiles(everything),
+        "kinds": per_kind,
+    }
+
+
+def format_summary(result: dict) -> str:
+    lines = [f"target {result['target_rps']:>7.1f} rps  achieved {result['achieved_rps'] or 0:>7.1f} rps  "
+             f"errors {result['error_rate']:.1%}  p50 {result['p50_ms']} ms  p90 {result['p90_ms']} ms  "
+             f"p99 {result['p99_ms']} ms"]
+    for kind, k in result["kinds"].items():
+        lines.append(f"  {kind:<16} {k['requests']:>6} req  p50 {k['p50_ms']:>9} ms  p99 {k['p99_ms']:>9} ms  "
+                     f"statuses {k['statuses']}")
+    return "\n".join(lines)
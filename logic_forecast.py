@@ -1,52 +1,45 @@
 # logic_forecast.py
 import swisseph as swe
-from astro_core import calculate_chart
+from astro_core import planet_names, planet_positions, LON
+from aspects import ASPECT_NAMES, ASPECT_SYMBOLS, find_aspects, aspect_rows
+from time_search import aspect_events, body_events, retrograde_periods
+from profiles import natal_chart
 from datetime import datetime
 
 def get_week_transits(natal, start_jd: float, days: int = 7):
-    planet_names = ['Sun', 'Moon', 'Mercury', 'Venus', 'Mars',
-                    'Jupiter', 'Saturn', 'Uranus', 'Neptune', 'Pluto']
-    planet_codes = [swe.SUN, swe.MOON, swe.MERCURY, swe.VENUS, swe.MARS,
-                    swe.JUPITER, swe.SATURN, swe.URANUS, swe.NEPTUNE, swe.PLUTO]
-    aspect_types = {
-        0: ("Conjunction", "☌"),
-        60: ("Sextile", "✶"),
-        90: ("Square", "□"),
-        120: ("Trine", "△"),
-        180: ("Opposition", "☍")
-    }
     orb = 6
+    jds = [start_jd + i for i in range(days)]
+    # Rounded like the reported transit degrees so aspects match the payload
+    longitudes = [[round(d, 2) for d in day]
+                  for day in planet_positions(jds, interpolate=True)[:, :, LON].tolist()]
+    natal_names = list(natal["planet_degrees"])
+    found = find_aspects(longitudes, list(natal["planet_degrees"].values()), orbs1=orb)
+    aspects_by_day = [[] for _ in jds]
+    for day, ti, ni, k, diff in aspect_rows(found):
+        aspects_by_day[day].append({
+            "transit": planet_names[ti],
+            "natal": natal_names[ni],
+            "type": ASPECT_NAMES[k],
+            "symbol": ASPECT_SYMBOLS[k],
+            "angle": round(diff, 2)
+        })
+    cusps = natal["houses"]
     week = []
-    for i in range(days):
-        jd = start_jd + i
-        trans = {n: round(swe.calc_ut(jd, c)[0][0], 2)
-                 for n,c in zip(planet_names, planet_codes)}
-        aspects = []
-        for tn,td in trans.items():
-            for nn,nd in natal["planet_degrees"].items():
-                diff = abs((td-nd+180)%360 -180)
-                for ang,(nm,sym) in aspect_types.items():
-                    if abs(diff-ang) <= orb:
-                        aspects.append({
-                            "transit": tn,
-                            "natal": nn,
-                            "type": nm,
-                            "symbol": sym,
-                            "angle": round(diff,2)
-                        })
+    for jd, day_lons, aspects in zip(jds, longitudes, aspects_by_day):
+        trans = dict(zip(planet_names, day_lons))
         houses = {}
         for p in ["Sun","Mars","Jupiter"]:
             pd = trans[p]
-            for idx,cusp in enumerate(natal["houses"]):
-                nc = natal["houses"][(idx+1)%12]
-                if cusp<=pd<nc or (idx==11 and (pd>=cusp or pd<natal["houses"][0])):
+            for idx,cusp in enumerate(cusps):
+                nc = cusps[(idx+1)%12]
+                if cusp<=pd<nc or (idx==11 and (pd>=cusp or pd<cusps[0])):
                     houses[p] = idx+1
                     break
         week.append({"jd":round(jd,5),"transits":trans,"aspects":aspects,"houses":houses})
     return week
 
-def weekly_forecast(date, time, place, tz_offset, start_date):
-    natal, err = calculate_chart(date, time, place, tz_offset)
+def weekly_forecast(date, time, place, tz_offset, start_date, profile_id=None):
+    natal, err = natal_chart(date, time, place, tz_offset, profile_id)
     if err:
         return err
     sd = datetime.strptime(start_date, "%Y-%m-%d")
@@ -72,3 +65,39 @@ def weekly_forecast(date, time, place, tz_offset, start_date):
         "slow_planets": slow,
         "active_houses": [{"house":h} for h in active]
     }
+
+def _date_range(start_date, end_date):
+    sd = datetime.strptime(start_date, "%Y-%m-%d")
+    ed = datetime.strptime(end_date, "%Y-%m-%d")
+    if ed <= sd:
+        return None, {"error": "end_date must be after start_date"}
+    return (swe.julday(sd.year, sd.month, sd.day, 0), swe.julday(ed.year, ed.month, ed.day, 0)), None
+
+def forecast_events(date, time, place, tz_offset, start_date, end_date, orb=6, profile_id=None):
+    # Returns an error dict or a lazy iterator of aspect events
+    natal, err = natal_chart(date, time, place, tz_offset, profile_id)
+    if err:
+        return err
+    jds, err = _date_range(start_date, end_date)
+    if err:
+        return err
+    return aspect_events(natal["planet_degrees"], *jds, orb)
+
+def ingress_events(start_date, end_date, date=None, time=None, place=None, tz_offset=None, profile_id=None):
+    # Sign ingresses and stations; house ingresses too when a natal chart is given
+    cusps = None
+    if date is not None or profile_id is not None:
+        natal, err = natal_chart(date, time, place, tz_offset, profile_id)
+        if err:
+            return err
+        cusps = natal["houses"]
+    jds, err = _date_range(start_date, end_date)
+    if err:
+        return err
+    return body_events(*jds, cusps=cusps)
+
+def retrogrades(start_date, end_date):
+    jds, err = _date_range(start_date, end_date)
+    if err:
+        return err
+    return {"start_date": start_date, "end_date": end_date, "periods": retrograde_periods(*jds)}
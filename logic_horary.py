@@ -9,5 +9,5 @@ def horary_chart(date, time, place, tz_offset):
         "type": "horary",
         "question_time": f"{date} {time}",
         "place": place,
-        "chart": data
+        "chart": data.to_dict()
     }
@@ -1,21 +1,32 @@
 # logic_natal.py
-from fastapi import Query, Response
-from astro_core import calculate_chart
-from chart_draw import draw_chart
+from profiles import natal_chart
+from chart_svg import natal_svg
+from image_cache import cached_image_response
+from render_pool import Lazy, pool
+from metrics import timer
 
-def natal_chart_calc(date: str, time: str, place: str, tz_offset: int):
-    data, err = calculate_chart(date, time, place, tz_offset)
-    return err or data
+# Imported on the first raster render so JSON-only workers never load matplotlib
+draw_chart = Lazy("chart_draw", "draw_chart")
 
-def natal_chart_image(date: str, time: str, place: str, tz_offset: int):
-    data, err = calculate_chart(date, time, place, tz_offset)
+def natal_chart_calc(date: str, time: str, place: str, tz_offset: float, profile_id: str = None):
+    data, err = natal_chart(date, time, place, tz_offset, profile_id)
+    return err or data.to_dict()
+
+def natal_chart_image(date: str, time: str, place: str, tz_offset: float, fmt: str = "png",
+                      if_none_match: str = None, profile_id: str = None):
+    data, err = natal_chart(date, time, place, tz_offset, profile_id)
     if err:
         return err
-    img = draw_chart(
+    args = (
         data["planet_degrees"],
         data["houses"],
-        data["aspects"],
+        data.aspect_triples(),
         data["retrograde_planets"],
-        data.get("house_rulers")
+        data["house_rulers"]
     )
-    return Response(content=img, media_type="image/png")
+    def render():
+        with timer("render"):
+            if fmt == "svg":
+                return natal_svg(*args)
+            return pool.render(draw_chart, *args, fmt=fmt)
+    return cached_image_response("natal", fmt, args, render, if_none_match)
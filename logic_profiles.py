@@ -0,0 +1,32 @@
+# logic_profiles.py
+from astro_core import calculate_chart, utc_offset
+from profiles import default_store
+
+def create_profile(date, time, place, tz_offset):
+    chart, err = calculate_chart(date, time, place, tz_offset)
+    if err:
+        return err
+    if tz_offset is None:
+        # Store the offset that was used, so the profile replays the same chart
+        tz_offset = utc_offset(date, time, place, (chart.lat, chart.lon))
+    profile_id = default_store().add(chart, date, time, place, tz_offset)
+    return {"profile_id": profile_id, "chart": chart.to_dict()}
+
+def profile_details(profile_id):
+    # None when the profile is unknown
+    store = default_store()
+    chart, birth = store.chart(profile_id), store.birth(profile_id)
+    if chart is None or birth is None:
+        return None
+    date, time, place, tz_offset = birth
+    return {
+        "profile_id": profile_id,
+        "date": date,
+        "time": time,
+        "place": place,
+        "tz_offset": tz_offset,
+        "chart": chart.to_dict()
+    }
+
+def delete_profile(profile_id):
+    return default_store().remove(profile_id)
@@ -0,0 +1,38 @@
+# logic_relocation.py
+from fastapi import Response
+from profiles import natal_chart
+from relocation import MAX_CELLS, grid_size, relocation, relocation_geojson
+from responses import dumps
+from metrics import timer
+
+def _grid_error(lat_min, lat_max, lon_min, lon_max, step):
+    if lat_min > lat_max or lon_min > lon_max:
+        return {"error": "lat_min and lon_min must not exceed lat_max and lon_max"}
+    cells = grid_size(lat_min, lat_max, lon_min, lon_max, step)
+    if cells > MAX_CELLS:
+        return {"error": f"Grid too large: {cells} cells, at most {MAX_CELLS}"}
+    return None
+
+def relocation_map(date, time, place, tz_offset, lat_min=-89.0, lat_max=89.0, lon_min=-180.0, lon_max=180.0,
+                   step=1.0, profile_id=None):
+    err = _grid_error(lat_min, lat_max, lon_min, lon_max, step)
+    if err:
+        return err
+    chart, err = natal_chart(date, time, place, tz_offset, profile_id)
+    if err:
+        return err
+    return relocation(chart.jd, lat_min, lat_max, lon_min, lon_max, step)
+
+def relocation_lines(date, time, place, tz_offset, lat_min=-89.0, lat_max=89.0, lon_min=-180.0, lon_max=180.0,
+                     step=1.0, profile_id=None):
+    # GeoJSON response, or an error dict
+    err = _grid_error(lat_min, lat_max, lon_min, lon_max, step)
+    if err:
+        return err
+    chart, err = natal_chart(date, time, place, tz_offset, profile_id)
+    if err:
+        return err
+    data = relocation_geojson(chart.jd, lat_min, lat_max, lon_min, lon_max, step)
+    with timer("serialize"):
+        content = dumps(data)
+    return Response(content=content, media_type="application/geo+json")
@@ -1,43 +1,47 @@
 # logic_synastry.py
-from fastapi import Response
-from astro_core import calculate_chart
-import matplotlib.pyplot as plt
-import numpy as np
-import io
+from astro_core import calculate_charts, planet_names, utc_offset
+from aspects import (ASPECTS, ASPECT_NAMES, ASPECT_SYMBOLS, HARMONIOUS, TENSE, PERSONAL_PLANETS,
+                     aspect_rows, body_flags, body_orbs, find_aspects)
+from compatibility import default_index
+from profiles import MAX_ID_BYTES, default_store, natal_chart, refresh as refresh_profiles
+from chart_svg import synastry_svg
+from image_cache import cached_image_response
+from render_pool import Lazy, pool
+from metrics import timer
 
-def synastry(date1, time1, place1, tz_offset1, date2, time2, place2, tz_offset2):
-    chart1, err1 = calculate_chart(date1, time1, place1, tz_offset1)
-    chart2, err2 = calculate_chart(date2, time2, place2, tz_offset2)
+# Per-body orbs and personal-planet flags, in planet_names order
+ORBS = body_orbs(planet_names)
+PERSONAL = body_flags(planet_names, PERSONAL_PLANETS).tolist()
+# Imported on the first raster render (see logic_natal.draw_chart)
+draw_synastry_chart = Lazy("chart_draw", "draw_synastry_chart")
+# Compatibility records are stored under their own prefix: their IDs are
+# chosen by the client, so they must never reach the generated IDs of
+# POST /profiles (hex, no colon)
+COMPAT_PREFIX = "compat:"
+
+def _synastry_aspects(degrees1, degrees2):
+    # Cross-aspects as a structured array plus their JSON representation
+    found = find_aspects(degrees1, degrees2, ORBS, ORBS)
+    harmonious, tense = HARMONIOUS.tolist(), TENSE.tolist()
+    return found, [{
+        "between": f"{planet_names[i]} (1) - {planet_names[j]} (2)",
+        "type": ASPECT_NAMES[k],
+        "symbol": ASPECT_SYMBOLS[k],
+        "angle": round(diff, 2),
+        "personal": PERSONAL[i] and PERSONAL[j],
+        "harmonious": harmonious[k],
+        "tense": tense[k]
+    } for _, i, j, k, diff in aspect_rows(found)]
+
+def synastry(date1, time1, place1, tz_offset1, date2, time2, place2, tz_offset2,
+             profile_id1=None, profile_id2=None):
+    chart1, err1 = natal_chart(date1, time1, place1, tz_offset1, profile_id1)
+    chart2, err2 = natal_chart(date2, time2, place2, tz_offset2, profile_id2)
     if err1:
         return err1
     if err2:
         return err2
-    orb_luminaries = 8
-    orb_planets = 6
-    aspect_defs = [
-        (0, "Conjunction", "☌"),
-        (60, "Sextile", "✶"),
-        (90, "Square", "□"),
-        (120, "Trine", "△"),
-        (180, "Opposition", "☍")
-    ]
-    personal_planets = ["Sun", "Moon", "Mercury", "Venus", "Mars"]
-    synastry_aspects = []
-    for p1, d1 in chart1["planet_degrees"].items():
-        for p2, d2 in chart2["planet_degrees"].items():
-            diff = abs((d1 - d2 + 180) % 360 - 180)
-            orb = orb_luminaries if p1 in ["Sun", "Moon"] or p2 in ["Sun", "Moon"] else orb_planets
-            for ang, name, sym in aspect_defs:
-                if abs(diff - ang) <= orb:
-                    synastry_aspects.append({
-                        "between": f"{p1} (1) - {p2} (2)",
-                        "type": name,
-                        "symbol": sym,
-                        "angle": round(diff, 2),
-                        "personal": p1 in personal_planets and p2 in personal_planets,
-                        "harmonious": name in ["Trine", "Sextile"],
-                        "tense": name in ["Square", "Opposition"]
-                    })
+    synastry_aspects = _synastry_aspects(chart1.degrees, chart2.degrees)[1]
     summary = {
         "harmonious": sum(1 for a in synastry_aspects if a["harmonious"]),
         "tense": sum(1 for a in synastry_aspects if a["tense"]),
@@ -52,48 +56,22 @@ def synastry(date1, time1, place1, tz_offset1, date2, time2, place2, tz_offset2)
         "summary": summary
     }
 
-def synastry_analytics(date1, time1, place1, tz_offset1, date2, time2, place2, tz_offset2):
-    chart1, err1 = calculate_chart(date1, time1, place1, tz_offset1)
-    chart2, err2 = calculate_chart(date2, time2, place2, tz_offset2)
+def synastry_analytics(date1, time1, place1, tz_offset1, date2, time2, place2, tz_offset2,
+                       profile_id1=None, profile_id2=None):
+    chart1, err1 = natal_chart(date1, time1, place1, tz_offset1, profile_id1)
+    chart2, err2 = natal_chart(date2, time2, place2, tz_offset2, profile_id2)
     if err1:
         return err1
     if err2:
         return err2
-    orb_luminaries = 8
-    orb_planets = 6
-    aspect_defs = [
-        (0, "Conjunction", "☌"),
-        (60, "Sextile", "✶"),
-        (90, "Square", "□"),
-        (120, "Trine", "△"),
-        (180, "Opposition", "☍")
-    ]
-    personal_planets = ["Sun", "Moon", "Mercury", "Venus", "Mars"]
-    synastry_aspects = []
-    for p1, d1 in chart1["planet_degrees"].items():
-        for p2, d2 in chart2["planet_degrees"].items():
-            diff = abs((d1 - d2 + 180) % 360 - 180)
-            orb = orb_luminaries if p1 in ["Sun", "Moon"] or p2 in ["Sun", "Moon"] else orb_planets
-            for ang, name, sym in aspect_defs:
-                if abs(diff - ang) <= orb:
-                    synastry_aspects.append({
-                        "between": f"{p1} (1) - {p2} (2)",
-                        "type": name,
-                        "symbol": sym,
-                        "angle": round(diff, 2),
-                        "personal": p1 in personal_planets and p2 in personal_planets,
-                        "harmonious": name in ["Trine", "Sextile"],
-                        "tense": name in ["Square", "Opposition"]
-                    })
+    found, synastry_aspects = _synastry_aspects(chart1.degrees, chart2.degrees)
     aspect_matrix = {}
-    for asp in synastry_aspects:
-        p1, p2 = asp["between"].split(" (1) - ")
-        if p1 not in aspect_matrix:
-            aspect_matrix[p1] = {}
-        aspect_matrix[p1][p2.replace(" (2)","")] = asp["symbol"]
+    for _, i, j, k, _ in aspect_rows(found):
+        aspect_matrix.setdefault(planet_names[i], {})[planet_names[j]] = ASPECT_SYMBOLS[k]
     personal_aspects = [a for a in synastry_aspects if a["personal"]]
     if synastry_aspects:
-        most_exact = min(synastry_aspects, key=lambda a: min(abs(a["angle"]-x[0]) for x in aspect_defs if a["symbol"]==x[2]))
+        exact_angles = [ASPECTS[k][0] for k in found["aspect"].tolist()]
+        most_exact = min(zip(synastry_aspects, exact_angles), key=lambda p: abs(p[0]["angle"] - p[1]))[0]
     else:
         most_exact = None
     aspect_type_count = {}
@@ -111,87 +89,60 @@ def synastry_analytics(date1, time1, place1, tz_offset1, date2, time2, place2, t
         "total_aspects": len(synastry_aspects)
     }
 
-def synastry_image(date1, time1, place1, tz_offset1, date2, time2, place2, tz_offset2):
-    chart1, err1 = calculate_chart(date1, time1, place1, tz_offset1)
-    chart2, err2 = calculate_chart(date2, time2, place2, tz_offset2)
+def synastry_image(date1, time1, place1, tz_offset1, date2, time2, place2, tz_offset2, fmt="png",
+                   if_none_match=None, profile_id1=None, profile_id2=None):
+    chart1, err1 = natal_chart(date1, time1, place1, tz_offset1, profile_id1)
+    chart2, err2 = natal_chart(date2, time2, place2, tz_offset2, profile_id2)
     if err1:
         return err1
     if err2:
         return err2
-    fig = plt.figure(figsize=(10, 10))
-    ax = fig.add_subplot(111, projection='polar')
-    ax.set_theta_zero_location("E")
-    ax.set_theta_direction(-1)
-    ax.set_rticks([])
-    zodiac = [
-        ('\u2648', 'Aries', 'red'), ('\u2649', 'Taurus', 'green'), ('\u264A', 'Gemini', 'gold'),
-        ('\u264B', 'Cancer', 'blue'), ('\u264C', 'Leo', 'red'), ('\u264D', 'Virgo', 'green'),
-        ('\u264E', 'Libra', 'gold'), ('\u264F', 'Scorpio', 'blue'), ('\u2650', 'Sagittarius', 'red'),
-        ('\u2651', 'Capricorn', 'green'), ('\u2652', 'Aquarius', 'gold'), ('\u2653', 'Pisces', 'blue')
-    ]
-    for i, (sym, name, color) in enumerate(zodiac):
-        angle = np.deg2rad(i * 30 + 15)
-        ax.text(angle, 1.33, f"{sym}\n{name}", ha='center', va='center', fontsize=13, color=color)
-    for i in range(12):
-        a = np.deg2rad(chart1['houses'][i])
-        ax.plot([a, a], [0, 1.08], color='grey', lw=1, linestyle='--', alpha=0.7)
-        ax.text(a, 0.7, str(i+1), ha='center', va='center', fontsize=10, color='dimgray')
-    for i in range(12):
-        a = np.deg2rad(chart2['houses'][i])
-        ax.plot([a, a], [1.09, 1.18], color='slateblue', lw=1, linestyle=':', alpha=0.7)
-        ax.text(a, 1.21, str(i+1), ha='center', va='center', fontsize=9, color='slateblue')
-    planet_symbols = {
-        'Sun': '\u2609', 'Moon': '\u263D', 'Mercury': '\u263F', 'Venus': '\u2640', 'Mars': '\u2642',
-        'Jupiter': '\u2643', 'Saturn': '\u2644', 'Uranus': '\u2645', 'Neptune': '\u2646', 'Pluto': '\u2647'
+    found = _synastry_aspects(chart1.degrees, chart2.degrees)[0]
+    args = (
+        chart1["planet_degrees"], chart1["houses"],
+        chart2["planet_degrees"], chart2["houses"],
+        list(zip(found["i"].tolist(), found["j"].tolist(), found["aspect"].tolist()))
+    )
+    def render():
+        with timer("render"):
+            if fmt == "svg":
+                return synastry_svg(*args)
+            return pool.render(draw_synastry_chart, *args, fmt=fmt)
+    return cached_image_response("synastry", fmt, args, render, if_none_match)
+
+def synastry_index_add(records, store=None):
+    # records: dicts with "id" plus the calculate_chart arguments. They are
+    # kept in the profile store as "compat:<id>", so every worker and restart
+    # sees them and that ID also works as profile_id elsewhere.
+    store = store or default_store()
+    errors = []
+    entries = []
+    for n, (record, (chart, err)) in enumerate(zip(records, calculate_charts(records))):
+        profile_id = COMPAT_PREFIX + record["id"]
+        if not err and not (record["id"] and len(profile_id.encode("utf-8")) <= MAX_ID_BYTES):
+            err = {"error": f"ID must be 1 to {MAX_ID_BYTES - len(COMPAT_PREFIX)} bytes"}
+        if err:
+            errors.append({"index": n, "id": record["id"], **err})
+            continue
+        tz_offset = record.get("tz_offset")
+        if tz_offset is None:
+            tz_offset = utc_offset(record["date"], record["time"], record["place"], (chart.lat, chart.lon))
+        entries.append((profile_id, chart, record["date"], record["time"], record["place"], tz_offset))
+    store.add_many(entries)
+    return {"indexed": len(entries), "errors": errors, "profiles": len(store)}
+
+def synastry_index_remove(profile_id, store=None):
+    # Only a record added through synastry_index_add; False when unknown
+    return (store or default_store()).remove(COMPAT_PREFIX + profile_id)
+
+def synastry_search(date, time, place, tz_offset, limit=10, index=default_index, profile_id=None):
+    if index is default_index:
+        refresh_profiles()  # profiles stored by other workers
+    chart, err = natal_chart(date, time, place, tz_offset, profile_id)
+    if err:
+        return err
+    return {
+        "person": {"planet_degrees": chart["planet_degrees"]},
+        "profiles": len(index),
+        "matches": index.search(chart["planet_degrees"], limit, exclude=[profile_id] if profile_id else ())
     }
-    for idx, (name, deg) in enumerate(chart1['planet_degrees'].items()):
-        ang = np.deg2rad(deg)
-        r = 0.98 - idx * 0.01
-        ax.text(ang, r, planet_symbols[name], ha='center', va='center', fontsize=13, color='navy', fontweight='bold')
-        ax.text(ang, r-0.045, name, ha='center', va='top', fontsize=8, color='navy')
-        ax.text(ang, r-0.075, f"{deg:.1f}°", ha='center', va='top', fontsize=5, color='navy')
-    for idx, (name, deg) in enumerate(chart2['planet_degrees'].items()):
-        ang = np.deg2rad(deg)
-        r = 1.12 - idx * 0.01
-        ax.text(ang, r, planet_symbols[name], ha='center', va='center', fontsize=13, color='crimson', fontweight='bold')
-        ax.text(ang, r+0.045, name, ha='center', va='bottom', fontsize=8, color='crimson')
-        ax.text(ang, r+0.075, f"{deg:.1f}°", ha='center', va='bottom', fontsize=5, color='crimson')
-    orb_luminaries = 8
-    orb_planets = 6
-    aspect_defs = [
-        (0, "Conjunction", "☌", 'gray'),
-        (60, "Sextile", "✶", 'green'),
-        (90, "Square", "□", 'orange'),
-        (120, "Trine", "△", 'blue'),
-        (180, "Opposition", "☍", 'red')
-    ]
-    for p1, d1 in chart1['planet_degrees'].items():
-        for p2, d2 in chart2['planet_degrees'].items():
-            diff = abs((d1 - d2 + 180) % 360 - 180)
-            orb = orb_luminaries if p1 in ['Sun', 'Moon'] or p2 in ['Sun', 'Moon'] else orb_planets
-            for ang, name, sym, color in aspect_defs:
-                if abs(diff - ang) <= orb:
-                    a1 = np.deg2rad(d1)
-                    a2 = np.deg2rad(d2)
-                    ax.plot([a1, a2], [0.98, 1.12], color=color, lw=1.5, alpha=0.7)
-                    mid = (a1 + a2) / 2
-                    ax.text(mid, 1.05, sym, fontsize=15, ha='center', va='center', color=color, weight='bold', alpha=0.7)
-    import matplotlib
-    legend_items = [
-        ("☌ Conjunction", 'gray'),
-        ("✶ Sextile", 'green'),
-        ("△ Trine", 'blue'),
-        ("□ Square", 'orange'),
-        ("☍ Opposition", 'red')
-    ]
-    legend_handles = [
-        matplotlib.pyplot.Line2D([0], [0], color=color, lw=2, label=label)
-        for label, color in legend_items
-    ]
-    ax.legend(handles=legend_handles, loc='upper right', bbox_to_anchor=(1.25, 1.05), fontsize=12, frameon=True, title='Synastry Aspects')
-    plt.tight_layout()
-    buf = io.BytesIO()
-    plt.savefig(buf, format='png', dpi=150, bbox_inches='tight')
-    plt.close(fig)
-    buf.seek(0)
-    return Response(content=buf.read(), media_type="image/png")
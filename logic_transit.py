@@ -1,38 +1,37 @@
 # logic_transit.py
-from astro_core import calculate_chart
+from astro_core import TZ_REQUIRED, julian_day, utc_offset, planet_names, planet_positions, LON
+from aspects import (ASPECT_NAMES, ASPECT_SYMBOLS, PERSONAL_PLANETS, aspect_rows,
+                     body_flags, body_orbs, find_aspects)
+from profiles import birth_data, natal_chart
 
-def transits(natal_date, natal_time, natal_place, natal_tz_offset, transit_date, transit_time="00:00"):
-    natal, err = calculate_chart(natal_date, natal_time, natal_place, natal_tz_offset)
+def transits(natal_date, natal_time, natal_place, natal_tz_offset, transit_date, transit_time="00:00",
+             profile_id=None):
+    natal, err = natal_chart(natal_date, natal_time, natal_place, natal_tz_offset, profile_id)
     if err:
         return err
-    trans, err2 = calculate_chart(transit_date, transit_time, natal_place, natal_tz_offset)
-    if err2:
-        return err2
-    orb_luminaries = 8
-    orb_planets = 6
-    aspect_defs = [
-        (0, "Conjunction", "☌"),
-        (60, "Sextile", "✶"),
-        (90, "Square", "□"),
-        (120, "Trine", "△"),
-        (180, "Opposition", "☍")
-    ]
-    personal_planets = ["Sun", "Moon", "Mercury", "Venus", "Mars"]
-    transit_aspects = []
-    for tn, td in trans["planet_degrees"].items():
-        for nn, nd in natal["planet_degrees"].items():
-            diff = abs((td - nd + 180) % 360 - 180)
-            orb = orb_luminaries if tn in ["Sun", "Moon"] or nn in ["Sun", "Moon"] else orb_planets
-            for ang, name, sym in aspect_defs:
-                if abs(diff - ang) <= orb:
-                    transit_aspects.append({
-                        "transit": tn,
-                        "natal": nn,
-                        "type": name,
-                        "symbol": sym,
-                        "angle": round(diff, 2),
-                        "personal": tn in personal_planets or nn in personal_planets
-                    })
+    natal_date, natal_time, natal_place, natal_tz_offset = birth_data(
+        natal_date, natal_time, natal_place, natal_tz_offset, profile_id)
+    # Transit time is local to the birth place: without an explicit offset,
+    # take the one in force there on the transit date
+    tz_offset = natal_tz_offset
+    if tz_offset is None:
+        tz_offset = utc_offset(transit_date, transit_time, natal_place, (natal.lat, natal.lon))
+        if tz_offset is None:
+            return TZ_REQUIRED
+    # Only transit longitudes are needed: no second geocode or house calculation
+    jd = julian_day(transit_date, transit_time, tz_offset)
+    degrees = [round(d, 2) for d in planet_positions(jd, interpolate=True)[0, :, LON].tolist()]
+    personal = body_flags(planet_names, PERSONAL_PLANETS).tolist()
+    orbs = body_orbs(planet_names)
+    found = find_aspects(degrees, natal.degrees, orbs, orbs)
+    transit_aspects = [{
+        "transit": planet_names[ti],
+        "natal": planet_names[ni],
+        "type": ASPECT_NAMES[k],
+        "symbol": ASPECT_SYMBOLS[k],
+        "angle": round(diff, 2),
+        "personal": personal[ti] or personal[ni]
+    } for _, ti, ni, k, diff in aspect_rows(found)]
     return {
         "natal": {
             "date": natal_date,
@@ -43,7 +42,7 @@ def transits(natal_date, natal_time, natal_place, natal_tz_offset, transit_date,
         "transit": {
             "date": transit_date,
             "time": transit_time,
-            "planet_degrees": trans["planet_degrees"]
+            "planet_degrees": dict(zip(planet_names, degrees))
         },
         "aspects": transit_aspects
     }
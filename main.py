@@ -1,100 +1,392 @@
-from fastapi import FastAPI, Query, Response
-from fastapi.responses import JSONResponse
+import asyncio
+from contextlib import asynccontextmanager
+from typing import List, Optional
+from fastapi import FastAPI, Header, Query
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from pydantic import BaseModel
 from logic_natal import natal_chart_calc, natal_chart_image
-from logic_synastry import synastry, synastry_analytics, synastry_image
+from logic_synastry import (synastry, synastry_analytics, synastry_image, synastry_index_add,
+                             synastry_index_remove, synastry_search)
+from compatibility import default_index as compatibility_index
 from logic_transit import transits
 from logic_horary import horary_chart
-from astro_core import calculate_chart
-from chart_draw import draw_chart
-from datetime import datetime
-import swisseph as swe
-from logic_forecast import weekly_forecast
+from logic_profiles import create_profile, delete_profile, profile_details
+from logic_relocation import relocation_lines, relocation_map
+from astro_core import (calculate_charts, calculate_chart_async, resolve_place_async, close_geocoder,
+                        place_cache_stats, chart_cache, TZ_REQUIRED)
+import executors
+import image_cache
+import metrics
+import profiles
+import tz_index
+from responses import dumps, respond
+from logic_forecast import weekly_forecast, forecast_events, ingress_events, retrogrades
+from render_pool import WARM_UP, pool as render_pool
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app):
+    render_pool.start()
+    profiles.default_store()
+    if WARM_UP:
+        await render(render_pool.warm_up)
+    yield
+    render_pool.shutdown()
+    await close_geocoder()
+
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(metrics.MetricsMiddleware)
+
+def ndjson(items):
+    # items: a sync iterator, advanced on the CPU pool one item at a time
+    async def lines():
+        async for item in executors.iterate_in(executors.cpu, items):
+            yield dumps(item) + b"\n"
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+async def prepare(*charts):
+    # Resolve the places without blocking the event loop (concurrently when
+    # there are several) and compute the charts on the CPU pool, so the sync
+    # logic function run afterwards only sees cache hits. Returns a 422
+    # response when a tz_offset was left out for a place of unknown zone.
+    results = await asyncio.gather(*(calculate_chart_async(*chart) for chart in charts))
+    if any(err is TZ_REQUIRED for _, err in results):
+        return JSONResponse(TZ_REQUIRED, status_code=422)
+
+async def prepare_people(*people):
+    # people: (profile_id, date, time, place, tz_offset) each. A stored profile
+    # needs no preparing; otherwise date, time and place must be given (a
+    # missing tz_offset is derived). Returns a 422 response when neither is,
+    # or when the offset cannot be derived.
+    births = []
+    for profile_id, *birth in people:
+        if profile_id is None:
+            if None in birth[:3]:
+                return JSONResponse({"error": "profile_id or date, time and place are required"},
+                                    status_code=422)
+            births.append(birth)
+    return await prepare(*births)
+
+async def resolve_places(places):
+    # One at a time: bulk requests must not hammer the public geocoder
+    for place in places:
+        await resolve_place_async(place)
+
+async def cpu(fn, *args):
+    return await executors.run_in(executors.cpu, fn, *args)
+
+async def cpu_respond(accept, shape, fn, *args):
+    # Run the logic function and encode its result on the CPU pool
+    return await cpu(lambda: respond(fn(*args), accept, shape))
+
+async def render(fn, *args):
+    return await executors.run_in(executors.render, fn, *args)
 
 @app.get("/natal_chart/calc")
-def natal_chart_calc_endpoint(
-    date: str = Query(..., description="Birth date in format YYYY-MM-DD"),
-    time: str = Query(..., description="Birth time in format HH:MM"),
-    place: str = Query(..., description="Place of birth (city, country)"),
-    tz_offset: int = Query(..., description="Time zone offset from UTC (e.g., 2 for UTC+2)")
+async def natal_chart_calc_endpoint(
+    date: str = Query(None, description="Birth date in format YYYY-MM-DD"),
+    time: str = Query(None, description="Birth time in format HH:MM"),
+    place: str = Query(None, description="Place of birth (city, country)"),
+    tz_offset: float = Query(None, description="Time zone offset from UTC (e.g., 2 for UTC+2); derived from the place and date when omitted"),
+    profile_id: str = Query(None, description="Profile ID from POST /profiles, in place of the birth data"),
+    shape: str = Query("full", pattern="^(full|compact)$", description="full, or compact to send lists of objects as parallel arrays"),
+    accept: str = Header(None)
 ):
-    return natal_chart_calc(date, time, place, tz_offset)
+    missing = await prepare_people((profile_id, date, time, place, tz_offset))
+    if missing:
+        return missing
+    return await cpu_respond(accept, shape, natal_chart_calc, date, time, place, tz_offset, profile_id)
+
+class Birth(BaseModel):
+    date: str
+    time: str
+    place: str
+    tz_offset: Optional[float] = None
+
+class BirthRecord(Birth):
+    id: Optional[str] = None
+
+@app.post("/natal_chart/batch")
+async def natal_chart_batch_endpoint(records: List[BirthRecord]):
+    # One NDJSON line per record, in request order; a bad record gets an
+    # "error" line instead of failing the batch.
+    await resolve_places({r.place for r in records})
+    def lines():
+        results = calculate_charts(r.model_dump(include={"date", "time", "place", "tz_offset"}) for r in records)
+        for n, (record, (data, err)) in enumerate(zip(records, results)):
+            line = {"index": n, "id": record.id}
+            line.update(err or {"chart": data.to_dict()})
+            yield line
+    return ndjson(lines())
 
 @app.get("/natal_chart/image")
-def natal_chart_image_endpoint(
-    date: str = Query(..., description="Birth date in format YYYY-MM-DD"),
-    time: str = Query(..., description="Birth time in format HH:MM"),
-    place: str = Query(..., description="Place of birth (city, country)"),
-    tz_offset: int = Query(..., description="Time zone offset from UTC (e.g., 2 for UTC+2)")
+async def natal_chart_image_endpoint(
+    date: str = Query(None, description="Birth date in format YYYY-MM-DD"),
+    time: str = Query(None, description="Birth time in format HH:MM"),
+    place: str = Query(None, description="Place of birth (city, country)"),
+    tz_offset: float = Query(None, description="Time zone offset from UTC (e.g., 2 for UTC+2); derived from the place and date when omitted"),
+    profile_id: str = Query(None, description="Profile ID from POST /profiles, in place of the birth data"),
+    fmt: str = Query("png", alias="format", pattern="^(png|svg|webp)$", description="Image format: png, svg or webp"),
+    if_none_match: str = Header(None)
 ):
-    return natal_chart_image(date, time, place, tz_offset)
+    missing = await prepare_people((profile_id, date, time, place, tz_offset))
+    if missing:
+        return missing
+    return await render(natal_chart_image, date, time, place, tz_offset, fmt, if_none_match, profile_id)
 
 @app.get("/synastry")
-def synastry_endpoint(
-    date1: str = Query(..., description="Birth date of person 1 (YYYY-MM-DD)"),
-    time1: str = Query(..., description="Birth time of person 1 (HH:MM)"),
-    place1: str = Query(..., description="Birth place of person 1 (city, country)"),
-    tz_offset1: int = Query(..., description="Time zone offset for person 1 (e.g., 2 for UTC+2)"),
-    date2: str = Query(..., description="Birth date of person 2 (YYYY-MM-DD)"),
-    time2: str = Query(..., description="Birth time of person 2 (HH:MM)"),
-    place2: str = Query(..., description="Birth place of person 2 (city, country)"),
-    tz_offset2: int = Query(..., description="Time zone offset for person 2 (e.g., 2 for UTC+2)")
+async def synastry_endpoint(
+    date1: str = Query(None, description="Birth date of person 1 (YYYY-MM-DD)"),
+    time1: str = Query(None, description="Birth time of person 1 (HH:MM)"),
+    place1: str = Query(None, description="Birth place of person 1 (city, country)"),
+    tz_offset1: float = Query(None, description="Time zone offset for person 1 (e.g., 2 for UTC+2); derived from the place and date when omitted"),
+    date2: str = Query(None, description="Birth date of person 2 (YYYY-MM-DD)"),
+    time2: str = Query(None, description="Birth time of person 2 (HH:MM)"),
+    place2: str = Query(None, description="Birth place of person 2 (city, country)"),
+    tz_offset2: float = Query(None, description="Time zone offset for person 2 (e.g., 2 for UTC+2); derived from the place and date when omitted"),
+    profile_id1: str = Query(None, description="Profile ID of person 1, in place of their birth data"),
+    profile_id2: str = Query(None, description="Profile ID of person 2, in place of their birth data"),
+    shape: str = Query("full", pattern="^(full|compact)$", description="full, or compact to send lists of objects as parallel arrays"),
+    accept: str = Header(None)
 ):
-    return synastry(date1, time1, place1, tz_offset1, date2, time2, place2, tz_offset2)
+    missing = await prepare_people((profile_id1, date1, time1, place1, tz_offset1),
+                                   (profile_id2, date2, time2, place2, tz_offset2))
+    if missing:
+        return missing
+    return await cpu_respond(accept, shape, synastry, date1, time1, place1, tz_offset1, date2, time2, place2, tz_offset2,
+                             profile_id1, profile_id2)
 
 @app.get("/synastry/analytics")
-def synastry_analytics_endpoint(
-    date1: str = Query(..., description="Birth date of person 1 (YYYY-MM-DD)"),
-    time1: str = Query(..., description="Birth time of person 1 (HH:MM)"),
-    place1: str = Query(..., description="Birth place of person 1 (city, country)"),
-    tz_offset1: int = Query(..., description="Time zone offset for person 1 (e.g., 2 for UTC+2)"),
-    date2: str = Query(..., description="Birth date of person 2 (YYYY-MM-DD)"),
-    time2: str = Query(..., description="Birth time of person 2 (HH:MM)"),
-    place2: str = Query(..., description="Birth place of person 2 (city, country)"),
-    tz_offset2: int = Query(..., description="Time zone offset for person 2 (e.g., 2 for UTC+2)")
+async def synastry_analytics_endpoint(
+    date1: str = Query(None, description="Birth date of person 1 (YYYY-MM-DD)"),
+    time1: str = Query(None, description="Birth time of person 1 (HH:MM)"),
+    place1: str = Query(None, description="Birth place of person 1 (city, country)"),
+    tz_offset1: float = Query(None, description="Time zone offset for person 1 (e.g., 2 for UTC+2); derived from the place and date when omitted"),
+    date2: str = Query(None, description="Birth date of person 2 (YYYY-MM-DD)"),
+    time2: str = Query(None, description="Birth time of person 2 (HH:MM)"),
+    place2: str = Query(None, description="Birth place of person 2 (city, country)"),
+    tz_offset2: float = Query(None, description="Time zone offset for person 2 (e.g., 2 for UTC+2); derived from the place and date when omitted"),
+    profile_id1: str = Query(None, description="Profile ID of person 1, in place of their birth data"),
+    profile_id2: str = Query(None, description="Profile ID of person 2, in place of their birth data"),
+    shape: str = Query("full", pattern="^(full|compact)$", description="full, or compact to send lists of objects as parallel arrays"),
+    accept: str = Header(None)
 ):
-    return synastry_analytics(date1, time1, place1, tz_offset1, date2, time2, place2, tz_offset2)
+    missing = await prepare_people((profile_id1, date1, time1, place1, tz_offset1),
+                                   (profile_id2, date2, time2, place2, tz_offset2))
+    if missing:
+        return missing
+    return await cpu_respond(accept, shape, synastry_analytics, date1, time1, place1, tz_offset1, date2, time2, place2, tz_offset2,
+                             profile_id1, profile_id2)
 
 @app.get("/synastry/image")
-def synastry_image_endpoint(
-    date1: str = Query(..., description="Birth date of person 1 (YYYY-MM-DD)"),
-    time1: str = Query(..., description="Birth time of person 1 (HH:MM)"),
-    place1: str = Query(..., description="Birth place of person 1 (city, country)"),
-    tz_offset1: int = Query(..., description="Time zone offset for person 1 (e.g., 2 for UTC+2)"),
-    date2: str = Query(..., description="Birth date of person 2 (YYYY-MM-DD)"),
-    time2: str = Query(..., description="Birth time of person 2 (HH:MM)"),
-    place2: str = Query(..., description="Birth place of person 2 (city, country)"),
-    tz_offset2: int = Query(..., description="Time zone offset for person 2 (e.g., 2 for UTC+2)")
+async def synastry_image_endpoint(
+    date1: str = Query(None, description="Birth date of person 1 (YYYY-MM-DD)"),
+    time1: str = Query(None, description="Birth time of person 1 (HH:MM)"),
+    place1: str = Query(None, description="Birth place of person 1 (city, country)"),
+    tz_offset1: float = Query(None, description="Time zone offset for person 1 (e.g., 2 for UTC+2); derived from the place and date when omitted"),
+    date2: str = Query(None, description="Birth date of person 2 (YYYY-MM-DD)"),
+    time2: str = Query(None, description="Birth time of person 2 (HH:MM)"),
+    place2: str = Query(None, description="Birth place of person 2 (city, country)"),
+    tz_offset2: float = Query(None, description="Time zone offset for person 2 (e.g., 2 for UTC+2); derived from the place and date when omitted"),
+    profile_id1: str = Query(None, description="Profile ID of person 1, in place of their birth data"),
+    profile_id2: str = Query(None, description="Profile ID of person 2, in place of their birth data"),
+    fmt: str = Query("png", alias="format", pattern="^(png|svg|webp)$", description="Image format: png, svg or webp"),
+    if_none_match: str = Header(None)
 ):
-    return synastry_image(date1, time1, place1, tz_offset1, date2, time2, place2, tz_offset2)
+    missing = await prepare_people((profile_id1, date1, time1, place1, tz_offset1),
+                                   (profile_id2, date2, time2, place2, tz_offset2))
+    if missing:
+        return missing
+    return await render(synastry_image, date1, time1, place1, tz_offset1, date2, time2, place2, tz_offset2,
+                        fmt, if_none_match, profile_id1, profile_id2)
+
+@app.post("/profiles")
+async def profile_create_endpoint(birth: Birth):
+    # Computes the natal chart once; its ID then stands in for the birth data
+    missing = await prepare((birth.date, birth.time, birth.place, birth.tz_offset))
+    if missing:
+        return missing
+    return await cpu(create_profile, birth.date, birth.time, birth.place, birth.tz_offset)
+
+@app.get("/profiles/{profile_id}")
+async def profile_endpoint(profile_id: str):
+    details = await cpu(profile_details, profile_id)
+    if details is None:
+        return JSONResponse({"error": "Unknown profile"}, status_code=404)
+    return details
+
+@app.delete("/profiles/{profile_id}")
+async def profile_delete_endpoint(profile_id: str):
+    if not await cpu(delete_profile, profile_id):
+        return JSONResponse({"error": "Unknown profile"}, status_code=404)
+    return {"deleted": profile_id}
+
+class ProfileRecord(BaseModel):
+    id: str
+    date: str
+    time: str
+    place: str
+    tz_offset: Optional[float] = None
+
+@app.post("/synastry/profiles")
+async def synastry_profiles_endpoint(records: List[ProfileRecord]):
+    await resolve_places({r.place for r in records})
+    return await cpu(synastry_index_add, [r.model_dump() for r in records])
+
+@app.delete("/synastry/profiles/{profile_id}")
+async def synastry_profile_delete_endpoint(profile_id: str):
+    if not await cpu(synastry_index_remove, profile_id):
+        return JSONResponse({"error": "Unknown profile"}, status_code=404)
+    return {"profiles": len(profiles.default_store())}
+
+@app.get("/synastry/search")
+async def synastry_search_endpoint(
+    date: str = Query(None, description="Birth date in format YYYY-MM-DD"),
+    time: str = Query(None, description="Birth time in format HH:MM"),
+    place: str = Query(None, description="Place of birth (city, country)"),
+    tz_offset: float = Query(None, description="Time zone offset from UTC (e.g., 2 for UTC+2); derived from the place and date when omitted"),
+    profile_id: str = Query(None, description="Profile ID from POST /profiles, in place of the birth data (it is left out of the matches)"),
+    limit: int = Query(10, ge=1, le=1000, description="Number of best matches to return"),
+    shape: str = Query("full", pattern="^(full|compact)$", description="full, or compact to send lists of objects as parallel arrays"),
+    accept: str = Header(None)
+):
+    missing = await prepare_people((profile_id, date, time, place, tz_offset))
+    if missing:
+        return missing
+    return await cpu_respond(accept, shape, synastry_search, date, time, place, tz_offset, limit,
+                             compatibility_index, profile_id)
 
 @app.get("/horary_chart")
-def horary_chart_endpoint(
+async def horary_chart_endpoint(
     date: str = Query(..., description="Date of the question (YYYY-MM-DD)"),
     time: str = Query(..., description="Time of the question (HH:MM)"),
     place: str = Query(..., description="Place where the question was asked (city, country)"),
-    tz_offset: int = Query(..., description="Time zone offset from UTC (e.g., 3 for Moscow)")
+    tz_offset: float = Query(None, description="Time zone offset from UTC (e.g., 3 for Moscow); derived from the place and date when omitted"),
+    shape: str = Query("full", pattern="^(full|compact)$", description="full, or compact to send lists of objects as parallel arrays"),
+    accept: str = Header(None)
 ):
-    return horary_chart(date, time, place, tz_offset)
+    missing = await prepare((date, time, place, tz_offset))
+    if missing:
+        return missing
+    return await cpu_respond(accept, shape, horary_chart, date, time, place, tz_offset)
 
 @app.get("/transits")
-def transits_endpoint(
-    natal_date: str = Query(..., description="Birth date (YYYY-MM-DD)"),
-    natal_time: str = Query(..., description="Birth time (HH:MM)"),
-    natal_place: str = Query(..., description="Birth place (city, country)"),
-    natal_tz_offset: int = Query(..., description="Time zone offset for birth (e.g., 3 for Moscow)"),
+async def transits_endpoint(
+    natal_date: str = Query(None, description="Birth date (YYYY-MM-DD)"),
+    natal_time: str = Query(None, description="Birth time (HH:MM)"),
+    natal_place: str = Query(None, description="Birth place (city, country)"),
+    natal_tz_offset: float = Query(None, description="Time zone offset for birth (e.g., 3 for Moscow); derived from the place and date when omitted"),
     transit_date: str = Query(..., description="Date for transit (YYYY-MM-DD)"),
-    transit_time: str = Query("00:00", description="Time for transit (HH:MM), default 00:00")
+    transit_time: str = Query("00:00", description="Time for transit (HH:MM), default 00:00"),
+    profile_id: str = Query(None, description="Profile ID from POST /profiles, in place of the birth data"),
+    shape: str = Query("full", pattern="^(full|compact)$", description="full, or compact to send lists of objects as parallel arrays"),
+    accept: str = Header(None)
 ):
-    return transits(natal_date, natal_time, natal_place, natal_tz_offset, transit_date, transit_time)
+    missing = await prepare_people((profile_id, natal_date, natal_time, natal_place, natal_tz_offset))
+    if missing:
+        return missing
+    return await cpu_respond(accept, shape, transits, natal_date, natal_time, natal_place, natal_tz_offset, transit_date, transit_time,
+                             profile_id)
 
 @app.get("/weekly_forecast")
-def weekly_forecast_endpoint(
-    date: str = Query(..., description="Birth date in format YYYY-MM-DD"),
-    time: str = Query(..., description="Birth time in format HH:MM"),
-    place: str = Query(..., description="Place of birth (city, country)"),
-    tz_offset: int = Query(..., description="Time zone offset from UTC (e.g., 2 for UTC+2)"),
-    start_date: str = Query(..., description="Start date for forecast in format YYYY-MM-DD")
+async def weekly_forecast_endpoint(
+    date: str = Query(None, description="Birth date in format YYYY-MM-DD"),
+    time: str = Query(None, description="Birth time in format HH:MM"),
+    place: str = Query(None, description="Place of birth (city, country)"),
+    tz_offset: float = Query(None, description="Time zone offset from UTC (e.g., 2 for UTC+2); derived from the place and date when omitted"),
+    start_date: str = Query(..., description="Start date for forecast in format YYYY-MM-DD"),
+    profile_id: str = Query(None, description="Profile ID from POST /profiles, in place of the birth data"),
+    shape: str = Query("full", pattern="^(full|compact)$", description="full, or compact to send lists of objects as parallel arrays"),
+    accept: str = Header(None)
+):
+    missing = await prepare_people((profile_id, date, time, place, tz_offset))
+    if missing:
+        return missing
+    return await cpu_respond(accept, shape, weekly_forecast, date, time, place, tz_offset, start_date, profile_id)
+
+@app.get("/forecast/events")
+async def forecast_events_endpoint(
+    date: str = Query(None, description="Birth date in format YYYY-MM-DD"),
+    time: str = Query(None, description="Birth time in format HH:MM"),
+    place: str = Query(None, description="Place of birth (city, country)"),
+    tz_offset: float = Query(None, description="Time zone offset from UTC (e.g., 2 for UTC+2); derived from the place and date when omitted"),
+    start_date: str = Query(..., description="Start of the range in format YYYY-MM-DD"),
+    end_date: str = Query(..., description="End of the range (exclusive) in format YYYY-MM-DD"),
+    orb: float = Query(6, gt=0, le=10, description="Orb in degrees"),
+    profile_id: str = Query(None, description="Profile ID from POST /profiles, in place of the birth data")
+):
+    missing = await prepare_people((profile_id, date, time, place, tz_offset))
+    if missing:
+        return missing
+    events = await cpu(forecast_events, date, time, place, tz_offset, start_date, end_date, orb, profile_id)
+    if isinstance(events, dict):
+        return events
+    return ndjson(events)
+
+@app.get("/forecast/ingresses")
+async def forecast_ingresses_endpoint(
+    start_date: str = Query(..., description="Start of the range in format YYYY-MM-DD"),
+    end_date: str = Query(..., description="End of the range (exclusive) in format YYYY-MM-DD"),
+    date: str = Query(None, description="Birth date (YYYY-MM-DD), for house ingresses"),
+    time: str = Query(None, description="Birth time (HH:MM), for house ingresses"),
+    place: str = Query(None, description="Birth place (city, country), for house ingresses"),
+    tz_offset: float = Query(None, description="Birth time zone offset from UTC, for house ingresses; derived from the place and date when omitted"),
+    profile_id: str = Query(None, description="Profile ID from POST /profiles, in place of the birth data")
+):
+    if profile_id is None and date is not None and None in (time, place):
+        return JSONResponse({"error": "date, time and place are required together"},
+                            status_code=422)
+    if profile_id is None and date is not None:
+        missing = await prepare((date, time, place, tz_offset))
+        if missing:
+            return missing
+    events = await cpu(ingress_events, start_date, end_date, date, time, place, tz_offset, profile_id)
+    if isinstance(events, dict):
+        return events
+    return ndjson(events)
+
+@app.get("/relocation")
+async def relocation_endpoint(
+    date: str = Query(None, description="Birth date in format YYYY-MM-DD"),
+    time: str = Query(None, description="Birth time in format HH:MM"),
+    place: str = Query(None, description="Place of birth (city, country)"),
+    tz_offset: float = Query(None, description="Time zone offset from UTC (e.g., 2 for UTC+2); derived from the place and date when omitted"),
+    profile_id: str = Query(None, description="Profile ID from POST /profiles, in place of the birth data"),
+    lat_min: float = Query(-89, ge=-89.9, le=89.9, description="Southern edge of the grid"),
+    lat_max: float = Query(89, ge=-89.9, le=89.9, description="Northern edge of the grid"),
+    lon_min: float = Query(-180, ge=-180, le=180, description="Western edge of the grid"),
+    lon_max: float = Query(180, ge=-180, le=180, description="Eastern edge of the grid"),
+    step: float = Query(1, ge=0.1, le=30, description="Grid spacing in degrees"),
+    fmt: str = Query("json", alias="format", pattern="^(json|geojson)$", description="json for the angle grid and lines as arrays, geojson for the lines only"),
+    shape: str = Query("full", pattern="^(full|compact)$", description="full, or compact to send lists of objects as parallel arrays"),
+    accept: str = Header(None)
 ):
-    return weekly_forecast(date, time, place, tz_offset, start_date)
+    missing = await prepare_people((profile_id, date, time, place, tz_offset))
+    if missing:
+        return missing
+    args = (date, time, place, tz_offset, lat_min, lat_max, lon_min, lon_max, step, profile_id)
+    if fmt == "geojson":
+        return await cpu(relocation_lines, *args)
+    return await cpu_respond(accept, shape, relocation_map, *args)
+
+@app.get("/forecast/retrogrades")
+async def forecast_retrogrades_endpoint(
+    start_date: str = Query(..., description="Start of the range in format YYYY-MM-DD"),
+    end_date: str = Query(..., description="End of the range (exclusive) in format YYYY-MM-DD"),
+    shape: str = Query("full", pattern="^(full|compact)$", description="full, or compact to send lists of objects as parallel arrays"),
+    accept: str = Header(None)
+):
+    return await cpu_respond(accept, shape, retrogrades, start_date, end_date)
+
+@app.get("/cache/stats")
+async def cache_stats_endpoint():
+    return {"places": place_cache_stats(), "charts": chart_cache.stats(), "images": image_cache.stats(),
+            "timezones": tz_index.stats()}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics_endpoint():
+    images = image_cache.stats()
+    timezones = tz_index.stats()
+    caches = {"places": place_cache_stats(), "charts": chart_cache.stats(),
+              "images": images["memory"], "images_disk": images["disk"],
+              "timezones": timezones["zones"], "utc_offsets": timezones["offsets"]}
+    return PlainTextResponse(metrics.render(caches), media_type="text/plain; version=0.0.4")
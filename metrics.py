@@ -0,0 +1,179 @@
+# metrics.py
+import os
+import threading
+from bisect import bisect_left
+from contextvars import ContextVar
+from time import perf_counter
+from starlette.datastructures import MutableHeaders
+
+# NATAL_METRICS=0 turns every timer into a no-op; NATAL_SERVER_TIMING=1 adds
+# the per-request stage totals as a Server-Timing response header.
+ENABLED = os.environ.get("NATAL_METRICS", "1") != "0"
+SERVER_TIMING = os.environ.get("NATAL_SERVER_TIMING", "0") == "1"
+
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """Fixed-bucket latency histogram in seconds, Prometheus style."""
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+            self.count += 1
+
+    def snapshot(self):
+        """``([(le, cumulative count), ...], sum, count)`` with ``+Inf`` last."""
+        with self._lock:
+            counts, total, count = list(self.counts), self.sum, self.count
+        cumulative, running = [], 0
+        for le, n in zip(self.buckets + (float("inf"),), counts):
+            running += n
+            cumulative.append((le, running))
+        return cumulative, total, count
+
+
+_registry_lock = threading.Lock()
+stages = {}    # stage -> Histogram
+requests = {}  # (method, route, status) -> Histogram
+# Stage totals of the request being handled; executors.run_in copies the
+# context into the worker threads, so stages timed there are counted too.
+_request_stages = ContextVar("natal_request_stages", default=None)
+
+
+def _histogram(registry: dict, key) -> Histogram:
+    hist = registry.get(key)
+    if hist is None:
+        with _registry_lock:
+            hist = registry.setdefault(key, Histogram())
+    return hist
+
+
+def observe(stage: str, seconds: float):
+    _histogram(stages, stage).observe(seconds)
+    current = _request_stages.get()
+    if current is not None:
+        current[stage] = current.get(stage, 0.0) + seconds
+
+
+class _Timer:
+    __slots__ = ("stage", "start")
+
+    def __init__(self, stage: str):
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        observe(self.stage, perf_counter() - self.start)
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+_NULL = _NullTimer()
+
+
+def timer(stage: str):
+    """``with timer("ephemeris"): ...`` records the block under ``stage``."""
+    return _Timer(stage) if ENABLED else _NULL
+
+
+def server_timing(totals: dict) -> str:
+    return ", ".join(f"{stage};dur={seconds * 1000:.2f}" for stage, seconds in totals.items())
+
+
+class MetricsMiddleware:
+    """ASGI middleware timing every request by route and collecting its stages."""
+
+    def __init__(self, app, server_timing_header: bool = None):
+        self.app = app
+        self.server_timing_header = server_timing_header
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not ENABLED:
+            await self.app(scope, receive, send)
+            return
+        totals = {}
+        token = _request_stages.set(totals)
+        start = perf_counter()
+        status = 500
+        header = SERVER_TIMING if self.server_timing_header is None else self.server_timing_header
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if header:
+                    MutableHeaders(scope=message).append(
+                        "Server-Timing", server_timing(dict(totals, total=perf_counter() - start)))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _request_stages.reset(token)
+            route = getattr(scope.get("route"), "path", "unmatched")
+            _histogram(requests, (scope["method"], route, status)).observe(perf_counter() - start)
+
+
+def _labels(**labels) -> str:
+    body = ",".join('{}="{}"'.format(k, str(v).replace("\\", "\\\\").replace('"', '\\"'))
+                    for k, v in labels.items())
+    return "{" + body + "}"
+
+
+def _histogram_lines(name: str, hist: Histogram, **labels) -> list:
+    cumulative, total, count = hist.snapshot()
+    lines = [f"{name}_bucket{_labels(**labels, le='+Inf' if le == float('inf') else repr(le))} {n}"
+             for le, n in cumulative]
+    lines.append(f"{name}_sum{_labels(**labels)} {total!r}")
+    lines.append(f"{name}_count{_labels(**labels)} {count}")
+    return lines
+
+
+def render(caches: dict = None) -> str:
+    """Prometheus text exposition of the stage and request histograms.
+
+    ``caches`` maps a cache name to its ``stats()`` dict; hits, misses,
+    evictions and size are exported per cache.
+    """
+    lines = ["# HELP natal_stage_seconds Time spent per processing stage.",
+             "# TYPE natal_stage_seconds histogram"]
+    for stage, hist in sorted(stages.items()):
+        lines += _histogram_lines("natal_stage_seconds", hist, stage=stage)
+    lines += ["# HELP natal_request_seconds Request latency by route.",
+              "# TYPE natal_request_seconds histogram"]
+    for (method, route, status), hist in sorted(requests.items()):
+        lines += _histogram_lines("natal_request_seconds", hist, method=method, route=route, status=status)
+    for field, kind in (("hits", "counter"), ("misses", "counter"), ("evictions", "counter"), ("size", "gauge")):
+        name = f"natal_cache_{field}" + ("_total" if kind == "counter" else "")
+        lines += [f"# TYPE {name} {kind}"]
+        for cache, cache_stats in sorted((caches or {}).items()):
+            if cache_stats and field in cache_stats:
+                lines.append(f"{name}{_labels(cache=cache)} {cache_stats[field]}")
+    return "\n".join(lines) + "\n"
+
+
+def reset():
+    with _registry_lock:
+        stages.clear()
+        requests.clear()
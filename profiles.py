@@ -0,0 +1,234 @@
+# profiles.py
+import os
+import secrets
+import struct
+import threading
+import zlib
+import numpy as np
+from astro_core import (LON, SPEED, Chart, calculate_chart, chart_cache, planet_names,
+                        _assemble_chart, _chart_key)
+from compatibility import default_index
+
+try:
+    import fcntl
+except ImportError:  # no flock on Windows; a single writer process is assumed there
+    fcntl = None
+
+DEFAULT_STORE_PATH = os.environ.get(
+    "NATAL_PROFILE_STORE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "profiles.bin"),
+)
+
+MAGIC = b"NATALPR3"
+BODIES = len(planet_names)
+CUSPS = 12
+# Per chart: jd, lat, lon, then longitudes and speeds per body, then cusps
+VALUES = 3 + 2 * BODIES + CUSPS
+PROFILE, DELETED = 1, 2
+
+_HEADER = struct.Struct("<8sHH")            # magic, bodies, cusps
+_LENGTH = struct.Struct("<I")               # payload length (also used for the CRC32)
+_KEY = struct.Struct("<BB")                 # record kind, profile id length (the UTF-8 id follows)
+MAX_ID_BYTES = 255
+_BIRTH = struct.Struct(f"<{VALUES}ddIII")   # chart values, tz_offset, date/time/place lengths
+
+
+class ProfileStore:
+    """Natal charts kept under generated IDs in an append-only binary file.
+
+    A record is ``length | kind, id, chart values, tz_offset, birth strings |
+    crc32``, the id either generated or chosen by the caller; a delete appends a tombstone. The file is read once on open and
+    records appended later by other processes are picked up on a miss (or by
+    ``refresh``), so pre-forked workers can share one file. A torn record at
+    the tail (a crash mid-write) is ignored and cut off by the next append.
+    Stored charts are also added to ``index``, a ``CompatibilityIndex``.
+    """
+
+    def __init__(self, path: str = DEFAULT_STORE_PATH, index=None, fsync: bool = True):
+        self.path = path
+        self.index = index
+        self.fsync = fsync
+        self._values = {}  # id -> packed chart values (bytes)
+        self._birth = {}   # id -> (date, time, place, tz_offset)
+        self._offset = _HEADER.size
+        self._lock = threading.Lock()
+        if not os.path.exists(path):
+            with open(path, "ab") as f:
+                if f.tell() == 0:
+                    f.write(_HEADER.pack(MAGIC, BODIES, CUSPS))
+        with open(path, "rb") as f:
+            magic, bodies, cusps = _HEADER.unpack(f.read(_HEADER.size))
+        if (magic, bodies, cusps) != (MAGIC, BODIES, CUSPS):
+            raise ValueError(f"{path} is not a profile store for {BODIES} bodies")
+        self.refresh()
+
+    def __len__(self):
+        return len(self._values)
+
+    def __contains__(self, profile_id):
+        return profile_id in self._values
+
+    def refresh(self):
+        """Apply the records appended since the last read."""
+        with self._lock:
+            self._read_new()
+
+    def _read_new(self):
+        if os.path.getsize(self.path) <= self._offset:
+            return
+        with open(self.path, "rb") as f:
+            f.seek(self._offset)
+            data = f.read()
+        pos = 0
+        while pos + _LENGTH.size <= len(data):
+            (length,) = _LENGTH.unpack_from(data, pos)
+            start, end = pos + _LENGTH.size, pos + _LENGTH.size + length
+            if end + _LENGTH.size > len(data):
+                break
+            payload = data[start:end]
+            if zlib.crc32(payload) != _LENGTH.unpack_from(data, end)[0]:
+                break
+            self._apply(payload)
+            pos = end + _LENGTH.size
+        self._offset += pos
+
+    def _apply(self, payload: bytes):
+        kind, id_len = _KEY.unpack_from(payload)
+        profile_id = payload[_KEY.size:_KEY.size + id_len].decode("utf-8")
+        start = _KEY.size + id_len
+        if kind == DELETED:
+            self._values.pop(profile_id, None)
+            self._birth.pop(profile_id, None)
+            if self.index is not None:
+                self.index.remove(profile_id)
+            return
+        *values, tz_offset, date_len, time_len, place_len = _BIRTH.unpack_from(payload, start)
+        text = payload[start + _BIRTH.size:]
+        date, time, place = (text[:date_len].decode("utf-8"), text[date_len:date_len + time_len].decode("utf-8"),
+                             text[date_len + time_len:].decode("utf-8"))
+        if tz_offset.is_integer():
+            tz_offset = int(tz_offset)
+        self._values[profile_id] = payload[start:start + VALUES * 8]
+        self._birth[profile_id] = (date, time, place, tz_offset)
+        if self.index is not None:
+            self.index.add(profile_id, dict(zip(planet_names, values[3:3 + BODIES])))
+
+    def _append(self, *payloads: bytes):
+        records = b"".join(_LENGTH.pack(len(p)) + p + _LENGTH.pack(zlib.crc32(p)) for p in payloads)
+        with self._lock:
+            fd = os.open(self.path, os.O_RDWR | os.O_APPEND)
+            try:
+                if fcntl is not None:
+                    fcntl.flock(fd, fcntl.LOCK_EX)
+                # Catch up with other writers, then drop any torn tail before appending
+                self._read_new()
+                if os.fstat(fd).st_size > self._offset:
+                    os.ftruncate(fd, self._offset)
+                os.write(fd, records)
+                if self.fsync:
+                    os.fsync(fd)
+                self._offset += len(records)
+                for payload in payloads:
+                    self._apply(payload)
+            finally:
+                os.close(fd)  # also releases the lock
+
+    @staticmethod
+    def _key(kind, profile_id: str) -> bytes:
+        raw = profile_id.encode("utf-8")
+        if not raw or len(raw) > MAX_ID_BYTES:
+            raise ValueError(f"Profile ID must be 1 to {MAX_ID_BYTES} bytes")
+        return _KEY.pack(kind, len(raw)) + raw
+
+    def _record(self, chart: Chart, date, time, place, tz_offset, profile_id) -> bytes:
+        values = np.concatenate([[chart.jd, chart.lat, chart.lon], chart.degrees, chart.speeds, chart.cusps])
+        strings = [s.encode("utf-8") for s in (date, time, place)]
+        lengths = [len(s) for s in strings]
+        return (self._key(PROFILE, profile_id)
+                + _BIRTH.pack(*values.tolist(), float(tz_offset), *lengths) + b"".join(strings))
+
+    def add(self, chart: Chart, date: str, time: str, place: str, tz_offset, profile_id: str = None) -> str:
+        """Store the chart under ``profile_id`` (replacing a profile with that
+        ID) or under a generated one; returns the ID."""
+        profile_id = profile_id or secrets.token_hex(8)
+        self._append(self._record(chart, date, time, place, tz_offset, profile_id))
+        return profile_id
+
+    def add_many(self, entries):
+        """Store ``(profile_id, chart, date, time, place, tz_offset)`` entries
+        with a single write and fsync."""
+        payloads = [self._record(chart, date, time, place, tz_offset, profile_id)
+                    for profile_id, chart, date, time, place, tz_offset in entries]
+        if payloads:
+            self._append(*payloads)
+
+    def remove(self, profile_id: str) -> bool:
+        if profile_id not in self._values:
+            self.refresh()
+            if profile_id not in self._values:
+                return False
+        self._append(self._key(DELETED, profile_id))
+        return True
+
+    def birth(self, profile_id: str):
+        """``(date, time, place, tz_offset)`` the profile was created from, or None."""
+        if profile_id not in self._birth:
+            self.refresh()
+        return self._birth.get(profile_id)
+
+    def chart(self, profile_id: str):
+        """The stored chart, without geocoding or ephemeris work; None if unknown."""
+        values = self._values.get(profile_id)
+        if values is None:
+            self.refresh()
+            values = self._values.get(profile_id)
+            if values is None:
+                return None
+        v = np.frombuffer(values)
+        jd, lat, lon = float(v[0]), float(v[1]), float(v[2])
+        key = _chart_key(jd, lat, lon, b'P')
+        chart = chart_cache.get(key)
+        if chart is None:
+            positions = np.zeros((BODIES, 4))
+            positions[:, LON] = v[3:3 + BODIES]
+            positions[:, SPEED] = v[3 + BODIES:3 + 2 * BODIES]
+            chart = _assemble_chart(jd, lat, lon, positions, v[3 + 2 * BODIES:].tolist())
+            chart_cache.set(key, chart)
+        return chart
+
+
+_default = None
+_default_lock = threading.Lock()
+
+
+def default_store() -> ProfileStore:
+    """Store at ``NATAL_PROFILE_STORE``, feeding the default compatibility index."""
+    global _default
+    if _default is None:
+        with _default_lock:
+            if _default is None:
+                _default = ProfileStore(DEFAULT_STORE_PATH, index=default_index)
+    return _default
+
+
+def refresh():
+    """Pick up profiles stored by other processes, if the default store is open."""
+    if _default is not None:
+        _default.refresh()
+
+
+def natal_chart(date, time, place, tz_offset, profile_id=None):
+    """``calculate_chart``, or the stored chart when ``profile_id`` is given."""
+    if profile_id is None:
+        return calculate_chart(date, time, place, tz_offset)
+    chart = default_store().chart(profile_id)
+    if chart is None:
+        return None, {"error": "Unknown profile"}
+    return chart, None
+
+
+def birth_data(date, time, place, tz_offset, profile_id=None):
+    """The birth data as given, or as stored for ``profile_id`` (None if unknown)."""
+    if profile_id is None:
+        return date, time, place, tz_offset
+    return default_store().birth(profile_id)
@@ -0,0 +1,149 @@
+# relocation.py
+"""Relocation (astrocartography) maps for one birth moment.
+
+Sidereal time, the obliquity and every body's right ascension and
+declination are taken from Swiss Ephemeris once; the angles and the lines
+where each body sits on an angle then follow in closed form and are
+evaluated for the whole lat/lon grid with NumPy instead of one
+``swe.houses`` call per location. Lines are in mundo: a body is on the MC/IC
+where its right ascension culminates and on the ASC/DSC where it rises or
+sets on the geometric horizon.
+"""
+import math
+import numpy as np
+import swisseph as swe
+from astro_core import planet_codes, planet_names
+from metrics import timer
+
+ANGLES = ("ASC", "DSC", "MC", "IC")
+# Grid size limit for one request (a global 0.2° grid is about 1.6 million cells)
+MAX_CELLS = 2_000_000
+
+
+def sky(jd: float):
+    """Greenwich apparent sidereal time and true obliquity (degrees), and the
+    right ascension and declination of every body, at ``jd`` (UT)."""
+    with timer("ephemeris"):
+        gst = swe.sidtime(jd) * 15.0
+        eps = swe.calc_ut(jd, swe.ECL_NUT)[0][0]
+        equatorial = np.array([swe.calc_ut(jd, code, swe.FLG_EQUATORIAL)[0][:2] for code in planet_codes])
+    return gst, eps, equatorial[:, 0], equatorial[:, 1]
+
+
+def _count(low, high, step) -> int:
+    # Points from low in step increments up to high (counting cells rather
+    # than stepping past high keeps the far edge inside the requested range)
+    return int(np.floor((high - low) / step + 1e-9)) + 1
+
+
+def _columns(lon_min, lon_max, step) -> int:
+    # A full circle of longitude leaves out the duplicate last meridian
+    count = _count(lon_min, lon_max, step)
+    if lon_max - lon_min >= 360 and step * (count - 1) >= 360 - step * 1e-6:
+        count -= 1
+    return count
+
+
+def grid(lat_min=-89.0, lat_max=89.0, lon_min=-180.0, lon_max=180.0, step=1.0):
+    """Grid latitudes and longitudes from the southern/western edge in
+    ``step`` increments, never past the northern/eastern edge (included
+    when ``step`` divides the range)."""
+    lats = lat_min + step * np.arange(_count(lat_min, lat_max, step), dtype=float)
+    lons = lon_min + step * np.arange(_columns(lon_min, lon_max, step), dtype=float)
+    return lats, lons
+
+
+def grid_size(lat_min=-89.0, lat_max=89.0, lon_min=-180.0, lon_max=180.0, step=1.0) -> int:
+    """Number of cells ``grid`` builds for these bounds, without building it."""
+    return _count(lat_min, lat_max, step) * _columns(lon_min, lon_max, step)
+
+
+def _wrap(lon):
+    # Longitude to -180 .. 180
+    return (lon + 180.0) % 360.0 - 180.0
+
+
+def angles(gst: float, eps: float, lats, lons) -> dict:
+    """Ecliptic longitudes of the angles: ``MC``/``IC`` per longitude and
+    ``ASC``/``DSC`` per (latitude, longitude) cell."""
+    ramc = np.radians(gst + np.asarray(lons, dtype=float))
+    e = np.radians(eps)
+    phi = np.radians(np.asarray(lats, dtype=float))[:, None]
+    mc = np.degrees(np.arctan2(np.sin(ramc), np.cos(ramc) * np.cos(e))) % 360
+    asc = np.degrees(np.arctan2(np.cos(ramc), -(np.sin(ramc) * np.cos(e) + np.tan(phi) * np.sin(e)))) % 360
+    return {"ASC": asc, "DSC": (asc + 180) % 360, "MC": mc, "IC": (mc + 180) % 360}
+
+
+def lines(gst: float, ra, dec, lats) -> np.ndarray:
+    """Longitude where each body is on each angle, per latitude.
+
+    Returns an array of shape ``(4, bodies, len(lats))`` in ``ANGLES`` order,
+    NaN where the body never rises or sets at that latitude.
+    """
+    ra = np.asarray(ra, dtype=float)[:, None]
+    phi = np.radians(np.asarray(lats, dtype=float))[None, :]
+    cos_h = -np.tan(phi) * np.tan(np.radians(np.asarray(dec, dtype=float)))[:, None]
+    with np.errstate(invalid="ignore"):
+        h = np.degrees(np.arccos(np.where(np.abs(cos_h) <= 1, cos_h, np.nan)))
+    mc = np.broadcast_to(ra - gst, h.shape)
+    return _wrap(np.stack([ra - h - gst, ra + h - gst, mc, mc + 180]))
+
+
+def relocation(jd: float, lat_min=-89.0, lat_max=89.0, lon_min=-180.0, lon_max=180.0, step=1.0) -> dict:
+    """Angles over the grid and the planet-on-angle lines, as arrays rounded
+    to 0.01° (NaN, ``null`` in JSON, where a body does not rise or set)."""
+    lats, lons = grid(lat_min, lat_max, lon_min, lon_max, step)
+    gst, eps, ra, dec = sky(jd)
+    on_angle = lines(gst, ra, dec, lats)
+    return {
+        "jd": jd,
+        "lat": np.round(lats, 4).tolist(),
+        "lon": np.round(lons, 4).tolist(),
+        "angles": {name: np.round(values, 2).tolist() for name, values in angles(gst, eps, lats, lons).items()},
+        "lines": {
+            "ASC": dict(zip(planet_names, np.round(on_angle[0], 2).tolist())),
+            "DSC": dict(zip(planet_names, np.round(on_angle[1], 2).tolist())),
+            # Meridian lines: one longitude per body
+            "MC": dict(zip(planet_names, np.round(on_angle[2, :, 0], 2).tolist())),
+            "IC": dict(zip(planet_names, np.round(on_angle[3, :, 0], 2).tolist())),
+        },
+    }
+
+
+def _segments(lons, lats):
+    # Split a line at undefined points and where it crosses the antimeridian
+    segments, current, previous = [], [], None
+    for lon, lat in zip(lons, lats):
+        if math.isnan(lon):
+            previous = None
+            if len(current) > 1:
+                segments.append(current)
+            current = []
+            continue
+        if previous is not None and abs(lon - previous) > 180:
+            if len(current) > 1:
+                segments.append(current)
+            current = []
+        current.append([round(lon, 4), round(lat, 4)])
+        previous = lon
+    if len(current) > 1:
+        segments.append(current)
+    return segments
+
+
+def relocation_geojson(jd: float, lat_min=-89.0, lat_max=89.0, lon_min=-180.0, lon_max=180.0, step=1.0) -> dict:
+    """The planet-on-angle lines as a GeoJSON FeatureCollection of
+    MultiLineStrings, one feature per body and angle."""
+    lats, _ = grid(lat_min, lat_max, lon_min, lon_max, step)
+    gst, _, ra, dec = sky(jd)
+    on_angle = lines(gst, ra, dec, lats)
+    lats = lats.tolist()
+    features = []
+    for a, angle in enumerate(ANGLES):
+        for b, body in enumerate(planet_names):
+            features.append({
+                "type": "Feature",
+                "properties": {"body": body, "angle": angle},
+                "geometry": {"type": "MultiLineString", "coordinates": _segments(on_angle[a, b].tolist(), lats)},
+            })
+    return {"type": "FeatureCollection", "features": features}
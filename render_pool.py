@@ -0,0 +1,128 @@
+# render_pool.py
+import importlib
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+
+
+# NATAL_RENDER_WARMUP=1 loads the rendering stack at startup (image workers);
+# otherwise matplotlib is only imported by the first raster image request.
+WARM_UP = os.environ.get("NATAL_RENDER_WARMUP", "0") == "1"
+
+
+class RenderQueueFull(Exception):
+    pass
+
+
+class RenderTimeout(Exception):
+    pass
+
+
+def _init_worker():
+    # Import matplotlib, build the font cache and the static wheel templates
+    # once per worker instead of on its first request.
+    import chart_draw
+    chart_draw.warm_up()
+
+
+def _ping():
+    return os.getpid()
+
+
+class Lazy:
+    """Stand-in for ``module.name`` that imports ``module`` on the first call.
+
+    Instances pickle by module and name, so they can be handed to the worker
+    processes without the caller ever importing the module itself.
+    """
+
+    __slots__ = ("module", "name")
+
+    def __init__(self, module: str, name: str):
+        self.module = module
+        self.name = name
+
+    def __call__(self, *args, **kwargs):
+        return getattr(importlib.import_module(self.module), self.name)(*args, **kwargs)
+
+    def __reduce__(self):
+        return Lazy, (self.module, self.name)
+
+    def __repr__(self):
+        return f"Lazy({self.module!r}, {self.name!r})"
+
+
+class RenderPool:
+    """Raster rendering in a pool of pre-warmed worker processes.
+
+    ``workers`` processes (0 renders inline in the calling thread) take render
+    calls; at most ``queue_depth`` calls may be queued or running at once and
+    further calls fail fast with ``RenderQueueFull``. A call that takes longer
+    than ``timeout`` seconds raises ``RenderTimeout``; its render keeps its
+    queue slot until the worker finishes it. Workers are started with
+    ``spawn`` so they never inherit the server's threads or locks.
+    """
+
+    def __init__(self, workers: int, queue_depth: int, timeout: float):
+        self.workers = workers
+        self.queue_depth = queue_depth
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(max(queue_depth, 1))
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def _pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                )
+            return self._executor
+
+    def start(self):
+        if self.workers > 0:
+            pool = self._pool()
+            for future in [pool.submit(_ping) for _ in range(self.workers)]:
+                future.result()
+
+    def warm_up(self):
+        # Load matplotlib, fonts and the wheel templates before the first image request
+        if self.workers > 0:
+            self.start()
+        else:
+            _init_worker()
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def render(self, fn, *args, **kwargs):
+        if self.workers <= 0:
+            return fn(*args, **kwargs)
+        if not self._slots.acquire(blocking=False):
+            raise RenderQueueFull()
+        try:
+            future = self._pool().submit(fn, *args, **kwargs)
+        except BaseException:
+            self._slots.release()
+            raise
+        # The slot is held until the worker is actually done: a render that
+        # timed out keeps running and still counts against the queue depth
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            future.cancel()
+            raise RenderTimeout()
+
+
+pool = RenderPool(
+    workers=int(os.environ.get("NATAL_RENDER_WORKERS", 0)),
+    queue_depth=int(os.environ.get("NATAL_RENDER_QUEUE", 64)),
+    timeout=float(os.environ.get("NATAL_RENDER_TIMEOUT", 30)),
+)
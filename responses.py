@@ -0,0 +1,86 @@
+# responses.py
+import orjson
+from fastapi import Response
+from fastapi.responses import JSONResponse
+from metrics import timer
+
+try:
+    import msgpack
+except ImportError:  # in requirements.txt; without it application/msgpack is not offered
+    msgpack = None
+
+JSON = "application/json"
+MSGPACK = "application/msgpack"
+SHAPES = ("full", "compact")
+
+
+def dumps(data) -> bytes:
+    # Tuples, dict subclasses (read-only chart views) and NumPy values are
+    # handled natively, so results go out without a jsonable_encoder pass.
+    return orjson.dumps(data, option=orjson.OPT_SERIALIZE_NUMPY)
+
+
+def _encoders() -> dict:
+    encoders = {JSON: dumps}
+    if msgpack is not None:
+        encoders[MSGPACK] = lambda data: msgpack.packb(data, use_bin_type=True)
+    return encoders
+
+
+def negotiate(accept: str):
+    """Media type to answer with for an ``Accept`` header, or None (406) when
+    JSON is refused (``q=0``) and nothing else on offer is accepted."""
+    encoders = _encoders()
+    if not accept:
+        return JSON
+    explicit, wildcard = {}, None
+    for part in accept.split(","):
+        media, _, params = part.strip().partition(";")
+        media = media.strip().lower()
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if media in ("*/*", "application/*"):
+            wildcard = q if wildcard is None else max(wildcard, q)
+            continue
+        if media == "application/x-msgpack":
+            media = MSGPACK
+        explicit[media] = max(explicit.get(media, q), q)
+    # A listed type's own q wins over the wildcards; ties go to JSON
+    quality = {media: explicit.get(media, wildcard) for media in encoders}
+    best = max(encoders, key=lambda media: quality[media] or 0.0)
+    if quality[best]:
+        return best
+    # Nothing on offer was asked for (text/plain is some clients' default):
+    # JSON anyway, unless the client refused it
+    return None if quality[JSON] == 0 else JSON
+
+
+def compact(data):
+    """Columnar shape: every list of objects sharing the same keys becomes
+    one object of parallel arrays, e.g. ``aspects`` -> ``{"type": [...], ...}``."""
+    if isinstance(data, dict):
+        return {k: compact(v) for k, v in data.items()}
+    if isinstance(data, (list, tuple)):
+        if data and all(isinstance(row, dict) for row in data):
+            keys = list(data[0])
+            if all(len(row) == len(keys) and all(k in row for k in keys) for row in data):
+                return {k: [compact(row[k]) for row in data] for k in keys}
+        return [compact(v) for v in data]
+    return data
+
+
+def respond(data, accept: str = None, shape: str = "full") -> Response:
+    media_type = negotiate(accept)
+    if media_type is None:
+        return JSONResponse({"error": "Not acceptable", "available": list(_encoders())}, status_code=406)
+    with timer("serialize"):
+        if shape == "compact":
+            data = compact(data)
+        content = _encoders()[media_type](data)
+    return Response(content=content, media_type=media_type, headers={"Vary": "Accept"})
@@ -0,0 +1,167 @@
+# server.py
+"""Pre-fork server: ``python server.py --workers 4 --port 8000``.
+
+The parent imports the app and warms everything that is read-only at run
+time (Swiss Ephemeris tables, the memory-mapped ephemeris store, aspect and
+compatibility lookup tables, the stored profiles and, with
+``--preload-render``, matplotlib fonts and the wheel templates), freezes it out of the garbage collector's reach and
+then forks the uvicorn workers, which share those pages copy-on-write instead
+of each loading its own copy. The parent binds the socket, restarts workers
+that die and forwards SIGTERM/SIGINT for a graceful shutdown.
+
+Render processes (``NATAL_RENDER_WORKERS``) cannot be shared this way: each
+worker starts its own spawned pool, so size the two together (there are
+``workers * NATAL_RENDER_WORKERS`` render processes in all). Rendering stays
+out of the workers, whose JSON requests matplotlib would otherwise hold up;
+``--preload-render`` only matters for inline rendering
+(``NATAL_RENDER_WORKERS=0``) and is off by default when a pool is configured.
+"""
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+import time
+import traceback
+
+# Workers that die within this many seconds of starting are restarted with
+# a growing delay, so a worker that cannot start does not spin the CPU.
+MIN_UPTIME = 5.0
+MAX_BACKOFF = 30.0
+
+
+def preload(render: bool = False):
+    """Import the app and load the shared read-only state in this process."""
+    import swisseph as swe
+    import main
+    from astro_core import planet_codes
+    from ephemeris_store import default_store
+    import profiles
+    import tz_index
+    jd = swe.julday(2000, 1, 1, 12)
+    for code in planet_codes:
+        swe.calc_ut(jd, code)
+    swe.houses(jd, 51.5, 0.0, b'P')
+    default_store()
+    profiles.default_store()
+    tz_index.default_index()
+    if render:
+        import chart_draw
+        chart_draw.warm_up()
+    return main.app
+
+
+def bind(host: str, port: int, backlog: int = 2048) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+class Supervisor:
+    def __init__(self, app, sock: socket.socket, workers: int, log_level: str = "info"):
+        self.app = app
+        self.sock = sock
+        self.workers = workers
+        self.log_level = log_level
+        self.children = {}  # pid -> start time
+        self.stopping = False
+        self.failures = 0
+
+    def spawn(self):
+        pid = os.fork()
+        if pid:
+            self.children[pid] = time.monotonic()
+            return pid
+        # Child: take the default signal handlers back and serve
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        gc.enable()
+        code = 0
+        try:
+            import uvicorn
+            config = uvicorn.Config(self.app, log_level=self.log_level, lifespan="on")
+            uvicorn.Server(config).run(sockets=[self.sock])
+        except BaseException:
+            traceback.print_exc()
+            code = 1
+        finally:
+            os._exit(code)
+
+    def stop(self, signum=None, frame=None):
+        self.stopping = True
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def reap(self):
+        while self.children:
+            try:
+                pid, _ = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                self.children.clear()
+                return []
+            if not pid:
+                break
+            started = self.children.pop(pid, None)
+            if started is not None and not self.stopping:
+                self.failures = self.failures + 1 if time.monotonic() - started < MIN_UPTIME else 0
+        return self.children
+
+    def run(self, timeout: float = 30.0):
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        for _ in range(self.workers):
+            self.spawn()
+        while not self.stopping:
+            time.sleep(0.2)
+            self.reap()
+            missing = self.workers - len(self.children)
+            if missing > 0 and not self.stopping:
+                if self.failures:
+                    time.sleep(min(MAX_BACKOFF, 0.5 * 2 ** self.failures))
+                for _ in range(missing):
+                    self.spawn()
+        deadline = time.monotonic() + timeout
+        while self.reap() and time.monotonic() < deadline:
+            time.sleep(0.1)
+        for pid in list(self.children):
+            os.kill(pid, signal.SIGKILL)
+        self.reap()
+        self.sock.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pre-fork server for the natal API")
+    parser.add_argument("--host", default=os.environ.get("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.environ.get("PORT", 8000)))
+    parser.add_argument("--workers", type=int, default=int(os.environ.get("NATAL_WORKERS", os.cpu_count() or 1)))
+    render_workers = int(os.environ.get("NATAL_RENDER_WORKERS", 0))
+    parser.add_argument("--preload-render", action="store_true",
+                        default=os.environ.get("NATAL_RENDER_WARMUP", "0") == "1" and render_workers <= 0,
+                        help="also load matplotlib and the wheel templates before forking "
+                             "(for inline rendering, NATAL_RENDER_WORKERS=0)")
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args(argv)
+
+    # Keep the collector from leaving freed holes in the pages the workers share
+    gc.disable()
+    app = preload(args.preload_render)
+    sock = bind(args.host, args.port)
+    gc.collect()
+    gc.freeze()
+    print(f"Serving on {args.host}:{args.port} with {args.workers} workers (parent {os.getpid()})", flush=True)
+    if render_workers > 0:
+        print(f"Each worker starts {render_workers} render processes: "
+              f"{args.workers * render_workers} in total", flush=True)
+    Supervisor(app, sock, args.workers, args.log_level).run()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
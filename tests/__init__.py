@@ -0,0 +1,12 @@
+import atexit
+import os
+import shutil
+import tempfile
+
+# The profile store and the place index default to files next to the code:
+# keep the ones the tests write in a directory of their own (set before any
+# test module imports them)
+_state = tempfile.mkdtemp(prefix="natal-tests-")
+atexit.register(shutil.rmtree, _state, ignore_errors=True)
+os.environ.setdefault("NATAL_PROFILE_STORE", os.path.join(_state, "profiles.bin"))
+os.environ.setdefault("NATAL_PLACE_INDEX", os.path.join(_state, "places.db"))
@@ -0,0 +1,14 @@
+import unittest
+import astro_core
+
+
+class FakeEphemerisTestCase(unittest.TestCase):
+    """Base for tests that patch ``astro_core.swe``.
+
+    Different tests feed different fake ephemerides for the same birth data,
+    so a chart memoized by one test would be served to the next one. Every
+    test starts from an empty chart cache instead.
+    """
+
+    def setUp(self):
+        astro_core.chart_cache.clear()
@@ -0,0 +1,52 @@
+import random
+import unittest
+from aspects import ASPECTS, body_orbs, find_aspects, aspect_rows
+
+NAMES = ['Sun', 'Moon', 'Mercury', 'Venus', 'Mars',
+         'Jupiter', 'Saturn', 'Uranus', 'Neptune', 'Pluto']
+
+
+def loop_aspects(lon1, lon2, orb_for):
+    found = []
+    for i, d1 in enumerate(lon1):
+        for j, d2 in enumerate(lon2):
+            diff = abs((d1 - d2 + 180) % 360 - 180)
+            for k, (ang, _, _) in enumerate(ASPECTS):
+                if abs(diff - ang) <= orb_for(i, j):
+                    found.append((i, j, k, diff))
+    return found
+
+
+class TestAspectEngine(unittest.TestCase):
+    def test_self_aspects_each_pair_once(self):
+        found = find_aspects([0.0, 90.0, 181.0], orbs1=6)
+        self.assertEqual([(i, j, k) for _, i, j, k, _ in aspect_rows(found)],
+                         [(0, 1, 2), (0, 2, 4), (1, 2, 2)])
+
+    def test_luminary_orb_applies_to_either_body(self):
+        orbs = body_orbs(NAMES)
+        found = find_aspects([0.0] * 10, [127.5] * 10, orbs, orbs)
+        pairs = {(i, j) for _, i, j, _, _ in aspect_rows(found)}
+        self.assertIn((0, 5), pairs)
+        self.assertIn((5, 1), pairs)
+        self.assertNotIn((5, 6), pairs)
+
+    def test_matches_reference_loop(self):
+        rng = random.Random(7)
+        orbs = body_orbs(NAMES)
+        for _ in range(50):
+            lon1 = [round(rng.uniform(0, 360), 2) for _ in NAMES]
+            lon2 = [round(rng.uniform(0, 360), 2) for _ in NAMES]
+            expected = loop_aspects(lon1, lon2, lambda i, j: max(orbs[i], orbs[j]))
+            got = [(i, j, k, a) for _, i, j, k, a in
+                   aspect_rows(find_aspects(lon1, lon2, orbs, orbs))]
+            self.assertEqual(got, expected)
+
+    def test_epochs_are_batched(self):
+        found = find_aspects([[0.0, 5.0], [60.0, 200.0]], [0.0], orbs1=6)
+        self.assertEqual([(e, i, j, k) for e, i, j, k, _ in aspect_rows(found)],
+                         [(0, 0, 0, 0), (0, 1, 0, 0), (1, 0, 0, 1)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+import asyncio
+import time
+import unittest
+from unittest.mock import patch, MagicMock
+import httpx
+import astro_core
+from main import app
+
+SLOW = 0.3
+COORDS = {"Paris": (48.86, 2.35), "Rome": (41.89, 12.48)}
+
+
+async def slow_geocode(place):
+    await asyncio.sleep(SLOW)
+    return COORDS.get(place)
+
+
+class TestAsyncAPI(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        astro_core.place_cache.clear()
+        astro_core.chart_cache.clear()
+        patcher = patch('astro_core.place_index', MagicMock(lookup=MagicMock(return_value=None)))
+        self.index = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def client(self):
+        return httpx.AsyncClient(app=app, base_url="http://test")
+
+    async def test_resolve_place_async_uses_pooled_client(self):
+        requests = []
+
+        def handler(request):
+            requests.append(request)
+            return httpx.Response(200, json=[{"lat": "48.86", "lon": "2.35"}])
+
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        with patch('astro_core._geocoder_client', return_value=client):
+            results = await asyncio.gather(*(astro_core.resolve_place_async("Paris") for _ in range(5)))
+            self.assertEqual(results, [(48.86, 2.35)] * 5)
+            self.assertEqual(await astro_core.resolve_place_async("paris"), (48.86, 2.35))
+        self.assertEqual(len(requests), 1)
+        self.assertEqual(requests[0].url.params["q"], "Paris")
+        self.index.add.assert_called_once_with("Paris", 48.86, 2.35)
+        # The sync path now hits the shared cache
+        self.assertEqual(astro_core.resolve_place("Paris"), (48.86, 2.35))
+
+    async def test_geocoder_failure_is_negatively_cached(self):
+        client = httpx.AsyncClient(transport=httpx.MockTransport(lambda request: httpx.Response(503)))
+        with patch('astro_core._geocoder_client', return_value=client):
+            self.assertIsNone(await astro_core.resolve_place_async("Atlantis"))
+        self.assertIsNone(astro_core.place_cache.get("atlantis", "missing"))
+
+    @patch('astro_core._geocode_async', side_effect=slow_geocode)
+    async def test_synastry_places_resolve_concurrently(self, _):
+        async with self.client() as client:
+            start = time.perf_counter()
+            resp = await client.get("/synastry", params={
+                "date1": "1990-01-01", "time1": "12:00", "place1": "Paris", "tz_offset1": 1,
+                "date2": "1992-02-02", "time2": "15:00", "place2": "Rome", "tz_offset2": 1})
+            elapsed = time.perf_counter() - start
+        self.assertEqual(resp.status_code, 200)
+        self.assertIn("summary", resp.json())
+        self.assertLess(elapsed, 1.8 * SLOW)
+
+    @patch('astro_core._geocode_async', side_effect=slow_geocode)
+    async def test_slow_geocode_does_not_block_other_requests(self, _):
+        async with self.client() as client:
+            slow = asyncio.create_task(client.get("/natal_chart/calc", params={
+                "date": "1990-01-01", "time": "12:00", "place": "Paris", "tz_offset": 1}))
+            await asyncio.sleep(0.05)
+            start = time.perf_counter()
+            fast = await client.get("/natal_chart/calc", params={
+                "date": "1990-01-01", "time": "12:00", "place": "Moscow", "tz_offset": 3})
+            self.assertLess(time.perf_counter() - start, SLOW / 2)
+            self.assertFalse(slow.done())
+            self.assertEqual(fast.json()["lat"], 55.75)
+            self.assertEqual((await slow).json()["lat"], 48.86)
+
+    async def test_slow_place_index_does_not_block_the_loop(self):
+        def slow_lookup(place):
+            time.sleep(SLOW)
+            return COORDS.get(place)
+
+        self.index.lookup.side_effect = slow_lookup
+        async with self.client() as client:
+            start = time.perf_counter()
+            slow = asyncio.create_task(client.get("/natal_chart/calc", params={
+                "date": "1990-01-01", "time": "12:00", "place": "Paris", "tz_offset": 1}))
+            await asyncio.sleep(0.05)
+            fast = await client.get("/natal_chart/calc", params={
+                "date": "1990-01-01", "time": "12:00", "place": "Moscow", "tz_offset": 3})
+            self.assertLess(time.perf_counter() - start, SLOW / 2)
+            self.assertFalse(slow.done())
+            self.assertEqual(fast.json()["lat"], 55.75)
+            self.assertEqual((await slow).json()["lat"], 48.86)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,40 @@
+import unittest
+from benchmarks.harness import compare, measure, run_cases, summarize
+
+
+class TestHarness(unittest.TestCase):
+    def test_summarize(self):
+        r = summarize([0.001, 0.002, 0.003, 0.004], 2048)
+        self.assertEqual(r["n"], 4)
+        self.assertEqual(r["p50_ms"], 2.5)
+        self.assertEqual(r["min_ms"], 1.0)
+        self.assertEqual(r["max_ms"], 4.0)
+        self.assertEqual(r["throughput_per_s"], 400.0)
+        self.assertEqual(r["peak_kib"], 2.0)
+
+    def test_measure_runs_setup_before_every_call(self):
+        calls = []
+        r = measure(lambda: calls.append("fn"), repeat=3, warmup=1, setup=lambda: calls.append("setup"))
+        self.assertEqual(calls, ["setup", "fn"] * 5)
+        self.assertEqual(r["n"], 3)
+
+    def test_run_cases_filter(self):
+        cases = [{"name": "a/x", "fn": lambda: None}, {"name": "b", "fn": lambda: None, "repeat": 2}]
+        self.assertEqual(list(run_cases(cases, repeat=1, warmup=0, pattern="a/")), ["a/x"])
+        self.assertEqual(run_cases(cases, repeat=1, warmup=0)["b"]["n"], 2)
+
+    def test_compare_flags_slower_and_bigger_cases(self):
+        base = {"same": {"p50_ms": 1.0, "peak_kib": 100}, "slow": {"p50_ms": 1.0, "peak_kib": 100},
+                "big": {"p50_ms": 1.0, "peak_kib": 100}, "gone": {"p50_ms": 1.0, "peak_kib": 100}}
+        new = {"same": {"p50_ms": 1.1, "peak_kib": 110}, "slow": {"p50_ms": 1.5, "peak_kib": 100},
+               "big": {"p50_ms": 1.0, "peak_kib": 400}, "new": {"p50_ms": 1.0, "peak_kib": 100}}
+        rows = {row["name"]: row for row in compare(new, base, threshold=0.2)}
+        self.assertEqual(set(rows), {"same", "slow", "big"})
+        self.assertFalse(rows["same"]["regression"])
+        self.assertTrue(rows["slow"]["regression"])
+        self.assertEqual(rows["slow"]["ratio"], 1.5)
+        self.assertTrue(rows["big"]["regression"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,130 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import patch, MagicMock
+from geopy.exc import GeocoderServiceError
+import astro_core
+from cache import DiskCache, LRUCache, SingleFlight
+
+
+class TestLRUCache(unittest.TestCase):
+    def test_size_bound_evicts_least_recent(self):
+        cache = LRUCache(maxsize=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        self.assertEqual(cache.get("a"), 1)
+        cache.set("c", 3)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), 1)
+        stats = cache.stats()
+        self.assertEqual(stats["evictions"], 1)
+        self.assertEqual(stats["hits"], 2)
+        self.assertEqual(stats["misses"], 1)
+
+    def test_ttl_expiry(self):
+        cache = LRUCache(maxsize=10, ttl=None)
+        cache.set("short", 1, ttl=0.01)
+        cache.set("long", 2)
+        time.sleep(0.02)
+        self.assertIsNone(cache.get("short"))
+        self.assertEqual(cache.get("long"), 2)
+        self.assertEqual(cache.stats()["expirations"], 1)
+
+    def test_membership_leaves_counters_and_order(self):
+        cache = LRUCache(maxsize=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.set("short", 3, ttl=0)
+        self.assertIn("b", cache)
+        self.assertNotIn("short", cache)
+        self.assertNotIn("missing", cache)
+        self.assertEqual((cache.hits, cache.misses), (0, 0))
+        cache.set("c", 3)
+        self.assertNotIn("b", cache)
+
+
+class TestWeightedAndDiskCache(unittest.TestCase):
+    def test_weight_bound(self):
+        cache = LRUCache(maxsize=100, maxweight=10)
+        cache.set("a", b"12345")
+        cache.set("b", b"12345")
+        cache.set("c", b"1")
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.weight, 6)
+
+    def test_disk_cache_evicts_least_recently_used(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            disk = DiskCache(tmp, max_bytes=10)
+            disk.set("a", b"1234")
+            disk.set("b", b"1234")
+            past = time.time() - 60
+            os.utime(os.path.join(tmp, "b"), (past, past))
+            disk.set("c", b"1234")
+            self.assertIsNone(disk.get("b"))
+            self.assertEqual(disk.get("a"), b"1234")
+            self.assertEqual(DiskCache(tmp, max_bytes=10).size, 8)
+
+
+class TestSingleFlight(unittest.TestCase):
+    def test_concurrent_calls_share_one_execution(self):
+        flight = SingleFlight()
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+
+        def slow():
+            calls.append(1)
+            started.set()
+            release.wait()
+            return 42
+
+        results = []
+        leader = threading.Thread(target=lambda: results.append(flight.do("k", slow)))
+        leader.start()
+        started.wait()
+        followers = [threading.Thread(target=lambda: results.append(flight.do("k", slow)))
+                     for _ in range(4)]
+        for t in followers:
+            t.start()
+        while flight.shared < 4:
+            time.sleep(0.001)
+        release.set()
+        for t in [leader] + followers:
+            t.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [42] * 5)
+
+
+class TestPlaceCache(unittest.TestCase):
+    def setUp(self):
+        astro_core.place_cache.clear()
+
+    @patch('astro_core.place_index')
+    @patch('astro_core.Nominatim')
+    def test_failed_lookup_is_negatively_cached(self, mock_nominatim, mock_index):
+        mock_index.lookup.return_value = None
+        mock_nominatim.return_value.geocode.side_effect = GeocoderServiceError()
+        for _ in range(3):
+            data, err = astro_core.calculate_chart('2000-01-01', '12:00', 'Atlantis', 3)
+            self.assertIsNone(data)
+            self.assertEqual(err, {"error": "Invalid place name"})
+        self.assertEqual(mock_nominatim.return_value.geocode.call_count, 1)
+
+    @patch('astro_core.place_index')
+    @patch('astro_core.Nominatim')
+    def test_resolved_place_is_cached(self, mock_nominatim, mock_index):
+        mock_index.lookup.return_value = None
+        mock_geo = MagicMock()
+        mock_geo.latitude = 48.85
+        mock_geo.longitude = 2.35
+        mock_nominatim.return_value.geocode.return_value = mock_geo
+        self.assertEqual(astro_core.resolve_place("Paris"), (48.85, 2.35))
+        self.assertEqual(astro_core.resolve_place("paris"), (48.85, 2.35))
+        self.assertEqual(mock_nominatim.return_value.geocode.call_count, 1)
+        self.assertGreaterEqual(astro_core.place_cache_stats()["hits"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,126 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+import numpy as np
+from fastapi.testclient import TestClient
+from astro_core import planet_names
+from compatibility import CompatibilityIndex, default_index
+from logic_synastry import synastry, synastry_index_add
+from main import app
+import profiles
+
+
+def chart(degrees):
+    return dict(zip(planet_names, degrees))
+
+
+class TestCompatibilityIndex(unittest.TestCase):
+    def test_summary_matches_pairwise_synastry(self):
+        import logic_synastry
+        rng = np.random.default_rng(7)
+        query = chart(np.round(rng.uniform(0, 360, 10), 2).tolist())
+        profiles = [chart(np.round(rng.uniform(0, 360, 10), 2).tolist()) for _ in range(200)]
+        index = CompatibilityIndex(capacity=16)
+        for n, p in enumerate(profiles):
+            index.add(f"p{n}", p)
+        matches = index.search(query, limit=200)
+        self.assertEqual(len(matches), 200)
+        scores = [m["score"] for m in matches]
+        self.assertEqual(scores, sorted(scores, reverse=True))
+        for m in matches:
+            aspects = logic_synastry._synastry_aspects(list(query.values()),
+                                                      list(profiles[int(m["id"][1:])].values()))[1]
+            self.assertEqual(m["summary"], {
+                "harmonious": sum(1 for a in aspects if a["harmonious"]),
+                "tense": sum(1 for a in aspects if a["tense"]),
+                "personal_harmonious": sum(1 for a in aspects if a["harmonious"] and a["personal"]),
+                "personal_tense": sum(1 for a in aspects if a["tense"] and a["personal"]),
+                "total": len(aspects),
+            })
+
+    def test_top_k_exclude_and_remove(self):
+        index = CompatibilityIndex()
+        base = [0.0, 100.0, 200.0, 300.0, 40.0, 140.0, 240.0, 340.0, 80.0, 180.0]
+        index.add("same", chart(base))
+        index.add("shifted", chart([(d + 90) % 360 for d in base]))
+        index.add("other", chart([(d + 13) % 360 for d in base]))
+        self.assertEqual(index.search(chart(base), limit=1)[0]["id"], "same")
+        ids = [m["id"] for m in index.search(chart(base), limit=5, exclude=["same"])]
+        self.assertEqual(len(ids), 2)
+        self.assertNotIn("same", ids)
+        self.assertTrue(index.remove("same"))
+        self.assertFalse(index.remove("same"))
+        self.assertEqual(len(index), 2)
+        self.assertEqual({m["id"] for m in index.search(chart(base))}, {"shifted", "other"})
+        self.assertEqual(CompatibilityIndex().search(chart(base)), [])
+
+
+class TestCompatibilityAPI(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "profiles.bin")
+        self.store = profiles.ProfileStore(self.path, index=default_index, fsync=False)
+        self.addCleanup(lambda: [default_index.remove(p) for p in list(self.store._values)])
+        patcher = patch.object(profiles, "_default", self.store)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = TestClient(app)
+
+    def test_register_and_search(self):
+        resp = self.client.post("/synastry/profiles", json=[
+            {"id": "a", "date": "1990-01-01", "time": "12:00", "place": "Moscow", "tz_offset": 3},
+            {"id": "b", "date": "1992-02-02", "time": "15:00", "place": "London", "tz_offset": 0},
+            {"id": "c", "date": "1992-02-30", "time": "15:00", "place": "London", "tz_offset": 0},
+        ])
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.json()["indexed"], 2)
+        self.assertEqual(resp.json()["errors"][0]["id"], "c")
+        resp = self.client.get("/synastry/search", params={
+            "date": "1990-01-01", "time": "12:00", "place": "Moscow", "tz_offset": 3, "limit": 2})
+        self.assertEqual(resp.status_code, 200)
+        matches = resp.json()["matches"]
+        self.assertEqual(matches[0]["id"], "compat:a")
+        pair = synastry("1990-01-01", "12:00", "Moscow", 3, "1992-02-02", "15:00", "London", 0)
+        self.assertEqual(matches[1]["summary"], pair["summary"])
+        self.assertEqual(self.client.delete("/synastry/profiles/b").status_code, 200)
+        self.assertEqual(self.client.delete("/synastry/profiles/b").status_code, 404)
+
+    def test_profiles_are_shared_through_the_store(self):
+        resp = self.client.post("/synastry/profiles", json=[
+            {"id": "a", "date": "1990-01-01", "time": "12:00", "place": "Moscow", "tz_offset": 3},
+            {"id": "b", "date": "1992-02-02", "time": "15:00", "place": "London", "tz_offset": 0},
+            {"id": "", "date": "1992-02-02", "time": "15:00", "place": "London", "tz_offset": 0},
+        ])
+        self.assertEqual(resp.json()["indexed"], 2)
+        self.assertEqual(resp.json()["errors"][0]["index"], 2)
+        # Another worker, or the next start, reads the same file
+        index = CompatibilityIndex()
+        other = profiles.ProfileStore(self.path, index=index)
+        self.assertEqual(len(index), 2)
+        self.assertEqual(other.birth("compat:b"), ("1992-02-02", "15:00", "London", 0))
+        self.assertEqual(self.client.get("/profiles/compat:a").json()["place"], "Moscow")
+        self.client.delete("/synastry/profiles/a")
+        other.refresh()
+        self.assertNotIn("compat:a", index)
+
+    def test_client_ids_cannot_reach_generated_profiles(self):
+        profile_id = self.client.post("/profiles", json={
+            "date": "1990-01-01", "time": "12:00", "place": "Moscow", "tz_offset": 3}).json()["profile_id"]
+        resp = self.client.post("/synastry/profiles", json=[
+            {"id": profile_id, "date": "1992-02-02", "time": "15:00", "place": "London", "tz_offset": 0}])
+        self.assertEqual(resp.json()["indexed"], 1)
+        self.assertEqual(self.client.get(f"/profiles/{profile_id}").json()["place"], "Moscow")
+        self.assertEqual(self.client.delete(f"/synastry/profiles/{profile_id}").status_code, 200)
+        self.assertEqual(self.client.delete(f"/synastry/profiles/{profile_id}").status_code, 404)
+        self.assertEqual(self.client.get(f"/profiles/{profile_id}").status_code, 200)
+
+    def test_library_records_may_leave_out_the_offset(self):
+        result = synastry_index_add([{"id": "a", "date": "1990-07-01", "time": "12:00", "place": "Moscow"}])
+        self.assertEqual(result["indexed"], 1)
+        self.assertEqual(self.store.birth("compat:a"), ("1990-07-01", "12:00", "Moscow", 4))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,45 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+import numpy as np
+import swisseph as swe
+import astro_core
+from ephemeris_store import EphemerisStore, build
+
+
+class TestEphemerisStore(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.path = os.path.join(cls.tmp.name, "ephem")
+        build(cls.path, 2024, 2024, astro_core.planet_codes)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp.cleanup()
+
+    def test_interpolation_matches_swiss_ephemeris(self):
+        store = EphemerisStore(self.path)
+        self.assertLess(store.max_error(astro_core.planet_codes, samples=200).max(), 0.001)
+        jd = swe.julday(2024, 3, 10, 7.5)
+        speed = swe.calc_ut(jd, swe.MOON)[0][3]
+        self.assertAlmostEqual(store.positions(jd)[0, 1, astro_core.SPEED], speed, places=3)
+
+    def test_planet_positions_uses_store_in_range_only(self):
+        store = EphemerisStore(self.path)
+        inside = [swe.julday(2024, 6, 1, 12), swe.julday(2024, 6, 2, 12)]
+        outside = [swe.julday(2030, 1, 1, 0)]
+        with patch('astro_core.default_store', return_value=store), \
+             patch.object(store, 'positions', wraps=store.positions) as positions:
+            fast = astro_core.planet_positions(inside, interpolate=True)
+            astro_core.planet_positions(outside, interpolate=True)
+            astro_core.planet_positions(inside)
+        self.assertEqual(positions.call_count, 1)
+        exact = astro_core.planet_positions(inside)
+        diff = (fast[..., astro_core.LON] - exact[..., astro_core.LON] + 180) % 360 - 180
+        self.assertLess(np.abs(diff).max(), 0.001)
+
+
+if __name__ == '__main__':
+    unittest.main()
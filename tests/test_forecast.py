@@ -19,5 +19,40 @@ class TestForecastAPI(unittest.TestCase):
             self.assertIn('aspects', day)
             self.assertIn('houses', day)
 
+    def test_forecast_events_endpoint(self):
+        import json
+        from fastapi.testclient import TestClient
+        from main import app
+        client = TestClient(app)
+        params = {"date": "1990-05-15", "time": "14:30", "place": "Moscow", "tz_offset": 3,
+                  "start_date": "2024-01-01", "end_date": "2024-01-15"}
+        resp = client.get("/forecast/events", params=params)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.headers["content-type"], "application/x-ndjson")
+        events = [json.loads(line) for line in resp.text.splitlines()]
+        self.assertTrue(events)
+        self.assertEqual({e["event"] for e in events}, {"enter", "exact", "exit"})
+        self.assertTrue(all("2024-01-01" <= e["utc"] < "2024-01-15" for e in events))
+        resp = client.get("/forecast/events", params=dict(params, end_date="2023-12-31"))
+        self.assertIn("error", resp.json())
+
+    def test_ingresses_and_retrogrades_endpoints(self):
+        import json
+        from fastapi.testclient import TestClient
+        from main import app
+        client = TestClient(app)
+        params = {"start_date": "2024-03-01", "end_date": "2024-05-01"}
+        resp = client.get("/forecast/ingresses", params=params)
+        events = [json.loads(line) for line in resp.text.splitlines()]
+        self.assertIn({"event": "ingress", "body": "Sun", "sign": "Aries"},
+                      [{k: e[k] for k in ("event", "body", "sign")} for e in events if e["event"] == "ingress"])
+        self.assertNotIn("house_ingress", {e["event"] for e in events})
+        natal = {"date": "1990-05-15", "time": "14:30", "place": "Moscow", "tz_offset": 3}
+        resp = client.get("/forecast/ingresses", params=dict(params, **natal))
+        self.assertIn("house_ingress", {json.loads(line)["event"] for line in resp.text.splitlines()})
+        self.assertEqual(client.get("/forecast/ingresses", params=dict(params, date="1990-05-15")).status_code, 422)
+        resp = client.get("/forecast/retrogrades", params=params)
+        self.assertIn("Mercury", [p["body"] for p in resp.json()["periods"]])
+
 if __name__ == '__main__':
     unittest.main()
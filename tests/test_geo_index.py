@@ -0,0 +1,118 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+from unittest.mock import patch, MagicMock
+import astro_core
+from geo_index import PlaceIndex, country_code, normalize_place
+
+
+class TestPlaceIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.index = PlaceIndex(os.path.join(self.tmp.name, "places.db"))
+        astro_core.place_cache.clear()
+
+    def tearDown(self):
+        self.index.close()
+        self.tmp.cleanup()
+
+    def test_normalize_place(self):
+        self.assertEqual(normalize_place("  São Paulo,  Brazil "), "sao paulo brazil")
+        self.assertEqual(normalize_place("SAO-PAULO brazil"), "sao paulo brazil")
+
+    def test_exact_and_prefix_lookup(self):
+        self.index.add("Riga", 56.95, 24.1, population=600000, source="geonames")
+        self.index.add("Rigaud", 45.48, -74.3, population=7000, source="geonames")
+        self.assertEqual(self.index.lookup("riga"), (56.95, 24.1))
+        self.assertEqual(self.index.lookup("Rigau"), (45.48, -74.3))
+        self.assertEqual(self.index.lookup("Rig"), (56.95, 24.1))
+        self.assertIsNone(self.index.lookup("Ri"))
+        self.assertIsNone(self.index.lookup("Tallinn"))
+
+    @patch('astro_core.Nominatim')
+    def test_geocoder_answers_are_not_prefix_matches(self, mock_nominatim):
+        texas, france = MagicMock(latitude=33.66, longitude=-95.55), MagicMock(latitude=48.86, longitude=2.35)
+        mock_nominatim.return_value.geocode.side_effect = [texas, france]
+        with patch.object(astro_core, 'place_index', self.index):
+            self.assertEqual(astro_core.resolve_place("Paris, Texas"), (33.66, -95.55))
+            self.assertEqual(astro_core.resolve_place("Paris"), (48.86, 2.35))
+        self.assertEqual(mock_nominatim.return_value.geocode.call_count, 2)
+
+    @patch('astro_core.Nominatim')
+    def test_city_and_country(self, mock_nominatim):
+        self.index.add("Paris", 48.86, 2.35, population=2100000, source="geonames", country="FR")
+        self.index.add("London", 51.51, -0.13, population=8900000, source="geonames", country="GB")
+        self.index.add("London", 42.98, -81.23, population=350000, source="geonames", country="CA")
+        self.assertEqual(self.index.lookup("Paris, France"), (48.86, 2.35))
+        self.assertEqual(self.index.lookup("Paris, Île-de-France, FR"), (48.86, 2.35))
+        self.assertEqual(self.index.lookup("London, Canada"), (42.98, -81.23))
+        self.assertEqual(self.index.lookup("London, UK"), (51.51, -0.13))
+        self.assertIsNone(self.index.lookup("Paris, Germany"))
+        # Not a country: the geocoder decides which Paris is meant
+        self.assertIsNone(self.index.lookup("Paris, Texas"))
+        mock_nominatim.return_value.geocode.return_value = MagicMock(latitude=33.66, longitude=-95.55)
+        with patch.object(astro_core, 'place_index', self.index):
+            self.assertEqual(astro_core.resolve_place("Paris, France"), (48.86, 2.35))
+            self.assertEqual(astro_core.resolve_place("Paris, Texas"), (33.66, -95.55))
+        self.assertEqual(mock_nominatim.return_value.geocode.call_count, 1)
+
+    def test_country_codes(self):
+        self.assertEqual(country_code("Switzerland"), "CH")
+        self.assertEqual(country_code(" ch "), "CH")
+        self.assertEqual(country_code("Britain"), "GB")
+        self.assertEqual(country_code("Antigua and Barbuda"), "AG")
+        self.assertEqual(country_code("Korea (South)"), "KR")
+        self.assertIsNone(country_code("Korea"))
+        self.assertIsNone(country_code("Texas"))
+
+    def test_index_without_countries_is_upgraded(self):
+        path = os.path.join(self.tmp.name, "old.db")
+        conn = sqlite3.connect(path)
+        conn.execute("CREATE TABLE places (name TEXT NOT NULL, lat REAL NOT NULL, lon REAL NOT NULL, "
+                     "population INTEGER NOT NULL DEFAULT 0, timezone TEXT, "
+                     "source TEXT NOT NULL DEFAULT 'geonames')")
+        conn.execute("INSERT INTO places (name, lat, lon) VALUES ('riga', 56.95, 24.1)")
+        conn.commit()
+        conn.close()
+        index = PlaceIndex(path)
+        self.addCleanup(index.close)
+        self.assertEqual(index.lookup("Riga"), (56.95, 24.1))
+        self.assertIsNone(index.lookup("Riga, Latvia"))
+
+    def test_import_geonames(self):
+        dump = os.path.join(self.tmp.name, "cities.txt")
+        cols = [""] * 19
+        cols[1], cols[2], cols[4], cols[5], cols[8], cols[14], cols[17] = (
+            "Zürich", "Zurich", "47.37", "8.55", "CH", "341730", "Europe/Zurich")
+        with open(dump, "w", encoding="utf-8") as f:
+            f.write("\t".join(cols) + "\n")
+        self.assertEqual(self.index.import_geonames(dump), 1)
+        self.assertEqual(self.index.lookup("ZURICH"), (47.37, 8.55))
+        self.assertEqual(self.index.timezone("zurich"), "Europe/Zurich")
+        self.assertEqual(self.index.lookup("Zürich, Switzerland"), (47.37, 8.55))
+        self.assertIsNone(self.index.timezone("Basel"))
+
+    def test_gazetteer_timezone_sets_the_offset(self):
+        import tz_index
+        self.index.add("Zurich", 47.37, 8.55, timezone="Europe/Zurich", source="geonames")
+        tz_index.zone_cache.clear()
+        self.addCleanup(tz_index.zone_cache.clear)
+        with patch.object(astro_core, 'place_index', self.index), patch.object(tz_index, "default_index", lambda: None):
+            # Summer time: UTC+2, where the nautical zone of 8.55°E would say UTC+1
+            self.assertEqual(astro_core.utc_offset("2020-07-01", "12:00", "Zurich"), 2)
+
+    @patch('astro_core.Nominatim')
+    def test_geocoder_miss_is_written_back(self, mock_nominatim):
+        mock_geo = MagicMock()
+        mock_geo.latitude = 56.95
+        mock_geo.longitude = 24.1
+        mock_nominatim.return_value.geocode.return_value = mock_geo
+        with patch.object(astro_core, 'place_index', self.index):
+            self.assertEqual(astro_core.resolve_place("Riga, Latvia"), (56.95, 24.1))
+            self.assertEqual(astro_core.resolve_place("riga latvia"), (56.95, 24.1))
+        self.assertEqual(mock_nominatim.return_value.geocode.call_count, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,8 +1,9 @@
 import unittest
 from unittest.mock import patch, MagicMock
 from main import app
+from tests.helpers import FakeEphemerisTestCase
 
-class TestHoraryAPI(unittest.TestCase):
+class TestHoraryAPI(FakeEphemerisTestCase):
     @patch('astro_core.Nominatim')
     @patch('astro_core.swe')
     def test_horary_chart_endpoint(self, mock_swe, mock_nominatim):
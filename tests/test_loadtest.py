@@ -0,0 +1,59 @@
+import asyncio
+import unittest
+from unittest.mock import patch, MagicMock
+import httpx
+import astro_core
+from loadtest.fake_geocoder import FakeGeocoder, coordinates
+from loadtest.generator import Population, parse_mix, run
+from main import app
+
+
+class TestFakeGeocoder(unittest.TestCase):
+    def setUp(self):
+        self.server = FakeGeocoder(("127.0.0.1", 0), seed=1)
+        self.server.start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        astro_core.place_cache.clear()
+        patcher = patch('astro_core.place_index', MagicMock(lookup=MagicMock(return_value=None)))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_answers_like_nominatim(self):
+        resp = httpx.get(self.server.url, params={"q": "Loadtown 1", "format": "json", "limit": 1})
+        hit = resp.json()[0]
+        self.assertEqual((float(hit["lat"]), float(hit["lon"])), coordinates("loadtown 1"))
+        self.server.failure_rate = 1.0
+        self.assertEqual(httpx.get(self.server.url, params={"q": "x"}).status_code, 503)
+        self.server.failure_rate, self.server.not_found_rate = 0.0, 1.0
+        self.assertEqual(httpx.get(self.server.url, params={"q": "x"}).json(), [])
+
+    def test_both_geocoding_paths_use_the_configured_url(self):
+        with patch('astro_core.GEOCODER_URL', self.server.url):
+            self.assertEqual(astro_core.resolve_place("Loadtown 2"), coordinates("Loadtown 2"))
+            self.assertEqual(asyncio.run(astro_core.resolve_place_async("Loadtown 3")), coordinates("Loadtown 3"))
+        self.assertEqual(self.server.requests, 2)
+
+    def test_nominatim_options(self):
+        self.assertEqual(astro_core._nominatim_options("http://127.0.0.1:8089/search"),
+                         {"domain": "127.0.0.1:8089", "scheme": "http"})
+        self.assertEqual(astro_core._nominatim_options("https://geo.example.com/nominatim/search/"),
+                         {"domain": "geo.example.com/nominatim", "scheme": "https"})
+
+    def test_generator_against_app(self):
+        async def go():
+            async with httpx.AsyncClient(app=app, base_url="http://test") as client:
+                return await run(client, rps=40, duration=0.5, mix=parse_mix("json"),
+                                 population=Population(places=5, seed=3))
+        with patch('astro_core.GEOCODER_URL', self.server.url):
+            result = asyncio.run(go())
+        self.assertEqual(result["requests"], 20)
+        self.assertEqual(result["error_rate"], 0.0)
+        self.assertEqual(sum(k["requests"] for k in result["kinds"].values()), 20)
+        self.assertLessEqual(self.server.requests, 5)
+        with self.assertRaises(ValueError):
+            parse_mix("natal=1,bogus=2")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+import unittest
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+import metrics
+from metrics import Histogram, timer
+from main import app
+
+NATAL = {"date": "1990-01-01", "time": "12:00", "place": "Moscow", "tz_offset": 3}
+
+
+class TestMetrics(unittest.TestCase):
+    def setUp(self):
+        metrics.reset()
+
+    def test_histogram_buckets_are_cumulative(self):
+        hist = Histogram(buckets=(0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 3.0):
+            hist.observe(value)
+        cumulative, total, count = hist.snapshot()
+        self.assertEqual(cumulative, [(0.1, 2), (1.0, 3), (float("inf"), 4)])
+        self.assertAlmostEqual(total, 3.65)
+        self.assertEqual(count, 4)
+
+    def test_timer(self):
+        with timer("unit"):
+            pass
+        self.assertEqual(metrics.stages["unit"].count, 1)
+        with patch.object(metrics, "ENABLED", False):
+            with timer("off"):
+                pass
+        self.assertNotIn("off", metrics.stages)
+
+
+class TestMetricsAPI(unittest.TestCase):
+    def setUp(self):
+        metrics.reset()
+        self.client = TestClient(app)
+
+    def test_server_timing_header(self):
+        import astro_core
+        astro_core.chart_cache.clear()
+        self.assertNotIn("server-timing", self.client.get("/natal_chart/calc", params=NATAL).headers)
+        astro_core.chart_cache.clear()
+        with patch.object(metrics, "SERVER_TIMING", True):
+            resp = self.client.get("/natal_chart/calc", params=NATAL)
+        stages = dict(part.split(";dur=") for part in resp.headers["server-timing"].split(", "))
+        self.assertEqual(set(stages), {"ephemeris", "houses", "aspects", "serialize", "total"})
+        self.assertGreaterEqual(float(stages["total"]), float(stages["ephemeris"]))
+
+    def test_metrics_endpoint(self):
+        self.client.get("/natal_chart/calc", params=NATAL)
+        self.client.delete("/synastry/profiles/unknown")
+        resp = self.client.get("/metrics")
+        self.assertEqual(resp.status_code, 200)
+        self.assertTrue(resp.headers["content-type"].startswith("text/plain; version=0.0.4"))
+        text = resp.text
+        self.assertIn('natal_stage_seconds_bucket{stage="serialize",le="+Inf"} 1', text)
+        self.assertIn('natal_request_seconds_count{method="GET",route="/natal_chart/calc",status="200"} 1', text)
+        self.assertIn('route="/synastry/profiles/{profile_id}",status="404"', text)
+        self.assertIn('natal_cache_size{cache="charts"}', text)
+
+
+if __name__ == '__main__':
+    unittest.main()
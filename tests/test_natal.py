@@ -1,10 +1,17 @@
 import unittest
+import astro_core
+import image_cache
 from unittest.mock import patch, MagicMock
 from astro_core import calculate_chart
 from chart_draw import draw_chart
 from main import app
+from tests.helpers import FakeEphemerisTestCase
+
+class TestNatalAPI(FakeEphemerisTestCase):
+    def setUp(self):
+        super().setUp()
+        image_cache.memory.clear()
 
-class TestNatalAPI(unittest.TestCase):
     @patch('astro_core.Nominatim')
     @patch('astro_core.swe')
     def test_calculate_chart_valid(self, mock_swe, mock_nominatim):
@@ -26,6 +33,78 @@ class TestNatalAPI(unittest.TestCase):
         self.assertIn('retrograde_planets', data)
         self.assertIn('aspects', data)
 
+    @patch('astro_core.swe')
+    def test_calculate_chart_is_memoized(self, mock_swe):
+        mock_swe.julday.return_value = 2450000.5
+        mock_swe.calc_ut.return_value = ([123.45, 0, 0, 1.0],)
+        mock_swe.houses.return_value = ([10.0]*12, None)
+        first, _ = calculate_chart('2000-01-01', '12:00', 'Moscow', 3)
+        calls = mock_swe.calc_ut.call_count
+        second, _ = calculate_chart('2000-01-01', '12:00', 'Moscow', 3)
+        self.assertIs(first, second)
+        self.assertEqual(mock_swe.calc_ut.call_count, calls)
+        self.assertEqual(mock_swe.houses.call_count, 1)
+        with self.assertRaises(TypeError):
+            second['planet_degrees']['Sun'] = 0.0
+
+    def test_chart_is_array_backed(self):
+        chart, _ = calculate_chart('1990-01-01', '12:00', 'Moscow', 3)
+        self.assertIsInstance(chart, astro_core.Chart)
+        self.assertFalse(hasattr(chart, '__dict__'))
+        self.assertEqual(chart.degrees.shape, (10,))
+        self.assertEqual(chart.cusps.shape, (12,))
+        with self.assertRaises(ValueError):
+            chart.degrees[0] = 0.0
+        self.assertIs(chart['aspects'], chart['aspects'])
+        with self.assertRaises(KeyError):
+            chart['unknown']
+        data = chart.to_dict()
+        self.assertEqual(list(data), ['jd', 'lat', 'lon', 'planet_degrees', 'houses', 'aspects',
+                                      'retrograde_planets', 'house_rulers'])
+        self.assertEqual(data['planet_degrees'], dict(zip(astro_core.planet_names, chart.degrees.tolist())))
+        self.assertEqual(dict(chart['planet_degrees']), data['planet_degrees'])
+        self.assertEqual(len(chart.aspect_triples()), len(data['aspects']))
+        for (i, j, k), asp in zip(chart.aspect_triples(), data['aspects']):
+            self.assertEqual(asp['between'], f"{astro_core.planet_names[i]} - {astro_core.planet_names[j]}")
+            self.assertEqual(asp['type'], astro_core.ASPECT_NAMES[k])
+        from chart_style import aspect_triples
+        self.assertEqual(aspect_triples(data['planet_degrees'], data['aspects']), chart.aspect_triples())
+        self.assertEqual(chart.get('missing', 1), 1)
+
+    @patch('astro_core.swe')
+    def test_planet_positions_one_call_per_body_and_day(self, mock_swe):
+        mock_swe.calc_ut.return_value = ([123.45, 1.5, 0.98, -0.2, 0, 0], 0)
+        positions = astro_core.planet_positions([2450000.5, 2450001.5])
+        self.assertEqual(positions.shape, (2, 10, 4))
+        self.assertEqual(mock_swe.calc_ut.call_count, 20)
+        self.assertEqual(positions[1, 3].tolist(), [123.45, 1.5, 0.98, -0.2])
+
+    @patch('astro_core.Nominatim')
+    @patch('astro_core.swe')
+    def test_calculate_charts_batch(self, mock_swe, mock_nominatim):
+        astro_core.place_cache.clear()
+        mock_nominatim.return_value.geocode.return_value = None
+        mock_swe.julday.side_effect = lambda y, m, d, h: 2450000.5 + d + h / 24
+        mock_swe.calc_ut.side_effect = lambda jd, code: [[(jd * 13 + int(code) * 36.0) % 360, 0, 0, 1.0]]
+        mock_swe.houses.return_value = ([10.0]*12, None)
+        records = [
+            {"date": "2000-01-01", "time": "12:00", "place": "Moscow", "tz_offset": 3},
+            {"date": "2000-01-02", "time": "12:00", "place": "Nowhere", "tz_offset": 3},
+            {"date": "2000-01-02", "time": "08:30", "place": "London", "tz_offset": 0},
+            {"date": "not a date", "time": "12:00", "place": "London", "tz_offset": 0},
+            {"date": "2000-01-01", "time": "12:00", "place": "Moscow", "tz_offset": 3},
+        ]
+        results = list(astro_core.calculate_charts(records, chunk_size=3))
+        self.assertEqual(len(results), 5)
+        self.assertEqual(results[1], (None, {"error": "Invalid place name"}))
+        self.assertEqual(results[3], (None, {"error": "Invalid date or time"}))
+        self.assertIs(results[0][0], results[4][0])
+        self.assertEqual(mock_nominatim.return_value.geocode.call_count, 1)
+        for n in (0, 2):
+            astro_core.chart_cache.clear()
+            single, _ = calculate_chart(**records[n])
+            self.assertEqual(results[n][0], single)
+
     @patch('astro_core.Nominatim')
     def test_calculate_chart_invalid_place(self, mock_nominatim):
         mock_nominatim.return_value.geocode.return_value = None
@@ -85,5 +164,36 @@ class TestNatalAPI(unittest.TestCase):
         self.assertTrue('Sun' in data['retrograde_planets'] or 'Moon' in data['retrograde_planets'])
         #os.remove('test_chart.png')
 
+    def test_natal_chart_image_formats(self):
+        from fastapi.testclient import TestClient
+        client = TestClient(app)
+        params = {"date": "2000-01-01", "time": "12:00", "place": "Moscow", "tz_offset": 3}
+        resp = client.get("/natal_chart/image", params=dict(params, format="svg"))
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.headers["content-type"], "image/svg+xml")
+        self.assertTrue(resp.content.startswith(b"<svg"))
+        self.assertIn("☉".encode(), resp.content)
+        resp = client.get("/natal_chart/image", params=dict(params, format="webp"))
+        self.assertEqual(resp.headers["content-type"], "image/webp")
+        self.assertEqual(resp.content[8:12], b"WEBP")
+        resp = client.get("/natal_chart/image", params=dict(params, format="gif"))
+        self.assertEqual(resp.status_code, 422)
+
+    def test_natal_chart_batch_endpoint(self):
+        from fastapi.testclient import TestClient
+        import json
+        client = TestClient(app)
+        records = [
+            {"id": "a", "date": "2000-01-01", "time": "12:00", "place": "Moscow", "tz_offset": 3},
+            {"id": "b", "date": "2000-13-01", "time": "12:00", "place": "London", "tz_offset": 0},
+        ]
+        resp = client.post("/natal_chart/batch", json=records)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.headers["content-type"], "application/x-ndjson")
+        lines = [json.loads(line) for line in resp.text.splitlines()]
+        self.assertEqual([line["id"] for line in lines], ["a", "b"])
+        self.assertEqual(len(lines[0]["chart"]["planet_degrees"]), 10)
+        self.assertEqual(lines[1]["error"], "Invalid date or time")
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,162 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+import astro_core
+import profiles
+from astro_core import calculate_chart
+from compatibility import CompatibilityIndex, default_index
+from logic_natal import natal_chart_calc
+from main import app
+from profiles import ProfileStore
+
+NATAL = {"date": "1990-01-01", "time": "12:00", "place": "Moscow", "tz_offset": 3}
+PARTNER = {"date": "1992-02-02", "time": "15:00", "place": "London", "tz_offset": 0}
+
+
+class TestProfileStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path = os.path.join(self.tmp.name, "profiles.bin")
+
+    def add(self, store, birth=NATAL):
+        chart, err = calculate_chart(**birth)
+        self.assertIsNone(err)
+        return store.add(chart, **birth), chart
+
+    def test_round_trip(self):
+        store = ProfileStore(self.path, fsync=False)
+        profile_id, chart = self.add(store)
+        astro_core.chart_cache.clear()
+        self.assertEqual(store.chart(profile_id).to_dict(), chart.to_dict())
+        reopened = ProfileStore(self.path)
+        self.assertEqual(len(reopened), 1)
+        self.assertEqual(reopened.chart(profile_id).to_dict(), chart.to_dict())
+        self.assertEqual(reopened.birth(profile_id), ("1990-01-01", "12:00", "Moscow", 3))
+        self.assertIsNone(reopened.chart("0" * 16))
+
+    def test_fractional_offset_and_unicode_place(self):
+        store = ProfileStore(self.path, fsync=False)
+        chart, _ = calculate_chart(**NATAL)
+        profile_id = store.add(chart, "1990-01-01", "12:00", "Москва", 5.5)
+        self.assertEqual(ProfileStore(self.path).birth(profile_id), ("1990-01-01", "12:00", "Москва", 5.5))
+
+    def test_long_place_name(self):
+        store = ProfileStore(self.path, fsync=False)
+        chart, _ = calculate_chart(**NATAL)
+        place = "Moscow, " + "x" * 70000
+        profile_id = store.add(chart, "1990-01-01", "12:00", place, 3)
+        self.assertEqual(ProfileStore(self.path).birth(profile_id)[2], place)
+
+    def test_other_instance_sees_appends_and_deletes(self):
+        index = CompatibilityIndex()
+        writer = ProfileStore(self.path, fsync=False)
+        reader = ProfileStore(self.path, index=index)
+        profile_id, chart = self.add(writer)
+        self.assertEqual(reader.chart(profile_id).to_dict(), chart.to_dict())
+        self.assertIn(profile_id, index)
+        self.assertTrue(writer.remove(profile_id))
+        self.assertFalse(writer.remove(profile_id))
+        reader.refresh()
+        self.assertNotIn(profile_id, reader)
+        self.assertNotIn(profile_id, index)
+        self.assertIsNone(ProfileStore(self.path).chart(profile_id))
+
+    def test_torn_tail_is_ignored_and_cut_off(self):
+        store = ProfileStore(self.path, fsync=False)
+        first, _ = self.add(store)
+        size = os.path.getsize(self.path)
+        with open(self.path, "ab") as f:
+            f.write(b"\x40\x01\x00\x00\x01partial")
+        reopened = ProfileStore(self.path)
+        self.assertEqual(len(reopened), 1)
+        second, _ = self.add(reopened, PARTNER)
+        self.assertEqual(os.path.getsize(self.path) - size, reopened._offset - size)
+        final = ProfileStore(self.path)
+        self.assertIn(first, final)
+        self.assertIn(second, final)
+
+    def test_rejects_other_files(self):
+        with open(self.path, "wb") as f:
+            f.write(b"not a profile store")
+        with self.assertRaises(ValueError):
+            ProfileStore(self.path)
+
+
+class TestProfilesAPI(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.store = ProfileStore(os.path.join(tmp.name, "profiles.bin"), index=default_index, fsync=False)
+        self.addCleanup(lambda: [default_index.remove(p) for p in list(self.store._values)])
+        patcher = patch.object(profiles, "_default", self.store)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = TestClient(app)
+        resp = self.client.post("/profiles", json=NATAL)
+        self.assertEqual(resp.status_code, 200)
+        self.profile_id = resp.json()["profile_id"]
+        self.assertEqual(resp.json()["chart"], self.client.get("/natal_chart/calc", params=NATAL).json())
+
+    def test_stored_chart_skips_geocoding_and_ephemeris(self):
+        expected = natal_chart_calc(**NATAL)
+        astro_core.chart_cache.clear()
+        with patch("astro_core.Nominatim") as nominatim, patch("astro_core.swe") as swe:
+            result = natal_chart_calc(None, None, None, None, profile_id=self.profile_id)
+        nominatim.assert_not_called()
+        swe.calc_ut.assert_not_called()
+        swe.houses.assert_not_called()
+        self.assertEqual(result, expected)
+
+    def test_profile_id_in_place_of_birth_data(self):
+        pairs = [
+            ("/transits", {"natal_date": NATAL["date"], "natal_time": NATAL["time"], "natal_place": NATAL["place"],
+                           "natal_tz_offset": NATAL["tz_offset"]}, {"transit_date": "2025-06-13"}),
+            ("/weekly_forecast", NATAL, {"start_date": "2025-06-01"}),
+            ("/natal_chart/calc", NATAL, {}),
+        ]
+        for path, birth, extra in pairs:
+            with self.subTest(path=path):
+                direct = self.client.get(path, params={**birth, **extra})
+                stored = self.client.get(path, params={"profile_id": self.profile_id, **extra})
+                self.assertEqual(stored.status_code, 200)
+                self.assertEqual(stored.json(), direct.json())
+
+    def test_synastry_mixes_profiles_and_birth_data(self):
+        person2 = {f"{k}2": v for k, v in PARTNER.items()}
+        direct = self.client.get("/synastry", params={**{f"{k}1": v for k, v in NATAL.items()}, **person2})
+        stored = self.client.get("/synastry", params={"profile_id1": self.profile_id, **person2})
+        self.assertEqual(stored.json(), direct.json())
+
+    def test_forecast_events_stream(self):
+        extra = {"start_date": "2025-01-01", "end_date": "2025-02-01"}
+        direct = self.client.get("/forecast/events", params={**NATAL, **extra})
+        stored = self.client.get("/forecast/events", params={"profile_id": self.profile_id, **extra})
+        self.assertEqual(stored.text, direct.text)
+
+    def test_search_leaves_the_profile_out(self):
+        other = self.client.post("/profiles", json=PARTNER).json()["profile_id"]
+        resp = self.client.get("/synastry/search", params={"profile_id": self.profile_id})
+        ids = [m["id"] for m in resp.json()["matches"]]
+        self.assertIn(other, ids)
+        self.assertNotIn(self.profile_id, ids)
+
+    def test_get_and_delete(self):
+        resp = self.client.get(f"/profiles/{self.profile_id}")
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual({k: resp.json()[k] for k in NATAL}, NATAL)
+        self.assertEqual(self.client.delete(f"/profiles/{self.profile_id}").status_code, 200)
+        self.assertEqual(self.client.get(f"/profiles/{self.profile_id}").status_code, 404)
+        self.assertEqual(self.client.delete(f"/profiles/{self.profile_id}").status_code, 404)
+
+    def test_unknown_profile_and_missing_birth_data(self):
+        resp = self.client.get("/transits", params={"profile_id": "0" * 16, "transit_date": "2025-06-13"})
+        self.assertEqual(resp.json(), {"error": "Unknown profile"})
+        resp = self.client.get("/weekly_forecast", params={"date": "1990-01-01", "start_date": "2025-06-01"})
+        self.assertEqual(resp.status_code, 422)
+
+
+if __name__ == '__main__':
+    unittest.main()
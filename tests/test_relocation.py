@@ -0,0 +1,132 @@
+import time
+import unittest
+import numpy as np
+import swisseph as swe
+from fastapi.testclient import TestClient
+from astro_core import planet_codes, planet_names
+from main import app
+from relocation import ANGLES, angles, grid, grid_size, lines, relocation, relocation_geojson, sky
+
+JD = swe.julday(1990, 1, 1, 9.0)
+NATAL = {"date": "1990-01-01", "time": "12:00", "place": "Moscow", "tz_offset": 3}
+
+
+class TestRelocation(unittest.TestCase):
+    def test_angles_match_swiss_ephemeris(self):
+        gst, eps, _, _ = sky(JD)
+        lats, lons = grid(-60, 60, -180, 180, 7.5)
+        result = angles(gst, eps, lats, lons)
+        for i in range(0, len(lats), 3):
+            for j in range(0, len(lons), 5):
+                _, ascmc = swe.houses(JD, float(lats[i]), float(lons[j]), b'P')
+                self.assertAlmostEqual(result["ASC"][i, j], ascmc[0], places=6)
+                self.assertAlmostEqual(result["MC"][j], ascmc[1], places=6)
+                self.assertAlmostEqual(result["DSC"][i, j], (ascmc[0] + 180) % 360, places=6)
+
+    def test_bodies_on_their_lines(self):
+        gst, _, ra, dec = sky(JD)
+        lats = np.arange(-60.0, 61.0, 10.0)
+        on_angle = lines(gst, ra, dec, lats)
+        self.assertEqual(on_angle.shape, (len(ANGLES), len(planet_names), len(lats)))
+        for b, code in enumerate(planet_codes):
+            xin = swe.calc_ut(JD, code, swe.FLG_EQUATORIAL)[0][:3]
+            for n, lat in enumerate(lats):
+                altitudes = {}
+                for a, angle in enumerate(ANGLES):
+                    lon = on_angle[a, b, n]
+                    if np.isnan(lon):
+                        continue
+                    altitudes[angle] = swe.azalt(JD, swe.EQU2HOR, (float(lon), float(lat), 0), 0, 0, xin)[1]
+                self.assertAlmostEqual(altitudes["ASC"], 0, delta=1e-6)
+                self.assertAlmostEqual(altitudes["DSC"], 0, delta=1e-6)
+                # Culminating above the horizon on the MC, below it on the IC
+                self.assertAlmostEqual(altitudes["MC"], 90 - abs(lat - dec[b]), delta=1e-6)
+                self.assertAlmostEqual(altitudes["IC"], -90 + abs(lat + dec[b]), delta=1e-6)
+
+    def test_circumpolar_bodies_have_no_horizon_line(self):
+        gst, _, ra, dec = sky(JD)
+        sun = planet_names.index("Sun")
+        # Declination about -23°: the Sun neither rises nor sets near the poles
+        on_angle = lines(gst, ra, dec, [-80.0, 0.0, 80.0])
+        self.assertTrue(np.isnan(on_angle[0, sun, [0, 2]]).all())
+        self.assertFalse(np.isnan(on_angle[:, sun, 1]).any())
+
+    def test_grid_stays_inside_its_bounds(self):
+        # 10° does not divide 178° of latitude: stop at 81° rather than 91°
+        lats, lons = grid(step=10)
+        self.assertEqual(lats[0], -89)
+        self.assertEqual(lats[-1], 81)
+        self.assertEqual(len(lons), 36)
+        lats, lons = grid(-10, 10, -180, 180, 7)
+        self.assertEqual(lats.tolist(), [-10, -3, 4])
+        self.assertEqual(lons[-1], 177)
+        for bounds in [(-89, 89, -180, 180, 10), (-89, 89, -180, 180, 0.1), (0, 1, 0, 1, 0.3), (-10, 10, -180, 180, 7)]:
+            lats, lons = grid(*bounds)
+            self.assertEqual(grid_size(*bounds), len(lats) * len(lons))
+
+    def test_global_grid_is_fast(self):
+        relocation(JD)
+        start = time.perf_counter()
+        data = relocation(JD)
+        self.assertLess(time.perf_counter() - start, 1.0)
+        self.assertEqual(len(data["lat"]), 179)
+        self.assertEqual(len(data["lon"]), 360)
+        self.assertEqual(np.asarray(data["angles"]["ASC"]).shape, (179, 360))
+        self.assertEqual(len(data["angles"]["MC"]), 360)
+        self.assertTrue(np.isnan(data["lines"]["ASC"]["Sun"][0]))
+
+    def test_geojson_segments_do_not_wrap(self):
+        collection = relocation_geojson(JD)
+        self.assertEqual(collection["type"], "FeatureCollection")
+        self.assertEqual(len(collection["features"]), len(ANGLES) * len(planet_names))
+        for feature in collection["features"]:
+            segments = feature["geometry"]["coordinates"]
+            self.assertTrue(segments)
+            for segment in segments:
+                self.assertGreater(len(segment), 1)
+                steps = np.abs(np.diff([lon for lon, _ in segment]))
+                self.assertTrue((steps < 180).all())
+
+
+class TestRelocationAPI(unittest.TestCase):
+    def setUp(self):
+        self.client = TestClient(app)
+
+    def test_arrays(self):
+        resp = self.client.get("/relocation", params={**NATAL, "lat_min": 40, "lat_max": 60,
+                                                      "lon_min": 0, "lon_max": 40, "step": 5})
+        self.assertEqual(resp.status_code, 200)
+        data = resp.json()
+        self.assertEqual(data["lat"], [40, 45, 50, 55, 60])
+        self.assertEqual(len(data["lon"]), 9)
+        self.assertEqual(set(data["lines"]), set(ANGLES))
+        self.assertEqual(np.asarray(data["angles"]["ASC"]).shape, (5, 9))
+
+    def test_step_not_dividing_the_range(self):
+        data = self.client.get("/relocation", params={**NATAL, "step": 10}).json()
+        self.assertEqual(data["lat"][-1], 81)
+        self.assertLessEqual(max(data["lon"]), 180)
+        self.assertEqual(np.asarray(data["angles"]["ASC"]).shape, (18, 36))
+        self.assertEqual(len(data["lines"]["ASC"]["Sun"]), 18)
+
+    def test_geojson(self):
+        resp = self.client.get("/relocation", params={**NATAL, "format": "geojson"})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.headers["content-type"], "application/geo+json")
+        self.assertEqual(len(resp.json()["features"]), 40)
+
+    def test_undefined_line_points_are_null(self):
+        data = self.client.get("/relocation", params=NATAL).json()
+        self.assertIsNone(data["lines"]["ASC"]["Sun"][0])
+
+    def test_bad_grids(self):
+        resp = self.client.get("/relocation", params={**NATAL, "lat_min": 10, "lat_max": 0})
+        self.assertIn("error", resp.json())
+        resp = self.client.get("/relocation", params={**NATAL, "step": 0.1})
+        self.assertIn("Grid too large", resp.json()["error"])
+        resp = self.client.get("/relocation", params={"date": NATAL["date"]})
+        self.assertEqual(resp.status_code, 422)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+import os
+import pickle
+import subprocess
+import sys
+import threading
+import time
+import unittest
+import chart_draw
+from render_pool import Lazy, RenderPool, RenderQueueFull, RenderTimeout
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class TestRenderPool(unittest.TestCase):
+    def test_inline_when_no_workers(self):
+        pool = RenderPool(workers=0, queue_depth=1, timeout=1)
+        self.assertEqual(pool.render(max, 1, 2), 2)
+
+    def test_renders_png_in_worker_process(self):
+        pool = RenderPool(workers=1, queue_depth=4, timeout=60)
+        try:
+            pool.start()
+            img = pool.render(chart_draw.draw_synastry_chart, {"Sun": 10.0}, [i * 30.0 for i in range(12)],
+                              {"Moon": 130.0}, [i * 30.0 for i in range(12)], [(0, 0, 3)], size=300)
+            self.assertTrue(img.startswith(b"\x89PNG"))
+            with self.assertRaises(RenderTimeout):
+                pool.timeout = 0.2
+                pool.render(time.sleep, 2)
+        finally:
+            pool.shutdown()
+
+    def test_queue_depth_is_enforced(self):
+        pool = RenderPool(workers=1, queue_depth=1, timeout=60)
+        try:
+            pool.start()
+            busy = threading.Thread(target=pool.render, args=(time.sleep, 1))
+            busy.start()
+            time.sleep(0.2)
+            with self.assertRaises(RenderQueueFull):
+                pool.render(time.sleep, 0)
+            busy.join()
+            self.assertIsNone(pool.render(time.sleep, 0))
+        finally:
+            pool.shutdown()
+
+    def test_timed_out_render_keeps_its_slot(self):
+        pool = RenderPool(workers=1, queue_depth=1, timeout=0.2)
+        try:
+            pool.start()
+            with self.assertRaises(RenderTimeout):
+                pool.render(time.sleep, 1)
+            # The slow render is still running in the worker
+            with self.assertRaises(RenderQueueFull):
+                pool.render(time.sleep, 0)
+            time.sleep(1.2)
+            self.assertIsNone(pool.render(time.sleep, 0))
+        finally:
+            pool.shutdown()
+
+
+class TestLazyRendering(unittest.TestCase):
+    def test_lazy_pickles_by_name(self):
+        lazy = pickle.loads(pickle.dumps(Lazy("chart_draw", "encode_image")))
+        self.assertEqual((lazy.module, lazy.name), ("chart_draw", "encode_image"))
+        self.assertEqual(Lazy("operator", "add")(2, 3), 5)
+
+    def test_api_starts_without_the_plotting_stack(self):
+        code = "import sys, main; print('matplotlib' in sys.modules, 'PIL.Image' in sys.modules)"
+        out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+        self.assertEqual(out.stdout.split(), ["False", "False"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+import json
+import unittest
+from unittest.mock import patch
+import numpy as np
+from fastapi.testclient import TestClient
+import responses
+from responses import compact, dumps, negotiate
+from main import app
+
+NATAL = {"date": "1990-01-01", "time": "12:00", "place": "Moscow", "tz_offset": 3}
+
+
+class TestEncoding(unittest.TestCase):
+    def test_dumps_handles_tuples_views_and_numpy(self):
+        from astro_core import FrozenDict
+        data = {"a": (1, 2), "b": FrozenDict({"x": 1.5}), "c": np.float64(0.25), "d": np.arange(2)}
+        self.assertEqual(json.loads(dumps(data)), {"a": [1, 2], "b": {"x": 1.5}, "c": 0.25, "d": [0, 1]})
+
+    def test_negotiate(self):
+        self.assertEqual(negotiate(None), "application/json")
+        self.assertEqual(negotiate("*/*"), "application/json")
+        self.assertEqual(negotiate("text/html, application/*;q=0.5"), "application/json")
+        self.assertEqual(negotiate("application/x-msgpack"), "application/msgpack")
+        self.assertEqual(negotiate("application/json;q=0.5, application/msgpack"), "application/msgpack")
+        # Nothing on offer asked for: JSON, unless it is refused
+        self.assertEqual(negotiate("text/plain"), "application/json")
+        self.assertEqual(negotiate("text/html, application/msgpack;q=0"), "application/json")
+        self.assertIsNone(negotiate("text/html, application/json;q=0"))
+        self.assertIsNone(negotiate("*/*;q=0"))
+        self.assertEqual(negotiate("application/json;q=0, */*"), "application/msgpack")
+        with patch.object(responses, "msgpack", None):
+            self.assertEqual(negotiate("application/msgpack, application/json;q=0.1"), "application/json")
+            self.assertEqual(negotiate("application/msgpack"), "application/json")
+            self.assertIsNone(negotiate("application/msgpack, application/json;q=0"))
+
+    def test_compact(self):
+        data = {"aspects": [{"type": "Trine", "angle": 120.1}, {"type": "Square", "angle": 90.4}],
+                "houses": [1.0, 2.0], "mixed": [{"a": 1}, {"b": 2}], "empty": []}
+        self.assertEqual(compact(data), {
+            "aspects": {"type": ["Trine", "Square"], "angle": [120.1, 90.4]},
+            "houses": [1.0, 2.0], "mixed": [{"a": 1}, {"b": 2}], "empty": []})
+
+
+class TestResponseAPI(unittest.TestCase):
+    def setUp(self):
+        self.client = TestClient(app)
+
+    def test_compact_shape(self):
+        full = self.client.get("/natal_chart/calc", params=NATAL).json()
+        resp = self.client.get("/natal_chart/calc", params={**NATAL, "shape": "compact"})
+        self.assertEqual(resp.status_code, 200)
+        aspects = resp.json()["aspects"]
+        self.assertEqual(aspects["type"], [a["type"] for a in full["aspects"]])
+        self.assertEqual(aspects["angle"], [a["angle"] for a in full["aspects"]])
+        self.assertEqual(resp.json()["planet_degrees"], full["planet_degrees"])
+        self.assertEqual(self.client.get("/natal_chart/calc", params={**NATAL, "shape": "rows"}).status_code, 422)
+
+    def test_not_acceptable(self):
+        resp = self.client.get("/natal_chart/calc", params=NATAL, headers={"Accept": "text/plain"})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.headers["content-type"], "application/json")
+        with patch.object(responses, "msgpack", None):
+            resp = self.client.get("/natal_chart/calc", params=NATAL,
+                                   headers={"Accept": "application/msgpack, application/json;q=0"})
+        self.assertEqual(resp.status_code, 406)
+        self.assertEqual(resp.json()["available"], ["application/json"])
+
+    def test_msgpack(self):
+        full = self.client.get("/natal_chart/calc", params=NATAL).json()
+        resp = self.client.get("/natal_chart/calc", params=NATAL, headers={"Accept": "application/msgpack"})
+        self.assertEqual(resp.headers["content-type"], "application/msgpack")
+        self.assertEqual(responses.msgpack.unpackb(resp.content), full)
+
+
+if __name__ == '__main__':
+    unittest.main()
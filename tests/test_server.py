@@ -0,0 +1,91 @@
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+NATAL = {"date": "1990-01-01", "time": "12:00", "place": "Moscow", "tz_offset": 3}
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def children(pid):
+    with open(f"/proc/{pid}/task/{pid}/children") as f:
+        return [int(p) for p in f.read().split()]
+
+
+def wait_for(predicate, timeout=15.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if predicate():
+                return True
+        except (httpx.HTTPError, OSError):
+            pass
+        time.sleep(0.1)
+    return False
+
+
+@unittest.skipUnless(sys.platform.startswith("linux"), "uses fork and /proc")
+class TestPreforkServer(unittest.TestCase):
+    def test_serves_restarts_workers_and_shuts_down(self):
+        port = free_port()
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        env = {**os.environ, "NATAL_PROFILE_STORE": os.path.join(tmp.name, "profiles.bin")}
+        proc = subprocess.Popen([sys.executable, "server.py", "--workers", "2", "--host", "127.0.0.1",
+                                 "--port", str(port), "--log-level", "warning"], cwd=ROOT, env=env)
+        self.addCleanup(lambda: proc.poll() is None and proc.kill())
+        url = f"http://127.0.0.1:{port}/natal_chart/calc"
+        self.assertTrue(wait_for(lambda: httpx.get(url, params=NATAL).status_code == 200))
+        self.assertEqual(httpx.get(url, params=NATAL).json()["lat"], 55.75)
+        workers = children(proc.pid)
+        self.assertEqual(len(workers), 2)
+
+        # A profile stored through one worker is readable through every worker
+        base = f"http://127.0.0.1:{port}"
+        profile_id = httpx.post(f"{base}/profiles", json=NATAL).json()["profile_id"]
+        with httpx.Client(base_url=base) as client:
+            for _ in range(8):
+                self.assertEqual(client.get(f"/profiles/{profile_id}", headers={"Connection": "close"}).status_code, 200)
+
+        os.kill(workers[0], signal.SIGKILL)
+        self.assertTrue(wait_for(lambda: len(children(proc.pid)) == 2 and workers[0] not in children(proc.pid)))
+        self.assertTrue(wait_for(lambda: httpx.get(url, params=NATAL).status_code == 200))
+
+        proc.send_signal(signal.SIGTERM)
+        self.assertEqual(proc.wait(timeout=30), 0)
+
+    def test_workers_render_in_their_own_pools(self):
+        port = free_port()
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        env = {**os.environ, "NATAL_PROFILE_STORE": os.path.join(tmp.name, "profiles.bin"),
+               "NATAL_RENDER_WORKERS": "1", "NATAL_RENDER_WARMUP": "1"}
+        proc = subprocess.Popen([sys.executable, "server.py", "--workers", "2", "--host", "127.0.0.1",
+                                 "--port", str(port), "--log-level", "warning"], cwd=ROOT, env=env)
+        self.addCleanup(lambda: proc.poll() is None and proc.kill())
+        url = f"http://127.0.0.1:{port}/natal_chart/image"
+        self.assertTrue(wait_for(lambda: httpx.get(url, params=NATAL, timeout=30).status_code == 200, timeout=60))
+        resp = httpx.get(url, params=NATAL, timeout=30)
+        self.assertEqual(resp.headers["content-type"], "image/png")
+        # Every API worker has started its own render process
+        workers = children(proc.pid)
+        self.assertEqual(len(workers), 2)
+        self.assertTrue(wait_for(lambda: all(children(pid) for pid in workers)))
+
+        proc.send_signal(signal.SIGTERM)
+        self.assertEqual(proc.wait(timeout=30), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
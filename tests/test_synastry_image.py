@@ -0,0 +1,65 @@
+import unittest
+from unittest.mock import patch
+import image_cache
+from fastapi.testclient import TestClient
+import chart_draw
+from main import app
+
+PARAMS = {
+    "date1": "1990-01-01", "time1": "12:00", "place1": "Moscow", "tz_offset1": 3,
+    "date2": "1992-02-02", "time2": "15:00", "place2": "London", "tz_offset2": 0
+}
+
+
+class TestSynastryImage(unittest.TestCase):
+    def setUp(self):
+        self.client = TestClient(app)
+
+    def test_synastry_image_png(self):
+        response = self.client.get("/synastry/image", params=PARAMS)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["content-type"], "image/png")
+        self.assertTrue(response.content.startswith(b"\x89PNG"))
+
+    def test_synastry_image_svg(self):
+        response = self.client.get("/synastry/image", params=dict(PARAMS, format="svg"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["content-type"], "image/svg+xml")
+        self.assertIn(b"Synastry Aspects", response.content)
+        self.assertNotIn(b"matplotlib", response.content)
+
+    def test_static_template_is_reused_without_leftovers(self):
+        first = self.client.get("/synastry/image", params=PARAMS).content
+        other = dict(PARAMS, date2="1980-06-06")
+        self.assertNotEqual(self.client.get("/synastry/image", params=other).content, first)
+        self.assertEqual(self.client.get("/synastry/image", params=PARAMS).content, first)
+        template = chart_draw._template("synastry", chart_draw.DEFAULT_SIZE, "light")
+        self.assertEqual(len(template.ax.lines), 0)
+
+    def test_etag_and_not_modified(self):
+        image_cache.memory.clear()
+        with patch('logic_synastry.draw_synastry_chart', wraps=chart_draw.draw_synastry_chart) as draw:
+            first = self.client.get("/synastry/image", params=PARAMS)
+            etag = first.headers["etag"]
+            self.assertIn("max-age", first.headers["cache-control"])
+            again = self.client.get("/synastry/image", params=PARAMS)
+            self.assertEqual(again.content, first.content)
+            self.assertEqual(again.headers["etag"], etag)
+            not_modified = self.client.get("/synastry/image", params=PARAMS,
+                                           headers={"If-None-Match": etag})
+            self.assertEqual(not_modified.status_code, 304)
+            self.assertEqual(not_modified.content, b"")
+            svg = self.client.get("/synastry/image", params=dict(PARAMS, format="svg"))
+            self.assertNotEqual(svg.headers["etag"], etag)
+        self.assertEqual(draw.call_count, 1)
+
+    def test_dark_theme_and_size(self):
+        img = chart_draw.draw_synastry_chart({"Sun": 10.0}, [i * 30.0 for i in range(12)],
+                                             {"Moon": 130.0}, [i * 30.0 for i in range(12)],
+                                             [(0, 0, 3)], size=600, theme="dark")
+        self.assertTrue(img.startswith(b"\x89PNG"))
+        self.assertIn(("synastry", 600, "dark"), chart_draw._templates)
+
+
+if __name__ == "__main__":
+    unittest.main()
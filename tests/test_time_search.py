@@ -0,0 +1,105 @@
+import math
+import unittest
+import numpy as np
+import swisseph as swe
+from aspects import ASPECTS
+from chart_style import zodiac
+from time_search import (aspect_events, body_events, crossings, find_root, retrograde_periods,
+                         wrap180, _aspect_targets)
+
+NATAL = {'Sun': 54.2, 'Moon': 201.5, 'Mercury': 40.1, 'Venus': 10.9, 'Mars': 333.3,
+         'Jupiter': 98.6, 'Saturn': 293.4, 'Uranus': 278.7, 'Neptune': 284.3, 'Pluto': 226.2}
+START = 2460310.5  # 2024-01-01
+
+
+class TestFindRoot(unittest.TestCase):
+    def test_brent(self):
+        self.assertAlmostEqual(find_root(lambda x: x ** 3 - 2 * x - 5, 2, 3), 2.0945514815, places=6)
+        self.assertAlmostEqual(find_root(math.cos, 0, 3), math.pi / 2, places=6)
+        self.assertEqual(find_root(lambda x: x - 1, 1, 2), 1)
+        with self.assertRaises(ValueError):
+            find_root(lambda x: x * x + 1, -1, 1)
+
+    def test_crossings_ignore_the_seam(self):
+        g = np.array([[-10.0], [5.0], [170.0], [-175.0], [-170.0]])
+        i, _ = crossings(np.arange(5), g, 0.0)
+        self.assertEqual(i.tolist(), [0])
+
+
+class TestAspectEvents(unittest.TestCase):
+    def test_exact_times_match_the_ephemeris(self):
+        events = list(aspect_events(NATAL, START, START + 30, bodies=['Moon', 'Mars', 'Mercury']))
+        self.assertTrue(events)
+        self.assertEqual([e['jd'] for e in events], sorted(e['jd'] for e in events))
+        codes = {'Moon': swe.MOON, 'Mars': swe.MARS, 'Mercury': swe.MERCURY}
+        angles = {name: angle for angle, name, _ in ASPECTS}
+        for e in events:
+            self.assertTrue(START <= e['jd'] <= START + 30)
+            lon = swe.calc_ut(e['jd'], codes[e['transit']])[0][0]
+            sep = abs(float(wrap180(lon - NATAL[e['natal']])))
+            expected = angles[e['type']] if e['event'] == 'exact' else None
+            if expected is not None:
+                self.assertAlmostEqual(sep, expected, places=3)
+            else:
+                self.assertAlmostEqual(abs(sep - angles[e['type']]), 6, places=3)
+
+    def test_matches_hourly_sampling_and_chunking(self):
+        events = list(aspect_events(NATAL, START, START + 60, bodies=['Moon'], chunk_days=7))
+        jds = np.append(np.arange(START, START + 60, 1 / 24), START + 60)
+        lons = np.array([swe.calc_ut(jd, swe.MOON)[0][0] for jd in jds])
+        targets, _ = _aspect_targets(NATAL)
+        g = wrap180(lons[:, None] - targets)
+        exact = [e for e in events if e['event'] == 'exact']
+        self.assertEqual(len(exact), len(crossings(jds, g, 0.0)[0]))
+        self.assertEqual(len([e for e in events if e['event'] == 'enter']),
+                         len(crossings(jds, g, -6)[0]))
+        self.assertEqual(events, list(aspect_events(NATAL, START, START + 60, bodies=['Moon'])))
+
+    def test_outer_planet_turning_within_one_step(self):
+        # Points just inside Pluto's 2024 stations (302.104 retrograde, 299.642
+        # direct): it reaches them and turns back within a few days
+        natal = {'Sun': 54.2, 'Pluto': 299.644, 'Jupiter': 302.1}
+        events = list(aspect_events(natal, START, START + 731, bodies=['Pluto']))
+        jds = np.append(np.arange(START, START + 731, 0.25), START + 731)
+        lons = np.array([swe.calc_ut(jd, swe.PLUTO)[0][0] for jd in jds])
+        targets, _ = _aspect_targets(natal)
+        g = wrap180(lons[:, None] - targets)
+        exact = [e for e in events if e['event'] == 'exact']
+        self.assertEqual(len(exact), len(crossings(jds, g, 0.0)[0]))
+        self.assertEqual(len([e for e in exact if e['natal'] == 'Pluto' and e['type'] == 'Conjunction']), 3)
+        self.assertEqual(len(events) - len(exact), len(crossings(jds, g, -6)[0]) + len(crossings(jds, g, 6)[0]))
+
+
+class TestBodyEvents(unittest.TestCase):
+    def test_ingresses_and_stations_2024(self):
+        cusps = [float(c) for c in range(5, 365, 30)]
+        events = list(body_events(START, START + 366, cusps=cusps, bodies=['Sun', 'Mercury']))
+        sun = [e for e in events if e['body'] == 'Sun' and e['event'] == 'ingress']
+        self.assertEqual(len(sun), 12)
+        aries = next(e for e in sun if e['sign'] == 'Aries')
+        self.assertEqual(aries['utc'], '2024-03-20 03:06')
+        self.assertAlmostEqual(float(wrap180(swe.calc_ut(aries['jd'], swe.SUN)[0][0])), 0, delta=1e-4)
+        houses = [e for e in events if e['body'] == 'Sun' and e['event'] == 'house_ingress']
+        self.assertEqual(len(houses), 12)
+        for e in houses:
+            lon = swe.calc_ut(e['jd'], swe.SUN)[0][0]
+            self.assertAlmostEqual(abs(float(wrap180(lon - cusps[e['house'] - 1]))), 0, delta=1e-4)
+        stations = [(e['utc'][:10], e['direction']) for e in events if e['event'] == 'station']
+        self.assertEqual(stations[:3], [('2024-01-02', 'direct'), ('2024-04-01', 'retrograde'),
+                                        ('2024-04-25', 'direct')])
+        # Retrograde Mercury re-enters the sign it just left
+        backwards = [e for e in events if e['event'] == 'ingress' and e['retrograde']]
+        self.assertTrue(backwards)
+        for e in backwards:
+            lon = swe.calc_ut(e['jd'] + 0.01, swe.MERCURY)[0][0]
+            self.assertEqual(int(lon // 30), [s for _, s in zodiac].index(e['sign']))
+
+    def test_retrograde_periods(self):
+        periods = retrograde_periods(START, START + 366, bodies=['Mercury', 'Sun'])
+        self.assertEqual([p['start'] and p['start'][:10] for p in periods],
+                         [None, '2024-04-01', '2024-08-05', '2024-11-26'])
+        self.assertEqual(periods[0]['end'][:10], '2024-01-02')
+
+
+if __name__ == '__main__':
+    unittest.main()
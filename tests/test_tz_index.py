@@ -0,0 +1,217 @@
+import json
+import os
+import tempfile
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+import numpy as np
+from fastapi.testclient import TestClient
+import profiles
+import tz_index
+from astro_core import TZ_REQUIRED, calculate_chart
+from main import app
+from tz_index import compile_index, simplify, utc_offset, zone_name
+
+
+def wobbly_circle(cx, cy, r, n=120):
+    t = np.linspace(0, 2 * np.pi, n, endpoint=False)
+    points = np.c_[cx + r * np.cos(t) * (1 + 0.2 * np.sin(5 * t)), cy + r * np.sin(t)]
+    return np.vstack([points, points[:1]]).tolist()
+
+
+# Berlin west of 10.3°E with a hole that is Kolkata, Moscow east of it and
+# as a second part near the antimeridian
+FEATURES = [
+    {"type": "Feature", "properties": {"tzid": "Europe/Berlin"}, "geometry": {"type": "Polygon", "coordinates": [
+        [[0, 40], [10.3, 40], [10.3, 60], [0, 60], [0, 40]], wobbly_circle(5, 50, 3)]}},
+    {"type": "Feature", "properties": {"tzid": "Europe/Moscow"}, "geometry": {"type": "MultiPolygon", "coordinates": [
+        [[[10.3, 40], [40, 40], [40, 60], [10.3, 60], [10.3, 40]]],
+        [[[170, -20], [180, -20], [180, -10], [170, -10], [170, -20]]]]}},
+    {"type": "Feature", "properties": {"tzid": "Asia/Kolkata"}, "geometry": {"type": "Polygon", "coordinates": [
+        wobbly_circle(5, 50, 3)]}},
+]
+
+
+def expected_zone(lon, lat):
+    from matplotlib.path import Path
+    if Path(wobbly_circle(5, 50, 3)).contains_point((lon, lat)):
+        return "Asia/Kolkata"
+    if 40 < lat < 60:
+        if 0 < lon < 10.3:
+            return "Europe/Berlin"
+        if 10.3 < lon < 40:
+            return "Europe/Moscow"
+    if 170 < lon < 180 and -20 < lat < -10:
+        return "Europe/Moscow"
+    return None
+
+
+class TimezoneTestCase(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.TemporaryDirectory()
+        source = os.path.join(cls.tmp.name, "zones.json")
+        with open(source, "w") as f:
+            json.dump({"type": "FeatureCollection", "features": FEATURES}, f)
+        cls.index = compile_index(source, os.path.join(cls.tmp.name, "index"))
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp.cleanup()
+
+    def setUp(self):
+        tz_index.zone_cache.clear()
+        tz_index.offset_cache.clear()
+        self.addCleanup(tz_index.zone_cache.clear)
+        self.addCleanup(tz_index.offset_cache.clear)
+
+
+class TestTimezoneIndex(TimezoneTestCase):
+    def test_matches_point_in_polygon(self):
+        rng = np.random.default_rng(3)
+        points = np.c_[rng.uniform(-5, 45, 5000), rng.uniform(35, 65, 5000)]
+        for lon, lat in points:
+            self.assertEqual(self.index.zone(lat, lon), expected_zone(lon, lat), (lat, lon))
+        self.assertEqual(self.index.zone(-15, 175), "Europe/Moscow")
+        self.assertIsNone(self.index.zone(-15, -175))
+        self.assertIsNone(self.index.zone(90, 180))
+
+    def test_offsets_follow_the_zone_history(self):
+        with patch.object(tz_index, "_default", self.index):
+            # Moscow: summer time in 1990, permanent UTC+4 in 2012, UTC+3 since 2014
+            self.assertEqual(utc_offset(55.75, 37.62, "1990-01-01", "12:00"), 3)
+            self.assertEqual(utc_offset(55.75, 37.62, "1990-07-01", "12:00"), 4)
+            self.assertEqual(utc_offset(55.75, 37.62, "2012-01-01", "12:00"), 4)
+            self.assertEqual(utc_offset(55.75, 37.62, "2020-01-01", "12:00"), 3)
+            self.assertEqual(utc_offset(52.0, 8.0, "2020-07-01", "12:00"), 2)
+            self.assertEqual(utc_offset(50.0, 5.0, "2020-07-01", "12:00"), 5.5)
+
+    def test_fallback_and_unknown_zones(self):
+        with patch.object(tz_index, "default_index", lambda: None):
+            self.assertEqual(zone_name(52.0, 8.0, lambda: "Europe/Berlin"), "Europe/Berlin")
+            self.assertIsNone(zone_name(-33.9, 18.4, lambda: "Not/AZone"))
+            self.assertIsNone(zone_name(40.7, -74.0))
+            self.assertIsNone(utc_offset(40.7, -74.0, "2020-07-01", "12:00"))
+        # Outside every polygon of an index the fallback is still asked
+        with patch.object(tz_index, "_default", self.index):
+            self.assertEqual(zone_name(-26.2, 28.0, lambda: "Africa/Johannesburg"), "Africa/Johannesburg")
+            self.assertIsNone(zone_name(-34.0, 18.5))
+
+    def test_misses_are_cached(self):
+        fallback = MagicMock(return_value=None)
+        with patch.object(tz_index, "_default", self.index):
+            self.assertIsNone(zone_name(-34.0, 18.5, fallback))
+            self.assertIsNone(zone_name(-34.0, 18.5, fallback))
+        self.assertEqual(fallback.call_count, 1)
+        # Only for a short time: the gazetteer may learn the place's zone
+        self.assertEqual(len(tz_index.zone_cache), 1)
+        later = time.monotonic() + tz_index.NEGATIVE_TTL + 1
+        with patch("cache.time.monotonic", return_value=later), patch.object(tz_index, "_default", self.index):
+            self.assertEqual(zone_name(-34.0, 18.5, lambda: "Africa/Johannesburg"), "Africa/Johannesburg")
+
+    def test_offsets_are_cached(self):
+        offset_hits, zone_hits = tz_index.offset_cache.hits, tz_index.zone_cache.hits
+        with patch.object(tz_index, "_default", self.index):
+            utc_offset(55.75, 37.62, "1990-01-01", "12:00")
+            utc_offset(55.75, 37.62, "1990-01-01", "12:00")
+        self.assertEqual(tz_index.offset_cache.hits - offset_hits, 1)
+        self.assertEqual(tz_index.zone_cache.hits - zone_hits, 1)
+
+
+    def test_simplify_keeps_the_shape(self):
+        square = [[0, 0]] + [[x / 10, 0] for x in range(1, 100)] + [[10, 0], [10, 10], [0, 10], [0, 0]]
+        self.assertEqual(simplify(square, 0.01).tolist(), [[0, 0], [10, 0], [10, 10], [0, 10], [0, 0]])
+        circle = wobbly_circle(5, 50, 3, n=2000)
+        simple = simplify(circle, 0.01)
+        self.assertLess(len(simple), 400)
+        from matplotlib.path import Path
+        rng = np.random.default_rng(5)
+        points = np.c_[rng.uniform(1, 9, 2000), rng.uniform(46, 54, 2000)]
+        exact, rough = Path(circle).contains_points(points), Path(simple).contains_points(points)
+        self.assertLess(np.count_nonzero(exact != rough), 10)
+
+
+class TestBundledIndex(TimezoneTestCase):
+    def test_zones_of_cities(self):
+        index = tz_index.default_index()
+        self.assertIsNotNone(index)
+        for lat, lon, zone in [(51.5, -0.12, "Europe/London"), (55.75, 37.62, "Europe/Moscow"),
+                               (40.71, -74.01, "America/New_York"), (22.57, 88.36, "Asia/Kolkata"),
+                               (-33.87, 151.21, "Australia/Sydney"), (43.83, 87.6, "Asia/Urumqi"),
+                               (31.23, 121.47, "Asia/Shanghai"), (19.43, -99.13, "America/Mexico_City"),
+                               (55.0, -25.0, "Etc/GMT+2")]:
+            self.assertEqual(index.zone(lat, lon), zone, (lat, lon))
+
+    def test_offline_places_need_no_offset(self):
+        client = TestClient(app)
+        for place, summer in [("London", 1), ("Moscow", 3)]:
+            with self.subTest(place=place):
+                derived, err = calculate_chart("2020-07-01", "12:00", place)
+                self.assertIsNone(err)
+                self.assertEqual(derived.jd, calculate_chart("2020-07-01", "12:00", place, summer)[0].jd)
+                resp = client.get("/natal_chart/calc", params={"date": "2020-07-01", "time": "12:00", "place": place})
+                self.assertEqual(resp.status_code, 200)
+
+
+class TestDerivedOffsets(TimezoneTestCase):
+    def setUp(self):
+        super().setUp()
+        patcher = patch.object(tz_index, "_default", self.index)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = TestClient(app)
+
+    def test_chart_without_offset(self):
+        derived, _ = calculate_chart("1990-07-01", "12:00", "Moscow")
+        explicit, _ = calculate_chart("1990-07-01", "12:00", "Moscow", 4)
+        self.assertEqual(derived.jd, explicit.jd)
+
+    def test_endpoints_accept_missing_and_fractional_offsets(self):
+        params = {"date": "1990-07-01", "time": "12:00", "place": "Moscow"}
+        derived = self.client.get("/natal_chart/calc", params=params).json()
+        self.assertEqual(derived, self.client.get("/natal_chart/calc", params={**params, "tz_offset": 4}).json())
+        half = self.client.get("/natal_chart/calc", params={**params, "tz_offset": 5.5})
+        self.assertEqual(half.status_code, 200)
+        self.assertNotEqual(half.json(), derived)
+
+    def test_profile_keeps_the_derived_offset(self):
+        store = profiles.ProfileStore(os.path.join(self.tmp.name, "profiles.bin"), fsync=False)
+        with patch.object(profiles, "_default", store):
+            resp = self.client.post("/profiles", json={"date": "1990-07-01", "time": "12:00", "place": "Moscow"})
+            profile = self.client.get(f"/profiles/{resp.json()['profile_id']}").json()
+        self.assertEqual(profile["tz_offset"], 4)
+
+
+class TestWithoutZones(unittest.TestCase):
+    # Without the polygon index and no gazetteer zone for the offline places
+    # an omitted offset is refused instead of guessed from the longitude
+    def setUp(self):
+        tz_index.zone_cache.clear()
+        self.addCleanup(tz_index.zone_cache.clear)
+        patcher = patch.object(tz_index, "default_index", lambda: None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = TestClient(app)
+
+    def test_chart_needs_an_offset(self):
+        self.assertEqual(calculate_chart("2020-07-01", "12:00", "London"), (None, TZ_REQUIRED))
+        chart, err = calculate_chart("2020-07-01", "12:00", "London", 1)
+        self.assertIsNone(err)
+
+    def test_endpoints_answer_422(self):
+        birth = {"date": "2020-07-01", "time": "12:00", "place": "London"}
+        for path, params in [("/natal_chart/calc", birth), ("/horary_chart", birth),
+                             ("/weekly_forecast", {**birth, "start_date": "2025-06-01"}),
+                             ("/synastry", {**{f"{k}1": v for k, v in birth.items()}, "tz_offset1": 1,
+                                            **{f"{k}2": v for k, v in birth.items()}})]:
+            with self.subTest(path=path):
+                resp = self.client.get(path, params=params)
+                self.assertEqual(resp.status_code, 422)
+                self.assertEqual(resp.json(), TZ_REQUIRED)
+        self.assertEqual(self.client.post("/profiles", json=birth).status_code, 422)
+        resp = self.client.get("/natal_chart/calc", params={**birth, "tz_offset": 1})
+        self.assertEqual(resp.status_code, 200)
+
+
+if __name__ == '__main__':
+    unittest.main()
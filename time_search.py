@@ -0,0 +1,263 @@
+# time_search.py
+from datetime import datetime, timedelta
+import numpy as np
+import swisseph as swe
+from astro_core import planet_names, planet_codes
+from aspects import ASPECTS
+from chart_style import zodiac
+from metrics import timer
+
+J2000 = 2451545.0
+# Sampling step in days per body. The grid is split at every station (see
+# ``_monotonic``), so between two samples a body only moves one way and
+# crosses a level at most once; the steps only need to keep the motion per
+# step well under 180 degrees and two stations more than one step apart.
+STEPS = {
+    'Sun': 30.0, 'Moon': 7.0, 'Mercury': 2.0, 'Venus': 4.0, 'Mars': 5.0,
+    'Jupiter': 10.0, 'Saturn': 10.0, 'Uranus': 10.0, 'Neptune': 10.0, 'Pluto': 10.0,
+}
+CHUNK_DAYS = 366.0
+TOLERANCE = 1e-6  # days, about 0.1 s
+
+
+def find_root(f, a: float, b: float, fa: float = None, fb: float = None,
+              tol: float = TOLERANCE, maxiter: int = 100) -> float:
+    """Brent's method: a root of ``f`` in ``[a, b]`` where ``f`` changes sign."""
+    fa = f(a) if fa is None else fa
+    fb = f(b) if fb is None else fb
+    if fa == 0:
+        return a
+    if fb == 0:
+        return b
+    if (fa > 0) == (fb > 0):
+        raise ValueError("root is not bracketed")
+    c, fc = a, fa
+    d = e = b - a
+    for _ in range(maxiter):
+        if (fb > 0) == (fc > 0):
+            c, fc = a, fa
+            d = e = b - a
+        if abs(fc) < abs(fb):
+            a, b, c = b, c, b
+            fa, fb, fc = fb, fc, fb
+        tol1 = 2 * np.finfo(float).eps * abs(b) + tol / 2
+        m = (c - b) / 2
+        if abs(m) <= tol1 or fb == 0:
+            return b
+        if abs(e) >= tol1 and abs(fa) > abs(fb):
+            s = fb / fa
+            if a == c:
+                p, q = 2 * m * s, 1 - s
+            else:
+                q, r = fa / fc, fb / fc
+                p = s * (2 * m * q * (q - r) - (b - a) * (r - 1))
+                q = (q - 1) * (r - 1) * (s - 1)
+            if p > 0:
+                q = -q
+            p = abs(p)
+            if 2 * p < min(3 * m * q - abs(tol1 * q), abs(e * q)):
+                e, d = d, p / q
+            else:
+                d = e = m
+        else:
+            d = e = m
+        a, fa = b, fb
+        b += d if abs(d) > tol1 else (tol1 if m > 0 else -tol1)
+        fb = f(b)
+    return b
+
+
+def wrap180(deg):
+    # Signed angle in [-180, 180)
+    return (np.asarray(deg) + 180) % 360 - 180
+
+
+def longitude(code: int, jd: float):
+    xx = swe.calc_ut(jd, code)[0]
+    return xx[0], xx[3]
+
+
+def sample(code: int, start: float, end: float, step: float):
+    """Longitudes and speeds of one body on a grid covering ``[start, end]``."""
+    jds = np.append(np.arange(start, end, step), end)
+    with timer("ephemeris"):
+        values = np.array([longitude(code, jd) for jd in jds])
+    return jds, values[:, 0], values[:, 1]
+
+
+def crossings(jds, g, level: float):
+    """Brackets ``(i, i + 1)`` where ``g - level`` changes sign.
+
+    ``g`` is a signed angle per sample (columns are independent series);
+    jumps across the +-180 seam are not crossings.
+    """
+    above = g >= level
+    flip = (above[1:] != above[:-1]) & (np.abs(np.diff(g, axis=0)) < 180)
+    return np.nonzero(flip)
+
+
+def utc(jd: float) -> str:
+    return (datetime(2000, 1, 1, 12) + timedelta(days=jd - J2000)).strftime("%Y-%m-%d %H:%M")
+
+
+def _event(jd: float, event: str, body: str, **fields) -> dict:
+    return {"jd": round(float(jd), 6), "utc": utc(jd), "event": event, "body": body, **fields}
+
+
+def _monotonic(code: int, jds, lons, speeds):
+    # Add a sample at every station: near one a body can reach a level and
+    # turn back within a single step, which leaves no sign change between
+    # the coarse samples. Split there, each interval is monotonic.
+    i, _ = crossings(jds, speeds[:, None], 0.0)
+    if not len(i):
+        return jds, lons, speeds
+    roots = [find_root(lambda x: longitude(code, x)[1], jds[k], jds[k + 1], speeds[k], speeds[k + 1]) for k in i]
+    with timer("ephemeris"):
+        values = np.array([longitude(code, jd) for jd in roots])
+    return (np.insert(jds, i + 1, roots), np.insert(lons, i + 1, values[:, 0]),
+            np.insert(speeds, i + 1, values[:, 1]))
+
+
+def _chunked(start_jd: float, end_jd: float, bodies, chunk_days: float, collect):
+    # Sample each body over one chunk at a time, let ``collect`` turn the
+    # samples into events and yield them in time order.
+    bodies = planet_names if bodies is None else bodies
+    start = start_jd
+    while start < end_jd:
+        end = min(start + chunk_days, end_jd)
+        events = []
+        for name in bodies:
+            code = planet_codes[planet_names.index(name)]
+            events.extend(collect(name, code, *_monotonic(code, *sample(code, start, end, STEPS[name]))))
+        events.sort(key=lambda e: e["jd"])
+        yield from events
+        start = end
+
+
+def _level_crossings(code: int, jds, lons, targets):
+    # (jd, target index, moving backwards) for every time the body reaches one
+    # of the target longitudes
+    g = wrap180(lons[:, None] - targets)
+    for i, t in zip(*crossings(jds, g, 0.0)):
+        target = targets[t]
+        jd = find_root(lambda x: float(wrap180(longitude(code, x)[0] - target)),
+                       jds[i], jds[i + 1], g[i, t], g[i + 1, t])
+        yield jd, int(t), bool(g[i + 1, t] < g[i, t])
+
+
+def _aspect_targets(natal_degrees: dict):
+    # Longitudes a transiting body must reach to perfect each aspect to each
+    # natal point: natal +- angle (conjunction and opposition only once).
+    targets, meta = [], []
+    for name, deg in natal_degrees.items():
+        for k, (angle, _, _) in enumerate(ASPECTS):
+            for sign in ((1,) if angle in (0, 180) else (1, -1)):
+                targets.append((deg + sign * angle) % 360)
+                meta.append((name, k))
+    return np.array(targets), meta
+
+
+def aspect_events(natal_degrees: dict, start_jd: float, end_jd: float, orb: float = 6,
+                  bodies=None, chunk_days: float = CHUNK_DAYS):
+    """Transit-to-natal aspect events between ``start_jd`` and ``end_jd``.
+
+    Yields dicts in time order: ``enter`` and ``exit`` when a transiting body
+    comes within / leaves ``orb`` of an aspect to a natal point, and ``exact``
+    when it perfects. Each body is sampled on its own coarse grid (``STEPS``),
+    split at its stations, only to bracket sign changes of the signed
+    distance to every target; the event times themselves come from Brent's
+    method. The range is processed
+    ``chunk_days`` at a time, so memory does not grow with its length.
+    """
+    targets, meta = _aspect_targets(natal_degrees)
+
+    def collect(name, code, jds, lons, speeds):
+        events = []
+        g = wrap180(lons[:, None] - targets)
+        for level in (-orb, 0.0, orb):
+            for i, t in zip(*crossings(jds, g, level)):
+                target = targets[t]
+                jd = find_root(lambda x: float(wrap180(longitude(code, x)[0] - target)) - level,
+                               jds[i], jds[i + 1], g[i, t] - level, g[i + 1, t] - level)
+                if level == 0.0:
+                    event = "exact"
+                else:
+                    # Rising through -orb or falling through +orb enters the orb
+                    rising = g[i + 1, t] > g[i, t]
+                    event = "enter" if rising == (level < 0) else "exit"
+                natal, k = meta[t]
+                events.append({
+                    "jd": round(float(jd), 6),
+                    "utc": utc(jd),
+                    "event": event,
+                    "transit": name,
+                    "natal": natal,
+                    "type": ASPECTS[k][1],
+                    "symbol": ASPECTS[k][2],
+                    "retrograde": longitude(code, jd)[1] < 0,
+                })
+        return events
+
+    return _chunked(start_jd, end_jd, bodies, chunk_days, collect)
+
+
+def _stations(name: str, code: int, jds, speeds):
+    for i, _ in zip(*crossings(jds, speeds[:, None], 0.0)):
+        jd = find_root(lambda x: longitude(code, x)[1], jds[i], jds[i + 1], speeds[i], speeds[i + 1])
+        yield _event(jd, "station", name,
+                     direction="direct" if speeds[i + 1] > speeds[i] else "retrograde",
+                     degree=round(longitude(code, jd)[0], 2))
+
+
+def body_events(start_jd: float, end_jd: float, cusps=None, bodies=None,
+                chunk_days: float = CHUNK_DAYS):
+    """Sign ingresses, house ingresses and stations between two Julian days.
+
+    Yields dicts in time order: ``ingress`` when a body enters a sign,
+    ``house_ingress`` when it crosses one of the natal house ``cusps`` (only
+    if given) and ``station`` when its longitude speed changes sign. A body
+    moving backwards enters the sign or house behind it. The same coarse
+    sampling pass per body brackets all three kinds of events.
+    """
+    signs = np.arange(12) * 30.0
+    cusps = None if cusps is None else np.asarray(cusps, dtype=float)
+
+    def collect(name, code, jds, lons, speeds):
+        events = []
+        for jd, t, retrograde in _level_crossings(code, jds, lons, signs):
+            sign = (t - 1) % 12 if retrograde else t
+            events.append(_event(jd, "ingress", name, sign=zodiac[sign][1], retrograde=retrograde))
+        if cusps is not None:
+            for jd, t, retrograde in _level_crossings(code, jds, lons, cusps):
+                house = (t - 1) % 12 if retrograde else t
+                events.append(_event(jd, "house_ingress", name, house=house + 1, retrograde=retrograde))
+        events.extend(_stations(name, code, jds, speeds))
+        return events
+
+    return _chunked(start_jd, end_jd, bodies, chunk_days, collect)
+
+
+def stations(start_jd: float, end_jd: float, bodies=None, chunk_days: float = CHUNK_DAYS):
+    return _chunked(start_jd, end_jd, bodies, chunk_days,
+                    lambda name, code, jds, lons, speeds: _stations(name, code, jds, speeds))
+
+
+def retrograde_periods(start_jd: float, end_jd: float, bodies=None) -> list:
+    """Retrograde spans overlapping ``[start_jd, end_jd]``, paired from stations.
+
+    ``start`` / ``end`` are ``None`` when the body is already retrograde at
+    the beginning or still retrograde at the end of the range.
+    """
+    bodies = planet_names if bodies is None else bodies
+    open_periods = {}
+    periods = []
+    for name in bodies:
+        if longitude(planet_codes[planet_names.index(name)], start_jd)[1] < 0:
+            open_periods[name] = {"body": name, "start": None, "start_jd": None}
+    for e in stations(start_jd, end_jd, bodies):
+        if e["direction"] == "retrograde":
+            open_periods[e["body"]] = {"body": e["body"], "start": e["utc"], "start_jd": e["jd"]}
+        elif e["body"] in open_periods:
+            periods.append(dict(open_periods.pop(e["body"]), end=e["utc"], end_jd=e["jd"]))
+    periods.extend(dict(p, end=None, end_jd=None) for p in open_periods.values())
+    return sorted(periods, key=lambda p: (p["start_jd"] or start_jd, p["body"]))
@@ -0,0 +1,302 @@
+# tz_index.py
+"""Offline UTC offsets from coordinates and a local date and time.
+
+The zone at a point comes from timezone boundary polygons (the GeoJSON
+published by timezone-boundary-builder, ``tzid`` per feature) compiled into a
+grid of 1° cells. Each cell lists the zones that reach it, whether the cell
+centre lies inside each of them and only the boundary edges passing through
+the cell. A point is then inside a zone when the centre is and the segment
+from the point to the centre crosses that zone's edges an even number of
+times, so a lookup never walks whole polygons and cells no boundary passes
+through need no geometry at all.
+
+A compiled index ships in ``timezones`` (timezone-boundary-builder 2026c with
+oceans, simplified to 0.01°, about 4 MB); ``NATAL_TZ_INDEX`` points at another
+one, compiled from a newer release with:
+
+    python tz_index.py combined-with-oceans.json timezones --simplify 0.01
+
+The offset for a zone and local time comes from ``zoneinfo``, so historical
+offsets and daylight saving are those of the tz database. For a point outside
+every polygon the caller's fallback is asked; when that has no zone either
+there is no offset, rather than a guess from the longitude that would miss
+daylight saving and half-hour zones.
+"""
+import json
+import os
+from datetime import datetime
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+import numpy as np
+from cache import LRUCache, MISSING
+
+CELL = 1.0
+# Where in its cell the reference point sits: just off the middle, so it is
+# not on the round meridians and parallels that boundaries (the ocean zones'
+# 7.5° + 15° strips) often follow, where the crossing count is ambiguous
+CENTRE = 0.5 + 2 ** -20
+
+DEFAULT_INDEX_PATH = os.environ.get(
+    "NATAL_TZ_INDEX",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "timezones"),
+)
+# Points with no known zone are remembered for a short time, so repeated
+# requests for them do not redo the grid test and the fallback
+NEGATIVE_TTL = float(os.environ.get("NATAL_TZ_NEGATIVE_TTL", 60))
+
+zone_cache = LRUCache(maxsize=int(os.environ.get("NATAL_TZ_CACHE_SIZE", 8192)))
+offset_cache = LRUCache(maxsize=int(os.environ.get("NATAL_TZ_CACHE_SIZE", 8192)))
+
+
+def _cell(lat, lon, cell, rows, cols):
+    row = min(int((lat + 90) // cell), rows - 1)
+    col = int((lon + 180) // cell) % cols
+    return row * cols + col
+
+
+class TimezoneIndex:
+    """Compiled timezone polygons (see ``compile_index``): a directory of
+    ``.npy`` arrays plus ``meta.json``. The arrays are memory-mapped read-only,
+    so forked workers share the pages.
+    """
+
+    def __init__(self, path: str):
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        self.path = path
+        self.zones = meta["zones"]
+        self.cell = meta["cell"]
+        self.rows, self.cols = meta["rows"], meta["cols"]
+        self.centre = meta.get("centre", 0.5)
+
+        def load(name):
+            return np.load(os.path.join(path, name + ".npy"), mmap_mode="r")
+        self.cell_start = load("cell_start")      # (cells + 1,) into the entries
+        self.entry_zone = load("entry_zone")      # zone per (cell, zone) entry
+        self.entry_inside = load("entry_inside")  # cell centre inside that zone
+        self.entry_start = load("entry_start")    # (entries + 1,) into the edges
+        self.edges = load("edges")                # (edges, 4): x1, y1, x2, y2
+
+    def zone(self, lat: float, lon: float):
+        """tz database name at the point, or None outside every polygon."""
+        cell = _cell(lat, lon, self.cell, self.rows, self.cols)
+        lo, hi = int(self.cell_start[cell]), int(self.cell_start[cell + 1])
+        if lo == hi:
+            return None
+        row, col = divmod(cell, self.cols)
+        cy = (row + self.centre) * self.cell - 90
+        cx = (col + self.centre) * self.cell - 180
+        for k in range(lo, hi):
+            inside = bool(self.entry_inside[k])
+            e0, e1 = int(self.entry_start[k]), int(self.entry_start[k + 1])
+            if e1 > e0 and _crossings(self.edges[e0:e1].astype(float), lon, lat, cx, cy) % 2:
+                inside = not inside
+            if inside:
+                return self.zones[int(self.entry_zone[k])]
+        return None
+
+
+def _orientation(ax, ay, bx, by, px, py):
+    return (bx - ax) * (py - ay) - (by - ay) * (px - ax) > 0
+
+
+def _crossings(edges, px, py, cx, cy) -> int:
+    # Edges crossed by the segment from P to C; comparing ``> 0`` on both
+    # sides counts a vertex lying exactly on the segment once
+    x1, y1, x2, y2 = edges[:, 0], edges[:, 1], edges[:, 2], edges[:, 3]
+    straddle_pc = _orientation(px, py, cx, cy, x1, y1) != _orientation(px, py, cx, cy, x2, y2)
+    straddle_edge = _orientation(x1, y1, x2, y2, px, py) != _orientation(x1, y1, x2, y2, cx, cy)
+    return int(np.count_nonzero(straddle_pc & straddle_edge))
+
+
+def _rings(geometry):
+    if geometry["type"] == "Polygon":
+        yield from geometry["coordinates"]
+    elif geometry["type"] == "MultiPolygon":
+        for polygon in geometry["coordinates"]:
+            yield from polygon
+
+
+def simplify(ring, tolerance: float):
+    """Douglas-Peucker: the vertices of a closed ring needed to stay within
+    ``tolerance`` degrees of it."""
+    ring = np.asarray(ring, dtype=float)
+    n = len(ring)
+    if tolerance <= 0 or n < 5:
+        return ring
+    keep = np.zeros(n, dtype=bool)
+    # Split the ring at the vertex farthest from its first one
+    far = int(np.argmax(((ring - ring[0]) ** 2).sum(axis=1)))
+    keep[[0, far, n - 1]] = True
+    stack = [(0, far), (far, n - 1)]
+    while stack:
+        a, b = stack.pop()
+        if b - a < 2:
+            continue
+        p, d = ring[a], ring[b] - ring[a]
+        inner = ring[a + 1:b] - p
+        length = np.hypot(d[0], d[1])
+        if length:
+            distance = np.abs(d[0] * inner[:, 1] - d[1] * inner[:, 0]) / length
+        else:
+            distance = np.hypot(inner[:, 0], inner[:, 1])
+        i = int(np.argmax(distance))
+        if distance[i] > tolerance:
+            keep[a + 1 + i] = True
+            stack += [(a, a + 1 + i), (a + 1 + i, b)]
+    return ring[keep]
+
+
+def compile_index(geojson_path: str, path: str, tz_property: str = "tzid", cell: float = CELL,
+                  tolerance: float = 0.0) -> TimezoneIndex:
+    """Compile a timezone boundary GeoJSON into the lookup arrays at ``path``,
+    simplifying the boundaries to ``tolerance`` degrees first."""
+    with open(geojson_path, encoding="utf-8") as f:
+        features = json.load(f)["features"]
+    rows, cols = int(round(180 / cell)), int(round(360 / cell))
+    zones, edge_parts, zone_parts, area = {}, [], [], {}
+    for feature in features:
+        z = zones.setdefault(feature["properties"][tz_property], len(zones))
+        for ring in _rings(feature["geometry"]):
+            ring = simplify(np.asarray(ring, dtype=float)[:, :2], tolerance)
+            if len(ring) < 4:
+                continue
+            x, y = ring[:, 0], ring[:, 1]
+            area[z] = area.get(z, 0.0) + abs(np.dot(x, np.roll(y, -1)) - np.dot(y, np.roll(x, -1))) / 2
+            ring_edges = np.hstack([ring, np.roll(ring, -1, axis=0)])
+            # Closed rings repeat the first point: drop zero-length edges
+            ring_edges = ring_edges[(ring_edges[:, 0] != ring_edges[:, 2]) | (ring_edges[:, 1] != ring_edges[:, 3])]
+            edge_parts.append(ring_edges)
+            zone_parts.append(np.full(len(ring_edges), z))
+    # Work with the stored float32 coordinates (good to about 2 m, well
+    # within any simplification) so the centres agree with the lookups
+    edges = np.vstack(edge_parts).astype(np.float32).astype(float)
+    edge_zone = np.concatenate(zone_parts)
+
+    # Cell centre inside each zone: even-odd count of the edges a ray to the
+    # east crosses, one latitude row at a time
+    centres_x = (np.arange(cols) + CENTRE) * cell - 180
+    inside = np.zeros((rows, cols, len(zones)), dtype=bool)
+    y1, y2 = edges[:, 1], edges[:, 3]
+    for row in range(rows):
+        cy = (row + CENTRE) * cell - 90
+        hit = (y1 > cy) != (y2 > cy)
+        e = edges[hit]
+        xs = e[:, 0] + (cy - e[:, 1]) * (e[:, 2] - e[:, 0]) / (e[:, 3] - e[:, 1])
+        zs = edge_zone[hit]
+        order = np.lexsort((xs, zs))
+        xs, zs = xs[order], zs[order]
+        bounds = np.searchsorted(zs, np.arange(len(zones) + 1))
+        for z in np.unique(zs):
+            xz = xs[bounds[z]:bounds[z + 1]]
+            inside[row, :, z] = (len(xz) - np.searchsorted(xz, centres_x, side="right")) % 2 == 1
+
+    # Every edge goes into each cell its bounding box touches
+    c0 = np.clip(((np.minimum(edges[:, 0], edges[:, 2]) + 180) // cell).astype(int), 0, cols - 1)
+    c1 = np.clip(((np.maximum(edges[:, 0], edges[:, 2]) + 180) // cell).astype(int), 0, cols - 1)
+    r0 = np.clip(((np.minimum(y1, y2) + 90) // cell).astype(int), 0, rows - 1)
+    r1 = np.clip(((np.maximum(y1, y2) + 90) // cell).astype(int), 0, rows - 1)
+    cell_edges = {}
+    for e in range(len(edges)):
+        z = int(edge_zone[e])
+        for r in range(r0[e], r1[e] + 1):
+            for c in range(c0[e], c1[e] + 1):
+                cell_edges.setdefault(r * cols + c, {}).setdefault(z, []).append(e)
+
+    # Where zones overlap (Asia/Urumqi lies within Asia/Shanghai) the smaller,
+    # more specific one is tried first
+    cell_start, entry_zone, entry_inside, entry_start, entry_edges = [0], [], [], [0], []
+    for row in range(rows):
+        for col in range(cols):
+            crossing = cell_edges.get(row * cols + col, {})
+            for z in sorted(set(crossing) | set(np.flatnonzero(inside[row, col]).tolist()),
+                            key=lambda z: (area.get(z, 0.0), z)):
+                entry_zone.append(z)
+                entry_inside.append(inside[row, col, z])
+                entry_edges.extend(crossing.get(z, ()))
+                entry_start.append(len(entry_edges))
+            cell_start.append(len(entry_zone))
+
+    os.makedirs(path, exist_ok=True)
+    arrays = {
+        "cell_start": np.asarray(cell_start, dtype=np.int32),
+        "entry_zone": np.asarray(entry_zone, dtype=np.int32),
+        "entry_inside": np.asarray(entry_inside, dtype=bool),
+        "entry_start": np.asarray(entry_start, dtype=np.int32),
+        "edges": edges[np.asarray(entry_edges, dtype=np.int64)].reshape(-1, 4).astype(np.float32),
+    }
+    for name, array in arrays.items():
+        np.save(os.path.join(path, name + ".npy"), array)
+    with open(os.path.join(path, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump({"zones": list(zones), "cell": cell, "rows": rows, "cols": cols, "centre": CENTRE}, f)
+    return TimezoneIndex(path)
+
+
+_default = None
+
+
+def default_index():
+    """The bundled index or the one at ``NATAL_TZ_INDEX``, or None when it is
+    missing."""
+    global _default
+    if _default is None:
+        path = DEFAULT_INDEX_PATH
+        _default = TimezoneIndex(path) if path and os.path.exists(os.path.join(path, "meta.json")) else False
+    return _default or None
+
+
+def _known_zone(zone):
+    try:
+        return zone if zone and ZoneInfo(zone) else None
+    except (ZoneInfoNotFoundError, ValueError, TypeError):
+        return None
+
+
+def zone_name(lat: float, lon: float, fallback=None):
+    """Zone at the point: the polygon index, then ``fallback()`` (e.g. the
+    gazetteer's zone for the place); None when neither knows it."""
+    key = (round(lat, 5), round(lon, 5))
+    zone = zone_cache.get(key, MISSING)
+    if zone is MISSING:
+        index = default_index()
+        zone = index.zone(lat, lon) if index is not None else None
+        if zone is None and fallback is not None:
+            zone = _known_zone(fallback())
+        if zone is None:
+            zone_cache.set(key, None, ttl=NEGATIVE_TTL)
+        else:
+            zone_cache.set(key, zone)
+    return zone
+
+
+def utc_offset(lat: float, lon: float, date: str, time: str, fallback=None):
+    """UTC offset in hours of the local ``date`` and ``time`` at the point, or
+    None when the zone there is unknown."""
+    zone = zone_name(lat, lon, fallback)
+    if zone is None:
+        return None
+    key = (zone, date, time)
+    offset = offset_cache.get(key)
+    if offset is None:
+        local = datetime.strptime(f"{date} {time}", "%Y-%m-%d %H:%M").replace(tzinfo=ZoneInfo(zone))
+        hours = local.utcoffset().total_seconds() / 3600
+        offset = int(hours) if hours.is_integer() else hours
+        offset_cache.set(key, offset)
+    return offset
+
+
+def stats() -> dict:
+    return {"zones": zone_cache.stats(), "offsets": offset_cache.stats()}
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Compile timezone boundary polygons into a lookup index")
+    parser.add_argument("geojson", help="Timezone boundary GeoJSON (e.g. timezone-boundary-builder's release)")
+    parser.add_argument("path", help="Output directory")
+    parser.add_argument("--property", default="tzid", help="Feature property holding the zone name")
+    parser.add_argument("--cell", type=float, default=CELL, help="Grid cell size in degrees")
+    parser.add_argument("--simplify", type=float, default=0.0,
+                        help="Simplify boundaries to this many degrees (0 keeps every vertex)")
+    args = parser.parse_args()
+    index = compile_index(args.geojson, args.path, args.property, args.cell, args.simplify)
+    print(f"Compiled {len(index.zones)} zones, {len(index.edges)} cell edges into {args.path}")